@@ -0,0 +1,102 @@
+# Statistiken für app.py: SQL (DuckDB) direkt auf den gecachten DataFrames, ohne gejointe Kopien
+import duckdb
+import pandas as pd
+import streamlit as st
+
+from db import page_frames
+
+# Gipfel, bestiegene Gipfel und gekletterte Routen pro Gebiet (wie bisher über die zwei Merges)
+AREA_STATS_SQL = """
+WITH climbed AS (
+    SELECT r.peak_id, COUNT(DISTINCT a.route_id) AS routen
+    FROM ascents a JOIN routes r ON r.route_id = a.route_id
+    GROUP BY r.peak_id
+)
+SELECT
+    p.gebiet AS "Gebiet",
+    COUNT(DISTINCT p.peak_id) AS "Anzahl Gipfel",
+    COUNT(DISTINCT c.peak_id) AS "Bestiegene Gipfel",
+    COALESCE(SUM(c.routen), 0) AS "Anzahl gekletterte Routen"
+FROM peaks p LEFT JOIN climbed c ON c.peak_id = p.peak_id
+GROUP BY p.gebiet
+ORDER BY p.gebiet
+"""
+
+YEARLY_STATS_SQL = """
+SELECT
+    year(a.date) AS "Jahr",
+    COUNT(*) AS "Begehungen",
+    COUNT(DISTINCT a.route_id) AS "Routen",
+    COUNT(DISTINCT r.peak_id) AS "Gipfel"
+FROM ascents a LEFT JOIN routes r ON r.route_id = a.route_id
+WHERE a.date IS NOT NULL
+GROUP BY 1
+ORDER BY 1
+"""
+
+CLIMBER_STATS_SQL = """
+SELECT
+    a.climber_id AS "Kletterer",
+    COUNT(*) AS "Begehungen",
+    COUNT(DISTINCT a.route_id) AS "Routen",
+    COUNT(DISTINCT r.peak_id) AS "Gipfel",
+    MIN(a.date) AS "Erste Begehung",
+    MAX(a.date) AS "Letzte Begehung"
+FROM ascents a LEFT JOIN routes r ON r.route_id = a.route_id
+WHERE a.climber_id IS NOT NULL AND a.climber_id <> ''
+GROUP BY a.climber_id
+ORDER BY "Begehungen" DESC, a.climber_id
+"""
+
+
+class Analytics:
+    """
+    peaks/routes/ascents als DuckDB-Relationen. DuckDB liest die DataFrames direkt (kein Kopieren,
+    keine Zwischen-Frames für Joins); jede Abfrage läuft auf einem eigenen Cursor, weil das Objekt
+    von allen Sessions geteilt wird.
+    """
+
+    def __init__(self, peaks_df: pd.DataFrame, routes_df: pd.DataFrame, ascents_df: pd.DataFrame):
+        self.frames = {"peaks": peaks_df, "routes": routes_df, "ascents": ascents_df}
+        self.con = duckdb.connect()
+
+    def has_columns(self, table: str, *columns: str) -> bool:
+        return all(col in self.frames[table].columns for col in columns)
+
+    def query(self, sql: str, params=None) -> pd.DataFrame:
+        cursor = self.con.cursor()
+        try:
+            for name, df in self.frames.items():
+                cursor.register(name, df)
+            return cursor.execute(sql, params or []).df()
+        finally:
+            cursor.close()
+
+    def area_stats(self) -> pd.DataFrame:
+        """Pro Gebiet: Anzahl Gipfel, bestiegene Gipfel, gekletterte Routen."""
+        return self.query(AREA_STATS_SQL)
+
+    def yearly_stats(self) -> pd.DataFrame:
+        """Begehungen, Routen und Gipfel pro Jahr (leer ohne Spalte 'date')."""
+        if not self.has_columns("ascents", "date"):
+            return pd.DataFrame()
+        return self.query(YEARLY_STATS_SQL)
+
+    def climber_stats(self) -> pd.DataFrame:
+        """Begehungen, Routen und Gipfel pro Kletterer (leer ohne Spalte 'climber_id')."""
+        if not self.has_columns("ascents", "climber_id", "date"):
+            return pd.DataFrame()
+        return self.query(CLIMBER_STATS_SQL)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _cached_analytics(schema: str, version, _peaks_df, _routes_df, _ascents_df) -> Analytics:
+    return Analytics(_peaks_df, _routes_df, _ascents_df)
+
+
+def load_analytics(columns: dict[str, tuple] | None = None, climber_id: str | None = None) -> Analytics:
+    """
+    Analytics über den Snapshot der Seite; neu aufgebaut nur bei neuem Datenstand.
+    Mit MULTI_USER=1 nur über die Begehungen von `climber_id` (siehe db.page_frames()).
+    """
+    return _cached_analytics(*page_frames(columns, climber_id))
@@ -4,7 +4,6 @@
 #st.write("Matplotlib test")
 
 import streamlit as st
-from supabase import create_client, Client
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
@@ -20,56 +19,58 @@ st.write("Gipfelliste aus Supabase:")
 # Lade die Umgebungsvariablen aus der .env-Datei
 load_dotenv()
 
-# Holen der Supabase-URL und des API-Schlüssels aus den Umgebungsvariablen
-url = os.getenv("SUPABASE_URL")
-key = os.getenv("SUPABASE_KEY")
+# Copy-on-Write für den ganzen Prozess (ab pandas 3 ohnehin immer an): Seiten bekommen flache
+# Kopien der geteilten Tabellen (db.load_tables()), kopiert wird erst beim Ändern
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
 
-# Erstelle die Verbindung zu Supabase
-supabase: Client = create_client(url, key)
+# Daten holen – gemeinsamer Snapshot aus db.py, ausgewertet per SQL (DuckDB) in analytics.py
+from analytics import load_analytics
+from climber import current_climber
+
+# Spalten, die die Statistik braucht (nur diese werden von Supabase geladen)
+COLUMNS = {
+    "peaks": ("peak_id", "gebiet"),
+    "routes": ("route_id", "peak_id"),
+    "ascents": ("ascent_id", "route_id", "date", "climber_id"),
+}
 
-# Daten holen
-@st.cache_data
 def fetch_data():
-    peaks_df = pd.DataFrame(supabase.table("peaks").select("*").execute().data)
-    routes_df = pd.DataFrame(supabase.table("routes").select("*").execute().data)
-    ascents_df = pd.DataFrame(supabase.table("ascents").select("*").execute().data)
-    return peaks_df, routes_df, ascents_df
+    # Mit MULTI_USER=1 nur die Begehungen des Kletterers dieser Session (climber.py)
+    return load_analytics(COLUMNS, current_climber())
+
+def show_breakdowns(analytics):
+    # Begehungen pro Jahr und pro Kletterer – laufen ebenfalls direkt auf den Tabellen
+    yearly = analytics.yearly_stats()
+    if not yearly.empty:
+        st.subheader("Begehungen pro Jahr")
+        st.bar_chart(yearly.set_index("Jahr")[["Begehungen"]])
+        st.dataframe(yearly)
+    climbers = analytics.climber_stats()
+    if not climbers.empty:
+        st.subheader("Begehungen pro Kletterer")
+        st.dataframe(climbers)
 
 def app():
     st.title("Gipfel-Statistik pro Gebiet")
 
-    peaks_df, routes_df, ascents_df = fetch_data()
+    analytics = fetch_data()
 
     # Überprüfe die Spaltennamen in peaks_df
-    st.write("Spaltennamen in peaks_df:", peaks_df.columns)
-
-    # Verknüpfungen: ascents → routes → peaks
-    ascents_with_peak = (
-        ascents_df
-        .merge(routes_df, left_on="route_id", right_on="route_id")
-        .merge(peaks_df, left_on="peak_id", right_on="peak_id")
-    )
+    st.write("Spaltennamen in peaks_df:", analytics.frames["peaks"].columns)
 
-    # Wie viele verschiedene Gipfel wurden pro Gebiet bestiegen?
-    if 'gebiet' in peaks_df.columns:
-        bestiegene_peaks = ascents_with_peak.groupby("gebiet")["peak_id"].nunique()
-    else:
+    if not analytics.has_columns("peaks", "gebiet"):
         st.write("Spalte 'gebiet' nicht gefunden. Bitte überprüfen!")
         return
 
-    # Wie viele gibt es insgesamt pro Gebiet?
-    total_peaks = peaks_df.groupby("gebiet")["peak_id"].nunique()
+    # Gipfel, bestiegene Gipfel und gekletterte Routen pro Gebiet in einer SQL-Abfrage
+    # (statt ascents → routes → peaks zu mergen und mehrfach zu gruppieren)
+    stats = analytics.area_stats()
+    gebiete = stats["Gebiet"]
+    bestiegene_peaks = stats["Bestiegene Gipfel"]
 
     # Fehlende = Gesamt - Bestiegen
-    fehlende_peaks = total_peaks - bestiegene_peaks
-    fehlende_peaks = fehlende_peaks.fillna(total_peaks)  # Falls 0 bestiegen
-
-    # Reindexiere, um sicherzustellen, dass alle Gebiete auch in fehlenden Peaks vorhanden sind
-    fehlende_peaks = fehlende_peaks.reindex(total_peaks.index, fill_value=0)
-    bestiegene_peaks = bestiegene_peaks.reindex(total_peaks.index, fill_value=0)
-
-    # Sicherstellen, dass alle Arrays denselben Index haben
-    gebiete = total_peaks.index
+    fehlende_peaks = stats["Anzahl Gipfel"] - bestiegene_peaks
 
     # Balkendiagramm
     fig, ax = plt.subplots(figsize=(8, 6))
@@ -82,25 +83,15 @@ def app():
 
     st.pyplot(fig)
 
-
-
-        # Berechnung der Anzahl der gekletterten Routen pro Gebiet
-    gekletterte_routen = ascents_with_peak.groupby("gebiet")["route_id"].nunique()
-
-    # Berechnung der Gesamtanzahl der Gipfel pro Gebiet
-    total_peaks = peaks_df.groupby("gebiet")["peak_id"].nunique()
-
     # Erstelle eine Tabelle mit den gewünschten Informationen
-    result_df = pd.DataFrame({
-        'Gebiet': total_peaks.index,
-        'Anzahl gekletterte Routen': gekletterte_routen,
-        'Anzahl Gipfel': total_peaks
-    })
+    result_df = stats[['Gebiet', 'Anzahl gekletterte Routen', 'Anzahl Gipfel']]
 
     # Zeige die Tabelle in Streamlit
     st.write("Tabelle mit Gebieten, Anzahl gekletterter Routen und Anzahl der Gipfel:")
     st.dataframe(result_df)
 
+    show_breakdowns(analytics)
+
 
 if __name__ == "__main__":
     app()
@@ -108,27 +99,18 @@ if __name__ == "__main__":
 def app():
     st.title("Gipfel-Statistik pro Gebiet")
 
-    peaks_df, routes_df, ascents_df = fetch_data()
+    analytics = fetch_data()
 
-    st.write("Spaltennamen in peaks_df:", peaks_df.columns)
+    st.write("Spaltennamen in peaks_df:", analytics.frames["peaks"].columns)
 
-    ascents_with_peak = (
-        ascents_df
-        .merge(routes_df, left_on="route_id", right_on="route_id")
-        .merge(peaks_df, left_on="peak_id", right_on="peak_id")
-    )
-
-    if 'gebiet' not in peaks_df.columns:
+    if not analytics.has_columns("peaks", "gebiet"):
         st.write("Spalte 'gebiet' nicht gefunden. Bitte überprüfen!")
         return
 
-    bestiegene_peaks = ascents_with_peak.groupby("gebiet")["peak_id"].nunique()
-    total_peaks = peaks_df.groupby("gebiet")["peak_id"].nunique()
-    fehlende_peaks = total_peaks - bestiegene_peaks
-    fehlende_peaks = fehlende_peaks.fillna(total_peaks)
-    fehlende_peaks = fehlende_peaks.reindex(total_peaks.index, fill_value=0)
-    bestiegene_peaks = bestiegene_peaks.reindex(total_peaks.index, fill_value=0)
-    gebiete = total_peaks.index
+    stats = analytics.area_stats()
+    gebiete = stats["Gebiet"]
+    bestiegene_peaks = stats["Bestiegene Gipfel"]
+    fehlende_peaks = stats["Anzahl Gipfel"] - bestiegene_peaks
 
     # Matplotlib Plot
     fig, ax = plt.subplots(figsize=(8, 6))
@@ -141,19 +123,15 @@ def app():
 
     # Pandas Plot
     st.subheader("Pandas Plot: Gekletterte Routen pro Gebiet")
-    gekletterte_routen = ascents_with_peak.groupby("gebiet")["route_id"].nunique()
-    result_df = pd.DataFrame({
-        'Gebiet': total_peaks.index,
-        'Anzahl gekletterte Routen': gekletterte_routen,
-        'Anzahl Gipfel': total_peaks
-    })
-    result_df = result_df.fillna(0)
+    result_df = stats[['Gebiet', 'Anzahl gekletterte Routen', 'Anzahl Gipfel']]
     st.dataframe(result_df)
 
     if not result_df.empty:
         plot_data = result_df.set_index("Gebiet")[["Anzahl gekletterte Routen", "Anzahl Gipfel"]]
         st.bar_chart(plot_data)
 
+    show_breakdowns(analytics)
+
     # Plotly 3D-Gebirgsplot mit Kommentaren
     st.subheader("3D-Mountain mit Besucher-Kommentaren")
 
@@ -0,0 +1,222 @@
+# Benchmark der Kartenseiten-Pipeline: Laden -> Zusammenfassung -> Filter -> Dreiecke -> HTML
+# (render_cached: dieselbe Karte mit der gecachten Ebene aus layer_cache.py)
+#
+#   python benchmark.py                          # 1k, 10k, 100k, 1M
+#   python benchmark.py --scales 1000 10000 --out bench.json --compare bench_alt.json
+#
+# Läuft komplett lokal: die Daten kommen aus synthetic.py und werden wie auf den Seiten über
+# db.fetch_tables() geladen – statt Supabase antwortet die SQLite-Nachbildung
+# (server_query.SQLiteStandIn hinter server_query.SQLiteClient).
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+# db.py baut beim Import einen Supabase-Client; run_scale() ersetzt ihn durch SQLiteClient
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "benchmark.local.only")
+
+import folium
+import numpy as np
+import pandas as pd
+
+import db
+from db import fetch_tables, select_list, shared_frame
+from geometry import DETAIL_ZOOM, add_triangles, build_map_triangles
+from layer_cache import RenderedLayer, render_layer
+from map_view import DEFAULT_ZOOM, estimate_box, expand_box
+from peak_filter import PeakFilter
+from peak_summary import build_peak_summary
+from server_query import SQLiteClient
+from spatial_index import GridIndex
+import synthetic
+
+SCALES = (1_000, 10_000, 100_000, 1_000_000)
+
+# Spalten wie auf den Kartenseiten (z.B. pages/Comic_map.py)
+COLUMNS = {
+    "peaks": ("peak_id", "gipfel", "gebiet", "hoehe", "lat", "lon"),
+    "routes": ("route_id", "peak_id", "stern", "bewertung"),
+    "ascents": ("route_id", "bewertung", "kommentar"),
+}
+
+# Sidebar-Zustände, die pro Durchlauf des Filter-Schritts einmal ausgewertet werden
+FILTERS = (
+    {},
+    {"gebiet": "Rathen"},
+    {"star": True},
+    {"done": True, "max_hoehe": 40},
+    {"gebiet": "Bielatal", "bewertung": 7, "star": False, "max_hoehe": 80, "done": True},
+)
+
+# Zoomstufe der Detailansicht (ein Ausschnitt mit einzelnen Gipfeln, nicht die ganze Region)
+DETAIL_VIEW_ZOOM = DETAIL_ZOOM + 2
+
+# Ab diesem Faktor langsamer (oder mehr Speicher) meldet --compare eine Verschlechterung;
+# Schritte unter MIN_SECONDS schwanken zu stark und werden bei der Zeit nicht verglichen
+REGRESSION_FACTOR = 1.2
+MIN_SECONDS = 0.05
+
+
+def measure(fn, repeat: int = 1):
+    """
+    Führt fn einmal mit tracemalloc aus (Spitzenspeicher) und `repeat`-mal ohne (Zeit,
+    bestes Ergebnis) – tracemalloc selbst würde die Zeit verfälschen.
+    Gibt (Ergebnis, Sekunden, Spitzenspeicher in MB) zurück.
+    """
+    tracemalloc.start()
+    try:
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - started)
+    return result, min(seconds), peak / 2 ** 20
+
+
+# Zeitlimit für fetch_tables(); bei 1M Zeilen braucht auch SQLite länger als FETCH_TIMEOUT
+LOAD_TIMEOUT = 3600
+
+
+def load_frames() -> dict[str, pd.DataFrame]:
+    """Wie beim ersten Laden des Snapshots: db.fetch_tables() mit den Spalten der Seite, dann shared_frame()."""
+    specs = {table: select_list(columns, table) for table, columns in COLUMNS.items()}
+    return {table: shared_frame(df, table) for table, df in fetch_tables(specs, timeout=LOAD_TIMEOUT).items()}
+
+
+def render_html(triangles: dict, center, zoom: int) -> str:
+    """Dreiecke in eine Folium-Karte und als HTML serialisieren (das, was st_folium an den Browser schickt)."""
+    m = folium.Map(location=list(center), zoom_start=zoom, tiles="OpenStreetMap")
+    add_triangles(m, triangles)
+    return m.get_root().render()
+
+
+def render_cached_html(layer, center, zoom: int) -> str:
+    """Wie render_html(), aber mit der fertig gerenderten Ebene aus dem Cache (layer_cache.py)."""
+    m = folium.Map(location=list(center), zoom_start=zoom, tiles="OpenStreetMap")
+    RenderedLayer(layer).add_to(m)
+    return m.get_root().render()
+
+
+def run_scale(scale: int, seed: int = 0, repeat: int = 1, report=print) -> list[dict]:
+    """
+    Alle Schritte für `scale` Gipfel und `scale` Begehungen (Routen ~ 4 pro Gipfel).
+    Jeder Schritt bekommt das Ergebnis des vorherigen, so wie auf der Seite.
+    """
+    results = []
+
+    def stage(name, fn, **extra):
+        result, seconds, peak_mb = measure(fn, repeat)
+        row = {"scale": scale, "stage": name, "seconds": round(seconds, 6), "peak_mb": round(peak_mb, 3)}
+        row.update({key: value(result) for key, value in extra.items()})
+        results.append(row)
+        report(format_row(row))
+        return result
+
+    frames = synthetic.generate(peaks=scale, ascents=scale, seed=seed)
+    db.supabase = SQLiteClient(synthetic.write_sqlite(frames, ":memory:"))
+
+    frames = stage("load", load_frames, rows=lambda f: sum(len(df) for df in f.values()))
+    summary = stage("summary", lambda: build_peak_summary(frames["peaks"], frames["routes"], frames["ascents"]),
+                    rows=len)
+    peak_filter = stage("filter_build", lambda: PeakFilter(summary), rows=len)
+    index = stage("index_build", lambda: GridIndex(summary["lat"], summary["lon"],
+                                                   summary["peak_id"].to_numpy(dtype="int64", na_value=-1)),
+                  rows=len)
+    selected = stage("filter", lambda: [peak_filter.select(**filters)[0] for filters in FILTERS],
+                     rows=lambda selections: len(selections[0]))
+    peaks = selected[0]
+
+    # Übersicht (Standard-Zoom, bei vielen Gipfeln Zellen) und Detailansicht im Ausschnitt
+    # um den Median der Koordinaten
+    center = (peaks["lat"].mean(), peaks["lon"].mean())
+    triangles = stage("triangles", lambda: build_map_triangles(peaks, DEFAULT_ZOOM), rows=lambda t: len(t["tooltip"]))
+    stage("render", lambda: render_html(triangles, center, DEFAULT_ZOOM), html_bytes=lambda html: len(html.encode()))
+    layer = render_layer(triangles)
+    stage("render_cached", lambda: render_cached_html(layer, center, DEFAULT_ZOOM),
+          html_bytes=lambda html: len(html.encode()))
+    center = (peaks["lat"].median(), peaks["lon"].median())
+    box = expand_box(estimate_box(center, DETAIL_VIEW_ZOOM))
+    in_view = stage("viewport", lambda: peaks[peaks["peak_id"].isin(index.bbox(*box))], rows=len)
+    triangles = stage("triangles_detail", lambda: build_map_triangles(in_view, DETAIL_VIEW_ZOOM),
+                      rows=lambda t: len(t["tooltip"]))
+    stage("render_detail", lambda: render_html(triangles, center, DETAIL_VIEW_ZOOM),
+          html_bytes=lambda html: len(html.encode()))
+    return results
+
+
+def format_row(row: dict) -> str:
+    extra = "".join(f"  {key}={row[key]}" for key in ("rows", "html_bytes") if key in row)
+    return f"{row['scale']:>9}  {row['stage']:<17} {row['seconds'] * 1000:>10.1f} ms {row['peak_mb']:>9.1f} MB{extra}"
+
+
+def metadata(seed: int, repeat: int) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "seed": seed,
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "folium": folium.__version__,
+    }
+
+
+def compare(old: dict, new: dict, factor: float = REGRESSION_FACTOR) -> list[str]:
+    """Schritte, die gegenüber `old` um mehr als `factor` langsamer geworden sind oder mehr Speicher brauchen."""
+    before = {(row["scale"], row["stage"]): row for row in old["results"]}
+    regressions = []
+    for row in new["results"]:
+        prev = before.get((row["scale"], row["stage"]))
+        if prev is None:
+            continue
+        for key, unit in (("seconds", "s"), ("peak_mb", "MB"), ("html_bytes", "B")):
+            if key == "seconds" and prev[key] < MIN_SECONDS:
+                continue
+            if key in row and prev.get(key) and row[key] > prev[key] * factor:
+                regressions.append(f"{row['scale']} {row['stage']}: {key} {prev[key]} -> {row[key]} {unit} "
+                                   f"(x{row[key] / prev[key]:.2f})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark der Kartenseiten-Pipeline mit synthetischen Daten.")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(SCALES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="Zeitmessungen pro Schritt (bestes zählt)")
+    parser.add_argument("--out", default="benchmark.json")
+    parser.add_argument("--compare", help="frühere Ergebnisdatei; Verschlechterungen werden gemeldet")
+    args = parser.parse_args(argv)
+
+    results = []
+    for scale in args.scales:
+        results += run_scale(scale, args.seed, args.repeat)
+    output = {"meta": metadata(args.seed, args.repeat), "results": results}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    print(f"Ergebnisse in {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), output)
+        for line in regressions:
+            print(f"LANGSAMER: {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,104 @@
+# Änderungs-Feed: meldet geschriebene Zeilen (Tabelle, Schlüssel) an alle Caches im Prozess –
+# optional auch über Postgres LISTEN/NOTIFY an alle anderen Worker (sql/change_feed.sql)
+import json
+import logging
+import os
+import threading
+import uuid
+
+# Verbindung für LISTEN (direkte Postgres-Verbindung, nicht die REST-URL); leer = nur lokal
+CHANGE_FEED_DSN = os.getenv("CHANGE_FEED_DSN", "")
+CHANNEL = "felsenbuch_changes"   # wie in sql/change_feed.sql
+RECONNECT_DELAY = 5              # Sekunden bis zum nächsten Verbindungsversuch
+POLL_INTERVAL = 1                # Sekunden, die notifies() höchstens wartet (so lange dauert close())
+
+# Kennung dieses Prozesses: db.py schickt sie als Header ORIGIN_HEADER mit jedem Schreibzugriff,
+# der Trigger legt sie in die Benachrichtigung – eigene Änderungen sind schon lokal gemeldet
+ORIGIN = uuid.uuid4().hex
+ORIGIN_HEADER = "x-felsenbuch-origin"
+
+logger = logging.getLogger(__name__)
+
+
+class LocalChangeFeed:
+    """
+    Stellvertreter ohne Datenbank: publish() ruft die Abonnenten direkt auf. Reicht für einen
+    einzelnen Prozess (und für Skripte/Tests); mehrere Worker erfahren so nichts voneinander.
+    """
+
+    def __init__(self):
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """callback(table, keys, climbers); keys/climbers None heißt "unbekannt, alles neu laden"."""
+        with self.lock:
+            self.subscribers.append(callback)
+
+    def publish(self, table: str, keys=None, climbers=None):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for callback in subscribers:
+            try:
+                callback(table, keys, climbers)
+            except Exception as e:
+                logger.warning("Änderung an %s konnte nicht verarbeitet werden: %s", table, e)
+
+    def close(self):
+        pass
+
+
+class PostgresChangeFeed(LocalChangeFeed):
+    """
+    Hört per LISTEN auf die Benachrichtigungen der Trigger aus sql/change_feed.sql und gibt sie
+    an die Abonnenten weiter – damit sehen alle Worker Schreibzugriffe der anderen sofort.
+    Eigene Schreibzugriffe werden nur direkt lokal gemeldet (publish()); ihre Benachrichtigung
+    trägt ORIGIN und wird übersprungen.
+    Braucht psycopg (pip install "psycopg[binary]").
+    """
+
+    def __init__(self, dsn: str):
+        super().__init__()
+        import psycopg  # nur in diesem Modus nötig
+
+        self._psycopg = psycopg
+        self.dsn = dsn
+        self.closed = threading.Event()
+        self.thread = threading.Thread(target=self._listen, name="change-feed", daemon=True)
+        self.thread.start()
+
+    def _listen(self):
+        while not self.closed.is_set():
+            try:
+                with self._psycopg.connect(self.dsn, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    # Mit Timeout, damit close() auch ohne eintreffende Benachrichtigung wirkt
+                    while not self.closed.is_set():
+                        for notify in conn.notifies(timeout=POLL_INTERVAL):
+                            self._dispatch(notify.payload)
+            except Exception as e:
+                logger.warning("Änderungs-Feed getrennt, neuer Versuch in %s s: %s", RECONNECT_DELAY, e)
+                self.closed.wait(RECONNECT_DELAY)
+
+    def _dispatch(self, payload: str):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Unbekannte Benachrichtigung auf %s: %s", CHANNEL, payload[:200])
+            return
+        if message.get("origin") == ORIGIN:
+            return
+        self.publish(message["table"], message.get("keys"), message.get("climbers"))
+
+    def close(self):
+        self.closed.set()
+
+
+def create_change_feed(dsn: str = CHANGE_FEED_DSN) -> LocalChangeFeed:
+    """Postgres-Feed, wenn CHANGE_FEED_DSN gesetzt ist (und psycopg da ist), sonst der lokale Stellvertreter."""
+    if dsn:
+        try:
+            return PostgresChangeFeed(dsn)
+        except ImportError:
+            logger.warning("CHANGE_FEED_DSN ist gesetzt, aber psycopg fehlt – Änderungen nur innerhalb dieses Prozesses.")
+    return LocalChangeFeed()
@@ -0,0 +1,20 @@
+# Kletterer der Session für den Mehrbenutzer-Modus (MULTI_USER=1, siehe db.py)
+import streamlit as st
+
+from db import MULTI_USER
+
+
+def current_climber() -> str | None:
+    """
+    climber_id dieser Session aus der Sidebar (vorbelegt über ?climber=... in der URL);
+    None außerhalb des Mehrbenutzer-Modus oder solange keine eingegeben ist.
+    """
+    if not MULTI_USER:
+        return None
+    if "climber_id" not in st.session_state:
+        st.session_state["climber_id"] = st.query_params.get("climber", "")
+    climber_id = st.sidebar.text_input("Climber ID", key="climber_id").strip()
+    if climber_id:
+        # In der URL merken, damit ein Reload (neue Session) denselben Kletterer zeigt
+        st.query_params["climber"] = climber_id
+    return climber_id or None
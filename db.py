@@ -1,29 +1,720 @@
-# supabase Datenzugrifffrom supabase import create_client
+# supabase Datenzugriff
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+import hashlib
+import itertools
+import logging
 import os
-from supabase import create_client
+import queue
+import threading
+import time
+import numpy as np
+import pandas as pd
+from pyarrow import feather
+import streamlit as st
+from supabase import ClientOptions, create_client
+
+from change_feed import ORIGIN, ORIGIN_HEADER, create_change_feed
+from spatial_index import GridIndex
+from tracing import span
+
+logger = logging.getLogger(__name__)
 
 
 load_dotenv()  # liest .env
 
+# ORIGIN_HEADER: der Trigger aus sql/change_feed.sql markiert damit die eigenen Änderungen
 supabase = create_client(
     os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_KEY")
+    os.getenv("SUPABASE_KEY"),
+    options=ClientOptions(headers={ORIGIN_HEADER: ORIGIN}),
 )
 
+# PostgREST liefert pro Anfrage höchstens "max_rows" Zeilen (Supabase-Default: 1000).
+# Alles darüber wird ohne Fehlermeldung abgeschnitten, deshalb wird immer seitenweise geladen.
+PAGE_SIZE = 1000
+
+# Wie viele HTTP-Anfragen beim Laden höchstens gleichzeitig laufen dürfen,
+# und wie lange das Laden aller Tabellen zusammen maximal dauern darf (Sekunden).
+MAX_WORKERS = 6
+FETCH_TIMEOUT = 60
+
+# Nach so vielen Sekunden fragt load_tables() beim nächsten Aufruf nach neuen/geänderten Zeilen
+SYNC_INTERVAL = 60
+
+# Parallele Importe committen reservierte IDs (reserve_ids()) nicht in ID-Reihenfolge: eine Lücke
+# unter der Schlüssel-Watermark kann später noch gefüllt werden. Solche Lücken fragt jeder Sync
+# erneut ab, bis sie gefüllt sind oder GAP_TTL Sekunden alt (dann gilt die ID als verworfen).
+GAP_TTL = 600
+MAX_GAPS = 50
+
+# Höchstens so viele Schlüssel pro in_()-Filter: sie stehen alle in der URL (sonst HTTP 414)
+IN_CHUNK = 500
+
+# Verzeichnis für den lokalen Spiegel (Arrow IPC, memory-mapped lesbar); leer = ausgeschaltet
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", ".snapshot")
+
+# Mehrbenutzer-Modus: der Prozess hält nur den Katalog (peaks, routes), Begehungen werden
+# pro Kletterer geladen, und "geklettert" gilt nur für den Kletterer der Session
+MULTI_USER = os.getenv("MULTI_USER", "") == "1"
+CATALOG_TABLES = ("peaks", "routes")
+
+# Primärschlüssel je Tabelle – sorgt für eine stabile Reihenfolge beim Blättern
+TABLE_KEYS = {
+    "peaks": "peak_id",
+    "routes": "route_id",
+    "ascents": "ascent_id",
+}
+
+# Spaltentypen je Tabelle, damit jede Seite dieselben (typisierten) DataFrames bekommt
+SCHEMAS = {
+    "peaks": {
+        "peak_id": "Int64",
+        "gipfel": "str",
+        "gebiet": "str",
+        "hoehe": "float",
+        "lat": "float",
+        "lon": "float",
+    },
+    "routes": {
+        "route_id": "Int64",
+        "peak_id": "Int64",
+        "name": "str",
+        "bewertung": "int",
+        "stern": "bool",
+    },
+    "ascents": {
+        "ascent_id": "Int64",
+        "route_id": "Int64",
+        "date": "date",
+        "climber_id": "str",
+        "bewertung": "int",
+        "kommentar": "str",
+    },
+    # Views aus sql/peak_summary.sql (serverseitiger Filtermodus, siehe server_query.py)
+    "peak_summary": {
+        "peak_id": "Int64",
+        "gipfel": "str",
+        "gebiet": "str",
+        "hoehe": "float",
+        "lat": "float",
+        "lon": "float",
+        "anzahl_routen": "int",
+        "peak_has_star": "bool",
+        "has_done_route": "bool",
+        "max_bewertung_per_peak": "int",
+        "kommentar": "str",
+    },
+    "peak_gebiete": {
+        "gebiet": "str",
+        "anzahl_gipfel": "int",
+        "min_hoehe": "float",
+        "max_hoehe": "float",
+    },
+}
+
+# --- Laden ---------------------------------
+def fetch_pages(table: str, columns: str = "*", query=None, page_size: int = PAGE_SIZE, key: str | None = None,
+                start: int = 0):
+    """
+    Liefert eine Tabelle Seite für Seite (Liste von dicts pro Seite) über range()-Anfragen.
+    `query` ist optional eine Funktion, die den Query-Builder weiter einschränkt (z.B. eq/gt).
+    `key` ist die Sortierspalte, nötig für Views (Tabellen: Primärschlüssel aus TABLE_KEYS).
+    `start` überspringt die ersten Zeilen (in der Reihenfolge von `key`).
+    """
+    key = key or TABLE_KEYS[table]
+    while True:
+        q = supabase.table(table).select(columns)
+        if query is not None:
+            q = query(q)
+        rows = q.order(key).range(start, start + page_size - 1).execute().data
+        if not rows:
+            break
+        yield rows
+        # Um die tatsächliche Anzahl weiterrücken: ist max_rows auf dem Server kleiner
+        # als page_size, geht so trotzdem keine Zeile verloren.
+        start += len(rows)
+
+
+def count_rows(table: str) -> int:
+    """Anzahl der Zeilen einer Tabelle (nur der Zähler, ohne die Daten zu übertragen)."""
+    key = TABLE_KEYS[table]
+    response = supabase.table(table).select(key, count="exact").limit(1).execute()
+    return response.count or 0
+
+
+def fetch_range(table: str, columns: str, start: int, end: int) -> list[dict]:
+    """Holt die Zeilen start..end (inklusive); kürzt der Server die Antwort, wird nachgeladen."""
+    key = TABLE_KEYS[table]
+    rows = []
+    while start <= end:
+        chunk = supabase.table(table).select(columns).order(key).range(start, end).execute().data
+        if not chunk:
+            break
+        rows.extend(chunk)
+        start += len(chunk)
+    return rows
+
+
+def fetch_tail(table: str, columns: str, start: int, page_size: int = PAGE_SIZE) -> list[dict]:
+    """Alle Zeilen ab `start` bis zum Ende – für Zeilen, die nach count_rows() dazugekommen sind."""
+    return [row for rows in fetch_pages(table, columns, page_size=page_size, start=start) for row in rows]
+
+
+def _result(future, deadline: float):
+    # Restzeit bis zur gemeinsamen Deadline; danach wirft result() einen TimeoutError
+    return future.result(timeout=max(0.0, deadline - time.monotonic()))
+
+
+def fetch_tables(specs: dict[str, str], max_workers: int = MAX_WORKERS,
+                 timeout: float = FETCH_TIMEOUT, page_size: int = PAGE_SIZE) -> dict[str, pd.DataFrame]:
+    """
+    Lädt mehrere Tabellen gleichzeitig. `specs` ordnet Tabellenname -> Spaltenauswahl zu.
+    Zuerst werden alle Zeilenzahlen parallel abgefragt, danach laufen alle Seiten aller
+    Tabellen über denselben Thread-Pool (höchstens max_workers Anfragen gleichzeitig).
+    Hinter der gezählten Länge wird weitergelesen, bis nichts mehr kommt: Zeilen, die
+    zwischen Zählen und Laden geschrieben wurden, fehlen so nicht.
+    Dauert alles zusammen länger als `timeout` Sekunden, wird ein TimeoutError geworfen.
+    """
+    deadline = time.monotonic() + timeout
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-fetch")
+    try:
+        counts = {table: pool.submit(count_rows, table) for table in specs}
+        jobs = {}
+        for table, columns in specs.items():
+            total = _result(counts[table], deadline)
+            jobs[table] = [
+                pool.submit(fetch_range, table, columns, start, min(start + page_size, total) - 1)
+                for start in range(0, total, page_size)
+            ] + [pool.submit(fetch_tail, table, columns, total, page_size)]
+
+        frames = {}
+        for table, futures in jobs.items():
+            # Seiten in Originalreihenfolge typisieren, sobald sie da sind
+            pages = [coerce_types(pd.DataFrame(rows), table) for rows in (_result(f, deadline) for f in futures) if rows]
+            # Leere Tabelle: trotzdem die angefragten Spalten (mit Typ) zurückgeben
+            if not pages:
+                frames[table] = empty_frame(table, specs[table])
+                continue
+            df = pd.concat(pages, ignore_index=True)
+            # Ein Insert mit kleinerer ID verschiebt die Offsets: dieselbe Zeile dann nur einmal
+            key = TABLE_KEYS[table]
+            if key in df.columns:
+                df = df.drop_duplicates(subset=[key], keep="last").reset_index(drop=True)
+            frames[table] = df
+        return frames
+    finally:
+        # Bei Timeout/Fehler keine weiteren Anfragen mehr starten
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def coerce_types(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    """Bringt die bekannten Spalten einer Tabelle auf ihren festen Typ."""
+    for col, dtype in SCHEMAS[table].items():
+        if col not in df.columns:
+            continue
+        if dtype == "bool":
+            df[col] = df[col].fillna(False).astype(bool)
+        elif dtype == "int":
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
+        elif dtype == "Int64":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+        elif dtype == "float":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
+        elif dtype == "date":
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+        elif dtype == "str":
+            df[col] = df[col].fillna("").astype(str)
+    return df
+
+
+def empty_frame(table: str, columns: str = "*") -> pd.DataFrame:
+    """Leerer Frame mit den Spalten einer Auswahl ("*" = alle aus SCHEMAS), typisiert wie geladene Daten."""
+    names = list(SCHEMAS[table]) if columns == "*" else columns.split(",")
+    return coerce_types(pd.DataFrame(columns=names), table)
+
+
+def shared_frame(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    """
+    Frame für den prozessweiten Cache: Text-Spalten Arrow-basiert (ab pandas 3 Standard, davor
+    sonst ein Python-Objekt pro Wert). Die Werte sind schon per coerce_types() ohne Lücken.
+    """
+    for col, dtype in SCHEMAS[table].items():
+        if dtype == "str" and col in df.columns and df[col].dtype == object:
+            df[col] = df[col].astype("string[pyarrow]")
+    return df
+
+
+def load_table(table: str, columns: str = "*", query=None) -> pd.DataFrame:
+    """Lädt eine komplette Tabelle; jede Seite wird direkt typisiert und am Ende zusammengefügt."""
+    frames = [coerce_types(pd.DataFrame(rows), table) for rows in fetch_pages(table, columns, query)]
+    if not frames:
+        return empty_frame(table, columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def select_list(columns, table: str) -> str:
+    """
+    Spaltenliste -> PostgREST-select; None bedeutet alle Spalten.
+    Der Primärschlüssel wird immer mitgeladen, er ist die Watermark für den Delta-Sync.
+    """
+    if not columns:
+        return "*"
+    key = TABLE_KEYS[table]
+    return ",".join(columns if key in columns else (key, *columns))
+
+
+# --- Lokaler Snapshot mit Delta-Sync -------
+def _watermark(df: pd.DataFrame, table: str):
+    """
+    (Spalte, Wert), ab dem beim nächsten Sync nachgeladen wird: 'updated_at', wenn die
+    Tabelle so eine Spalte mitliefert (erfasst auch geänderte Zeilen), sonst der Primärschlüssel.
+    """
+    column = "updated_at" if "updated_at" in df.columns else TABLE_KEYS[table]
+    if df.empty or column not in df.columns or df[column].isna().all():
+        return column, None
+    value = df[column].max()
+    return column, value if column == "updated_at" else int(value)
+
+
+def _id_gaps(start: int, end: int, ids, since: float) -> list[tuple[int, int, float]]:
+    """Bereiche (von, bis, seit) in [start, end], die keine der `ids` belegt."""
+    ids = np.unique(ids[(ids >= start) & (ids <= end)])
+    bounds = np.concatenate([[start - 1], ids, [end + 1]])
+    return [(int(bounds[i]) + 1, int(bounds[i + 1]) - 1, since) for i in np.flatnonzero(np.diff(bounds) > 1)]
+
+
+def snapshot_path(specs: dict[str, str]) -> str:
+    """Eigenes Unterverzeichnis je Spalten-Schema, damit sich Seiten nicht gegenseitig überschreiben."""
+    digest = hashlib.sha1(repr(sorted(specs.items())).encode()).hexdigest()[:12]
+    return os.path.join(SNAPSHOT_DIR, digest)
+
+
+def write_snapshot(frames: dict[str, pd.DataFrame], path: str):
+    """Schreibt die Frames als unkomprimierte Arrow-IPC-Dateien (erst .tmp, dann atomar umbenennen)."""
+    os.makedirs(path, exist_ok=True)
+    for table, df in frames.items():
+        target = os.path.join(path, f"{table}.arrow")
+        df.reset_index(drop=True).to_feather(target + ".tmp", compression="uncompressed")
+        os.replace(target + ".tmp", target)
+
+
+def read_snapshot(path: str, tables) -> dict[str, pd.DataFrame] | None:
+    """Liest einen kompletten Spiegel von der Platte; None, wenn (noch) keiner vollständig da ist."""
+    files = {table: os.path.join(path, f"{table}.arrow") for table in tables}
+    if not all(os.path.exists(f) for f in files.values()):
+        return None
+    return {
+        table: coerce_types(feather.read_table(f, memory_map=True).to_pandas(), table)
+        for table, f in files.items()
+    }
+
+
+# Fortlaufende Datenstände über alle Snapshots, damit abgeleitete Caches (z.B. die
+# Gipfel-Zusammenfassung) nach einem Reload nie einen alten Stand wiederverwenden
+_versions = itertools.count(1)
+
+
+class Snapshot:
+    """
+    Lokale Kopie von peaks/routes/ascents für ein Spalten-Schema, inkl. Watermark je Tabelle.
+    Die Frames gibt es einmal pro Prozess; ein Sync ersetzt sie, statt sie zu verändern.
+    """
+
+    def __init__(self, specs: dict[str, str]):
+        self.specs = specs
+        self.path = snapshot_path(specs) if SNAPSHOT_DIR else None
+        self.pending = {table: set() for table in specs}  # per upsert geänderte Schlüssel
+        self.gaps = {table: [] for table in specs}  # offene ID-Lücken, siehe GAP_TTL
+        self.stale = set()
+        self.reload = set()  # Tabellen, die komplett neu geladen werden (Änderung ohne Schlüssel)
+        # Änderungen aus anderen Threads (Schreibzugriffe, LISTEN-Thread); übernommen werden sie
+        # erst unter self.lock in apply_changes(), damit sync() nie parallel an pending/stale ändert
+        self.changes = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.version = next(_versions)
+        # Datenstand je Tabelle: abgeleitete Caches hängen nur an den Tabellen, die sie lesen
+        self.versions = {table: self.version for table in specs}
+        self._peak_index = None
+
+        frames = None
+        if self.path:
+            try:
+                frames = read_snapshot(self.path, specs)
+            except Exception as e:
+                logger.warning("Lokaler Snapshot in %s ist nicht lesbar, lade neu: %s", self.path, e)
+
+        if frames is None:
+            self.frames = {table: shared_frame(df, table) for table, df in fetch_tables(specs).items()}
+            self.watermarks = {table: _watermark(df, table) for table, df in self.frames.items()}
+            self.synced_at = time.monotonic()
+            self.save()
+        else:
+            # Sofort mit dem Stand von der Platte arbeiten, Abgleich mit Supabase im Hintergrund
+            self.frames = {table: shared_frame(df, table) for table, df in frames.items()}
+            self.watermarks = {table: _watermark(df, table) for table, df in self.frames.items()}
+            self.synced_at = time.monotonic()
+            threading.Thread(target=self._reconcile, name="snapshot-sync", daemon=True).start()
+
+    def _reconcile(self):
+        with self.lock:
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning("Abgleich des lokalen Snapshots mit Supabase fehlgeschlagen: %s", e)
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            write_snapshot(self.frames, self.path)
+        except Exception as e:
+            # Ohne beschreibbares Verzeichnis läuft alles weiter, nur ohne schnellen Kaltstart
+            logger.warning("Lokaler Snapshot konnte nicht geschrieben werden: %s", e)
+
+    def mark_stale(self, table: str, keys=()):
+        """
+        `keys`: geänderte Schlüssel (neue Zeilen findet der Sync auch ohne); None = alles neu laden.
+        Darf aus jedem Thread aufgerufen werden.
+        """
+        if table in self.specs:
+            self.changes.put((table, None if keys is None else list(keys)))
+
+    def apply_changes(self):
+        """Vorgemerkte Änderungen übernehmen; nur mit gehaltenem self.lock aufrufen."""
+        while True:
+            try:
+                table, keys = self.changes.get_nowait()
+            except queue.Empty:
+                return
+            self.stale.add(table)
+            if keys is None:
+                self.reload.add(table)
+            else:
+                self.pending[table].update(keys)
+
+    def peak_index(self) -> GridIndex | None:
+        """Räumlicher Index über lat/lon der Gipfel (ids = peak_id); None ohne Koordinaten-Spalten."""
+        if self._peak_index is None:
+            peaks = self.frames["peaks"]
+            if not {"peak_id", "lat", "lon"} <= set(peaks.columns):
+                return None
+            peaks = peaks[peaks["peak_id"].notna()]
+            self._peak_index = GridIndex(peaks["lat"], peaks["lon"], peaks["peak_id"].to_numpy(dtype="int64"))
+        return self._peak_index
+
+    def index_peaks(self, peaks: pd.DataFrame):
+        """Neue/geänderte Gipfel direkt in den räumlichen Index übernehmen (falls schon gebaut)."""
+        if self._peak_index is None or not {"peak_id", "lat", "lon"} <= set(peaks.columns):
+            return
+        peaks = coerce_types(peaks.copy(), "peaks")
+        # Ohne Koordinaten (z.B. Upsert nur des Namens) bleibt der Gipfel, wo er ist
+        peaks = peaks[peaks["peak_id"].notna() & peaks["lat"].notna() & peaks["lon"].notna()]
+        self._peak_index.insert(peaks["lat"], peaks["lon"], peaks["peak_id"].to_numpy(dtype="int64"))
+
+    def sync(self, tables=None):
+        """
+        Holt pro Tabelle nur Zeilen jenseits der Watermark und mischt sie in den Snapshot
+        (Tabellen in self.reload werden komplett neu geladen). Nur mit gehaltenem self.lock.
+        """
+        self.apply_changes()
+        for table in tables or self.specs:
+            if table in self.reload:
+                self.reload.discard(table)
+                self._replace(table, load_table(table, self.specs[table]))
+                if table == "peaks":
+                    self._peak_index = None  # beim nächsten Zugriff aus den neuen Gipfeln gebaut
+            else:
+                self._merge_delta(table)
+            self.pending[table].clear()
+            self.stale.discard(table)
+        self.synced_at = time.monotonic()
+        self.save()
+
+    def _merge_delta(self, table: str):
+        key = TABLE_KEYS[table]
+        column, value = self.watermarks[table]
+        query = None
+        if value is not None:
+            query = lambda q, column=column, value=value: q.gt(column, value)
+        delta = load_table(table, self.specs[table], query)
+
+        # Per upsert überschriebene, ältere Zeilen (nur bei Schlüssel-Watermark nötig)
+        keys = sorted(k for k in self.pending[table] if column == key and value is not None and k <= value)
+        if keys:
+            changed = [
+                load_table(table, self.specs[table], lambda q, chunk=keys[i:i + IN_CHUNK]: q.in_(key, chunk))
+                for i in range(0, len(keys), IN_CHUNK)
+            ]
+            delta = pd.concat([delta, *changed], ignore_index=True)
+        if column == key and value is not None:
+            delta = pd.concat([delta, self._fill_gaps(table, value, delta)], ignore_index=True)
+
+        if not delta.empty:
+            if table == "peaks":
+                self.index_peaks(delta)
+            merged = pd.concat([self.frames[table], delta], ignore_index=True)
+            merged = merged.drop_duplicates(subset=[key], keep="last").reset_index(drop=True)
+            self._replace(table, merged)
+
+    def _fill_gaps(self, table: str, watermark: int, delta: pd.DataFrame) -> pd.DataFrame:
+        """
+        Lädt Zeilen nach, die inzwischen in offenen ID-Lücken unter der Watermark committet
+        wurden, und merkt sich die neuen Lücken zwischen alter Watermark und `delta`.
+        """
+        key = TABLE_KEYS[table]
+        now = time.monotonic()
+        gaps = [gap for gap in self.gaps[table] if now - gap[2] < GAP_TTL]
+        found = [
+            load_table(table, self.specs[table], lambda q, start=start, end=end: q.gte(key, start).lte(key, end))
+            for start, end, _ in gaps
+        ]
+        filled = pd.concat(found, ignore_index=True) if found else delta.iloc[:0]
+
+        ids = pd.concat([delta[key], filled[key]]).dropna().to_numpy(dtype="int64")
+        remaining = [gap for start, end, since in gaps for gap in _id_gaps(start, end, ids, since)]
+        if len(delta):
+            remaining += _id_gaps(watermark + 1, int(ids.max()), ids, now)
+        # Bei sehr vielen Lücken nur die jüngsten (höchsten) weiter verfolgen
+        self.gaps[table] = sorted(remaining)[-MAX_GAPS:]
+        return filled
+
+    def _replace(self, table: str, df: pd.DataFrame):
+        """Neuer Stand einer Tabelle: Frame ersetzen (nie verändern) und deren Version erhöhen."""
+        if df.empty and table in self.frames:
+            df = self.frames[table].iloc[:0]
+        self.frames[table] = shared_frame(coerce_types(df, table), table)
+        self.watermarks[table] = _watermark(self.frames[table], table)
+        self.version = self.versions[table] = next(_versions)
+
+
+# Verhindert, dass zwei Sessions gleichzeitig denselben Snapshot komplett laden
+_snapshots_lock = threading.Lock()
+
+
+@st.cache_resource
+def _snapshots() -> dict:
+    # Prozessweit: Spalten-Schema -> Snapshot
+    return {}
+
+
+def mark_stale(table: str, keys=()):
+    """Merkt sich in allen Snapshots, dass `table` sich geändert hat (nächster Zugriff lädt das Delta)."""
+    for snapshot in _snapshots().values():
+        snapshot.mark_stale(table, keys)
+
+
+def _apply_change(table: str, keys, climbers):
+    # Abonnent des Änderungs-Feeds: Snapshots und gecachte Begehungen der Kletterer veralten lassen
+    mark_stale(table, keys)
+    if table == "ascents":
+        versions = _climber_versions()
+        for climber_id in ([ALL_CLIMBERS] if climbers is None else climbers):
+            versions[climber_id] = versions.get(climber_id, 0) + 1
+
+
+@st.cache_resource
+def _change_feed():
+    # Prozessweit ein Feed (mit CHANGE_FEED_DSN: ein LISTEN-Thread pro Worker)
+    feed = create_change_feed()
+    feed.subscribe(_apply_change)
+    return feed
+
+
+def publish_change(table: str, keys=(), climbers=None):
+    """
+    Meldet einen Schreibzugriff an alle Caches: `keys` sind die geschriebenen Schlüssel
+    (None = unbekannt, Tabelle komplett neu laden), `climbers` die betroffenen Kletterer.
+    Jeder Schreibzugriff über db.py ruft das auf; andere Worker erfahren es über den
+    Postgres-Feed (sql/change_feed.sql).
+    """
+    _change_feed().publish(table, keys, climbers)
+
+
+def reload_tables():
+    """
+    Verwirft alle Snapshots samt Spiegel auf der Platte; der nächste Zugriff lädt wieder
+    komplett (z.B. nach Löschungen).
+    """
+    for snapshot in _snapshots().values():
+        if snapshot.path and os.path.isdir(snapshot.path):
+            for name in os.listdir(snapshot.path):
+                os.remove(os.path.join(snapshot.path, name))
+    _snapshots().clear()
+
+
+def get_snapshot(columns: dict[str, tuple] | None = None, sync_interval: float = SYNC_INTERVAL,
+                 tables=tuple(TABLE_KEYS)) -> Snapshot:
+    """
+    Gemeinsamer, einmal pro Prozess geladener Snapshot für ein Spalten-Schema.
+    `columns` ist das Spalten-Schema der Seite (Tabelle -> Spalten); es werden nur diese
+    Spalten übertragen. Seiten mit demselben Schema teilen sich denselben Snapshot.
+    `tables` schränkt die Tabellen ein (z.B. CATALOG_TABLES im Mehrbenutzer-Modus).
+    Danach werden nur noch neue bzw. geänderte Zeilen nachgeladen: alle `sync_interval`
+    Sekunden für alle Tabellen, nach einem Schreibzugriff sofort für die betroffene Tabelle.
+    Die Frames des Snapshots dürfen nicht verändert werden (dafür gibt es load_tables()).
+    """
+    columns = columns or {}
+    specs = {table: select_list(columns.get(table), table) for table in tables}
+    _change_feed()  # ab dem ersten Zugriff auf Änderungen anderer Worker hören
+    snapshots = _snapshots()
+    schema = tuple(specs.items())
+
+    with _snapshots_lock:
+        snapshot = snapshots.get(schema)
+        if snapshot is None:
+            with st.spinner("Lade Gipfel, Routen und Begehungen ..."), span("load") as record:
+                snapshot = snapshots[schema] = Snapshot(specs)
+                record["rows"] = sum(len(df) for df in snapshot.frames.values())
+
+    # Läuft gerade ein (Hintergrund-)Abgleich, wird ohne Warten der bisherige Stand ausgeliefert
+    if snapshot.lock.acquire(blocking=False):
+        try:
+            snapshot.apply_changes()
+            if time.monotonic() - snapshot.synced_at > sync_interval:
+                with span("sync"):
+                    snapshot.sync()
+            elif snapshot.stale:
+                with span("sync", tables=sorted(snapshot.stale)):
+                    snapshot.sync(sorted(snapshot.stale))
+        finally:
+            snapshot.lock.release()
+    return snapshot
+
+
+def get_peak_index(columns: dict[str, tuple] | None = None) -> GridIndex | None:
+    """Räumlicher Index über die Gipfel des Snapshots (ids = peak_id), siehe spatial_index.GridIndex."""
+    return get_snapshot(columns).peak_index()
+
+
+def _copy_on_write() -> bool:
+    """Ab pandas 3 immer an; davor nur, wenn der Einstiegspunkt (app.py) es eingeschaltet hat."""
+    return int(pd.__version__.split(".")[0]) >= 3 or pd.get_option("mode.copy_on_write") is True
+
+def page_frames(columns: dict[str, tuple] | None = None, climber_id: str | None = None,
+                sync_interval: float = SYNC_INTERVAL):
+    """
+    (schema, version, peaks, routes, ascents) für Caches über alle drei Tabellen.
+    Mit MULTI_USER=1 nur der Katalog-Snapshot plus die Begehungen von `climber_id` (ohne: keine);
+    `version` enthält dann auch climber_id und deren Stand. Die Frames nicht verändern.
+    """
+    if MULTI_USER:
+        catalog = get_snapshot(columns, sync_interval, tables=CATALOG_TABLES)
+        frames = catalog.frames
+        # Version vor den Begehungen lesen (wie beim Snapshot): höchstens einmal zu viel gerechnet
+        version = (catalog.version, climber_id, climber_version(climber_id))
+        ascents_columns = (columns or {}).get("ascents")
+        ascents = get_climber_ascents(climber_id, ascents_columns)
+        schema = repr((sorted(catalog.specs.items()), select_list(ascents_columns, "ascents")))
+        return schema, version, frames["peaks"], frames["routes"], ascents
+    snapshot = get_snapshot(columns, sync_interval)
+    version = snapshot.version
+    frames = snapshot.frames
+    return repr(sorted(snapshot.specs.items())), version, frames["peaks"], frames["routes"], frames["ascents"]
+
+def load_tables(columns: dict[str, tuple] | None = None, sync_interval: float = SYNC_INTERVAL,
+                climber_id: str | None = None, tables=tuple(TABLE_KEYS)):
+    """
+    Die Frames von `tables` (Standard: peaks, routes, ascents) in dieser Reihenfolge für das
+    Spalten-Schema der Seite (siehe get_snapshot()). Seiten ohne Begehungen übergeben
+    tables=CATALOG_TABLES, dann werden ascents gar nicht erst geladen.
+    Mit MULTI_USER=1 sind es nur die Begehungen von `climber_id` (siehe page_frames()).
+    """
+    if "ascents" in tables:
+        _, _, *loaded = page_frames(columns, climber_id, sync_interval)
+        frames = [dict(zip(TABLE_KEYS, loaded))[table] for table in tables]
+    else:
+        snapshot = get_snapshot(columns, sync_interval, tables=tuple(tables))
+        frames = [snapshot.frames[table] for table in tables]
+    # Mit Copy-on-Write flache Kopien (pandas kopiert erst, wenn eine Seite etwas ändert), sonst
+    # echte Kopien – der Snapshot selbst bleibt so oder so unverändert
+    deep = not _copy_on_write()
+    return tuple(df.copy(deep=deep) for df in frames)
+
+# --- IDs -----------------------------------
+# Höchstens so viele IDs pro RPC-Aufruf (Grenze in sql/reserve_ids.sql)
+RESERVE_LIMIT = 10_000
+
+def reserve_ids(table: str, n: int) -> list[int]:
+    """
+    n neue Schlüssel für `table` aus der Sequenz der Datenbank (RPC reserve_ids, sql/reserve_ids.sql).
+    Parallele Importe bekommen nie dieselbe ID – kein "höchste ID + 1" mehr.
+    """
+    ids = []
+    while len(ids) < n:
+        count = min(RESERVE_LIMIT, n - len(ids))
+        batch = supabase.rpc("reserve_ids", {"table_name": table, "n": count}).execute().data or []
+        # Fehlt die Funktion oder das Recht, kommt nichts zurück – sonst liefe die Schleife endlos
+        if len(batch) != count:
+            raise RuntimeError(f"reserve_ids({table!r}, {count}) lieferte {len(batch)} IDs "
+                               f"(sql/reserve_ids.sql ausgeführt?)")
+        ids += batch
+    return ids
+
 # --- Peaks ---------------------------------
 def upsert_peaks(records: list[dict]):
-    return supabase.table("peaks").upsert(records).execute()
+    response = supabase.table("peaks").upsert(records).execute()
+    publish_change("peaks", [r["peak_id"] for r in records if r.get("peak_id") is not None])
+    # Neue Koordinaten sofort für Ausschnitt- und Klick-Abfragen, ohne auf den Sync zu warten
+    for snapshot in _snapshots().values():
+        snapshot.index_peaks(pd.DataFrame(records))
+    return response
 
 def get_all_peaks():
-    return supabase.table("peaks").select("*").execute().data
+    return [row for rows in fetch_pages("peaks") for row in rows]
+
+# --- Routes --------------------------------
+def upsert_routes(records: list[dict]):
+    response = supabase.table("routes").upsert(records).execute()
+    publish_change("routes", [r["route_id"] for r in records if r.get("route_id") is not None])
+    return response
 
 # --- Ascents -------------------------------
 def insert_ascents(records: list[dict]):
-    return supabase.table("ascents").insert(records).execute()
+    response = supabase.table("ascents").insert(records).execute()
+    # Gecachte Begehungen der betroffenen Kletterer werden beim nächsten Zugriff neu geladen
+    publish_change("ascents", [r["ascent_id"] for r in records if r.get("ascent_id") is not None],
+                   sorted({r.get("climber_id") for r in records}, key=str))
+    return response
+
+def get_user_ascents(climber_id: str | None = None):
+    """Begehungen eines Kletterers (Spalte climber_id wie in SCHEMAS, früher user_id); None = alle."""
+    query = None
+    if climber_id:
+        query = lambda q: q.eq("climber_id", climber_id)
+    return [row for rows in fetch_pages("ascents", query=query) for row in rows]
+
+# Schlüssel in _climber_versions() für Änderungen, deren Kletterer unbekannt sind (betrifft alle)
+ALL_CLIMBERS = "*"
+
+@st.cache_resource
+def _climber_versions() -> dict:
+    # Prozessweit: climber_id -> Anzahl Schreibzugriffe (Teil des Cache-Schlüssels)
+    return {}
+
+def climber_version(climber_id: str | None) -> int:
+    versions = _climber_versions()
+    return versions.get(climber_id, 0) + versions.get(ALL_CLIMBERS, 0)
+
+@st.cache_data(ttl=SYNC_INTERVAL, max_entries=256, show_spinner=False)
+def _fetch_climber_ascents(climber_id: str, columns: str, version: int) -> pd.DataFrame:
+    frames = [
+        coerce_types(pd.DataFrame(rows), "ascents")
+        for rows in fetch_pages("ascents", columns, lambda q: q.eq("climber_id", climber_id))
+    ]
+    if frames:
+        return pd.concat(frames, ignore_index=True)
+    return empty_frame("ascents", columns)
 
-def get_user_ascents(user_id: str | None = None):
-    q = supabase.table("ascents").select("*")
-    if user_id:
-        q = q.eq("user_id", user_id)
-    return q.execute().data
+def get_climber_ascents(climber_id: str | None, columns=None) -> pd.DataFrame:
+    """
+    Nur die Begehungen eines Kletterers (Spalten wie bei get_snapshot()), gecacht pro climber_id
+    und neu geladen nach insert_ascents() für diesen Kletterer. Ohne climber_id: leer.
+    """
+    spec = select_list(columns, "ascents")
+    if not climber_id:
+        return empty_frame("ascents", spec)
+    with span("climber_ascents", climber_id=climber_id) as record:
+        ascents = _fetch_climber_ascents(climber_id, spec, climber_version(climber_id))
+        record["rows"] = len(ascents)
+    return ascents
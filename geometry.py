@@ -0,0 +1,213 @@
+# Dreiecks-Geometrie für die Gipfelkarten – alles als NumPy-Arrays statt Zeile für Zeile
+import folium
+import numpy as np
+import pandas as pd
+
+# Diese Spalten braucht jedes Dreieck (Koordinaten, Größe und Tooltip)
+REQUIRED_COLUMNS = ["lat", "lon", "hoehe", "anzahl_routen", "gipfel", "gebiet"]
+
+# Ab dieser Zoomstufe werden immer einzelne Gipfel gezeichnet, darunter Gitterzellen –
+# aber erst, wenn mehr als CLUSTER_MIN_PEAKS Gipfel auf der Karte wären
+DETAIL_ZOOM = 13
+CLUSTER_MIN_PEAKS = 1000
+
+# Farbe einer Zelle nach denselben Regeln wie peak_colors() (schwarz vor lila vor rot):
+# schwarz ab diesem Anteil gekletterter Gipfel, lila schon bei einem Gipfel mit Stern
+CLUSTER_DONE_SHARE = 0.5
+
+# Eckpunkte eines gleichseitigen Dreiecks (Spitze nach oben) relativ zur Größe
+_DLAT = np.array([1.0, -0.5, -0.5])
+_DLON = np.array([0.0, -np.sqrt(3) / 2, np.sqrt(3) / 2])
+
+
+def triangle_size(hoehe):
+    """Dreiecksgröße in Grad; wächst mit der Felshöhe (0.001 Grad = ~100 m)."""
+    return 0.0012 + hoehe * 0.00011
+
+
+def triangle_vertices(lat, lon, size) -> np.ndarray:
+    """(n, 3, 2)-Array mit [lat, lon] der drei Ecken je Gipfel."""
+    lat = np.asarray(lat, dtype=float)[:, None]
+    lon = np.asarray(lon, dtype=float)[:, None]
+    size = np.asarray(size, dtype=float)[:, None]
+    return np.stack([lat + size * _DLAT, lon + size * _DLON], axis=-1)
+
+
+def peak_colors(peaks_df: pd.DataFrame) -> np.ndarray:
+    """rot = normal, lila = hat eine Sternchen-Route, schwarz = schon geklettert (hat Vorrang)."""
+    n = len(peaks_df)
+    star = peaks_df["peak_has_star"].to_numpy(dtype=bool) if "peak_has_star" in peaks_df.columns else np.zeros(n, bool)
+    done = peaks_df["has_done_route"].to_numpy(dtype=bool) if "has_done_route" in peaks_df.columns else np.zeros(n, bool)
+    return np.select([done, star], ["black", "purple"], default="red")
+
+
+def peak_tooltips(peaks_df: pd.DataFrame, hoehe: pd.Series) -> np.ndarray:
+    """HTML-Tooltips für alle Gipfel auf einmal (gleicher Inhalt wie bisher pro Zeile)."""
+    tooltip = (
+        "<b>" + peaks_df["gipfel"].astype(str) + "</b><br>"
+        + "Height: " + hoehe.astype(int).astype(str) + " m<br>"
+        + "Routes: " + peaks_df["anzahl_routen"].astype(int).astype(str) + "<br>"
+        + "Area: " + peaks_df["gebiet"].astype(str)
+    )
+    if "peak_has_star" in peaks_df.columns:
+        tooltip += np.where(peaks_df["peak_has_star"].to_numpy(dtype=bool), "<br>Star: ⭐", "<br>Star: No")
+    if "has_done_route" in peaks_df.columns:
+        tooltip += np.where(peaks_df["has_done_route"].to_numpy(dtype=bool), "<br>Climbed: ✅", "<br>Climbed: ❌")
+    if "kommentar" in peaks_df.columns:
+        kommentar = peaks_df["kommentar"].fillna("").astype(str)
+        tooltip += np.where(kommentar != "", "<br>Comment: " + kommentar, "")
+    return tooltip.to_numpy(dtype=object)
+
+
+def build_triangles(peaks_df: pd.DataFrame) -> dict:
+    """
+    Alle Dreiecke einer (gefilterten) Gipfeltabelle in einem Durchlauf:
+    peak_id, coords (n, 3, 2), size, fill_color und tooltip als Arrays gleicher Länge.
+    Gipfel mit fehlenden Pflichtwerten oder ungültiger Höhe werden weggelassen.
+    """
+    if peaks_df.empty or not all(col in peaks_df.columns for col in REQUIRED_COLUMNS):
+        return _empty_triangles()
+
+    hoehe = pd.to_numeric(peaks_df["hoehe"], errors="coerce")
+    lat = pd.to_numeric(peaks_df["lat"], errors="coerce")
+    lon = pd.to_numeric(peaks_df["lon"], errors="coerce")
+    size = triangle_size(hoehe)
+    valid = (
+        peaks_df[REQUIRED_COLUMNS].notna().all(axis=1)
+        & lat.notna() & lon.notna() & (hoehe >= 0) & (size > 0)
+    ).to_numpy(dtype=bool)
+
+    rows = peaks_df[valid]
+    return {
+        "peak_id": (rows["peak_id"] if "peak_id" in rows.columns else pd.Series(np.flatnonzero(valid))).to_numpy(dtype=object),
+        "coords": triangle_vertices(lat[valid], lon[valid], size[valid]),
+        "size": size[valid].to_numpy(dtype=float),
+        "fill_color": peak_colors(rows).astype(object),
+        "tooltip": peak_tooltips(rows, hoehe[valid]),
+    }
+
+
+def _empty_triangles() -> dict:
+    return {"peak_id": np.array([], dtype=object), "coords": np.empty((0, 3, 2)), "size": np.array([]),
+            "fill_color": np.array([], dtype=object), "tooltip": np.array([], dtype=object)}
+
+
+def concat_triangles(*parts: dict) -> dict:
+    """Hängt mehrere Dreiecks-Sätze (gleiche Schlüssel) aneinander."""
+    return {key: np.concatenate([part[key] for part in parts]) for key in _empty_triangles()}
+
+
+def cell_size(zoom: int) -> float:
+    """Kantenlänge einer Gitterzelle in Grad (~2 km bei Zoom 12), verdoppelt sich pro Zoomstufe nach außen."""
+    return 0.02 * 2.0 ** (DETAIL_ZOOM - 1 - zoom)
+
+
+def cluster_triangles(peaks_df: pd.DataFrame, zoom: int) -> dict:
+    """
+    Fasst die Gipfel in Gitterzellen passend zur Zoomstufe zusammen: ein Dreieck pro Zelle,
+    Größe nach dem höchsten Felsen (mindestens ein Drittel der Zelle), Farbe wie bei
+    einzelnen Gipfeln – schwarz, wenn mindestens CLUSTER_DONE_SHARE der Gipfel geklettert
+    sind, sonst lila, wenn einer einen Stern hat, sonst rot. Zellen mit nur einem Gipfel
+    bleiben ein normales Dreieck.
+    """
+    if peaks_df.empty or not all(col in peaks_df.columns for col in REQUIRED_COLUMNS):
+        return _empty_triangles()
+
+    lat = pd.to_numeric(peaks_df["lat"], errors="coerce")
+    lon = pd.to_numeric(peaks_df["lon"], errors="coerce")
+    hoehe = pd.to_numeric(peaks_df["hoehe"], errors="coerce")
+    valid = (lat.notna() & lon.notna() & (hoehe >= 0)).to_numpy(dtype=bool)
+    n = len(peaks_df)
+    star = peaks_df["peak_has_star"].to_numpy(dtype=bool) if "peak_has_star" in peaks_df.columns else np.zeros(n, bool)
+    done = peaks_df["has_done_route"].to_numpy(dtype=bool) if "has_done_route" in peaks_df.columns else np.zeros(n, bool)
+
+    cell = cell_size(zoom)
+    points = pd.DataFrame({
+        "gx": np.floor(lon.to_numpy(dtype=float) / cell),
+        "gy": np.floor(lat.to_numpy(dtype=float) / cell),
+        "lat": lat.to_numpy(dtype=float), "lon": lon.to_numpy(dtype=float),
+        "hoehe": hoehe.to_numpy(dtype=float), "star": star, "done": done,
+    })[valid]
+    cells = points.groupby(["gy", "gx"]).agg(
+        count=("lat", "size"), lat=("lat", "mean"), lon=("lon", "mean"),
+        hoehe=("hoehe", "max"), star=("star", "mean"), done=("done", "mean"),
+    )
+
+    # Einzelne Gipfel in ihrer Zelle weiterhin mit eigenem Dreieck und Tooltip
+    cell_count = points.groupby(["gy", "gx"])["lat"].transform("size")
+    singles = build_triangles(peaks_df[valid][(cell_count == 1).to_numpy()])
+    cells = cells[cells["count"] > 1]
+    if cells.empty:
+        return singles
+
+    size = np.maximum(triangle_size(cells["hoehe"]).to_numpy(), cell / 3)
+    fill_color = np.select([cells["done"] >= CLUSTER_DONE_SHARE, cells["star"] > 0], ["black", "purple"], default="red")
+    tooltip = (
+        "<b>" + cells["count"].astype(str) + " peaks</b><br>"
+        + "Max height: " + cells["hoehe"].astype(int).astype(str) + " m<br>"
+        + "Star: " + (cells["star"] * 100).round().astype(int).astype(str) + " %<br>"
+        + "Climbed: " + (cells["done"] * 100).round().astype(int).astype(str) + " %<br>"
+        + "<i>Zoom in for single peaks</i>"
+    )
+    clusters = {
+        "peak_id": np.full(len(cells), None, dtype=object),
+        "coords": triangle_vertices(cells["lat"], cells["lon"], size),
+        "size": size,
+        "fill_color": fill_color.astype(object),
+        "tooltip": tooltip.to_numpy(dtype=object),
+    }
+    return concat_triangles(clusters, singles)
+
+
+def build_map_triangles(peaks_df: pd.DataFrame, zoom: int) -> dict:
+    """Detailgrad nach Zoom: einzelne Gipfel ab DETAIL_ZOOM oder bei wenigen Gipfeln, sonst Zellen."""
+    if zoom >= DETAIL_ZOOM or len(peaks_df) <= CLUSTER_MIN_PEAKS:
+        return build_triangles(peaks_df)
+    return cluster_triangles(peaks_df, zoom)
+
+
+def triangles_geojson(triangles: dict) -> dict:
+    """
+    Alle Dreiecke als eine GeoJSON-FeatureCollection. Farbe und Tooltip stehen in den
+    properties jedes Features, damit Stil und Tooltip der Ebene daraus gelesen werden.
+    """
+    # GeoJSON will [lon, lat] und geschlossene Ringe (erster Punkt = letzter Punkt)
+    rings = triangles["coords"][:, :, ::-1]
+    rings = np.concatenate([rings, rings[:, :1]], axis=1).round(6).tolist()
+    peak_ids = [None if pd.isna(p) else int(p) for p in triangles["peak_id"]]
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Polygon", "coordinates": [ring]},
+                "properties": {"peak_id": peak_id, "fill_color": fill_color, "tooltip": tooltip},
+            }
+            for ring, peak_id, fill_color, tooltip
+            in zip(rings, peak_ids, triangles["fill_color"], triangles["tooltip"])
+        ],
+    }
+
+
+def _triangle_style(feature):
+    return {
+        "stroke": False,
+        "fillColor": feature["properties"]["fill_color"],
+        "fillOpacity": 0.89,
+    }
+
+
+def add_triangles(m: folium.Map, triangles: dict) -> int:
+    """
+    Fügt die vorberechneten Dreiecke als EINE GeoJSON-Ebene zur Karte hinzu (statt einem
+    folium.Polygon + Tooltip pro Gipfel); gibt die Anzahl der Dreiecke zurück.
+    """
+    if len(triangles["tooltip"]) == 0:
+        return 0
+    folium.GeoJson(
+        triangles_geojson(triangles),
+        name="Gipfel",
+        style_function=_triangle_style,
+        tooltip=folium.GeoJsonTooltip(fields=["tooltip"], labels=False, sticky=True),
+    ).add_to(m)
+    return len(triangles["tooltip"])
@@ -0,0 +1,210 @@
+# CSV-Import in Supabase: in Stücken lesen, prüfen/typisieren, in parallelen Batches schreiben
+#
+#   python importer.py routes append_routes.csv --batch-size 500 --workers 4
+#
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import time
+
+import pandas as pd
+
+import db
+
+# Standardwerte für Seite und CLI
+CHUNK_SIZE = 10_000   # Zeilen, die auf einmal aus der CSV gelesen werden
+BATCH_SIZE = 500      # Zeilen pro Schreibanfrage
+WORKERS = 4           # gleichzeitige Schreibanfragen
+RETRIES = 3           # weitere Versuche für einen fehlgeschlagenen Batch
+RETRY_DELAY = 1.0     # Sekunden vor dem ersten Wiederholen, danach verdoppelt
+
+# Schreibfunktion je Tabelle
+WRITERS = {
+    "peaks": db.upsert_peaks,
+    "routes": db.upsert_routes,
+    "ascents": db.insert_ascents,
+}
+
+# Spalten, ohne die eine Zeile nicht importiert wird. Der Schlüssel (db.TABLE_KEYS) darf fehlen:
+# leere IDs vergibt die Datenbank über db.reserve_ids()
+REQUIRED = {
+    "peaks": ("gipfel",),
+    "routes": ("peak_id",),
+    "ascents": ("route_id",),
+}
+
+_TRUE = {"true", "1", "yes", "ja", "x", "t", "y", "wahr"}
+_FALSE = {"false", "0", "no", "nein", "", "f", "n", "falsch", "nan", "none"}
+
+
+def parse_bool(values: pd.Series) -> pd.Series:
+    """Text -> bool; unbekannte Werte werden NA (und die Zeile damit ungültig)."""
+    text = values.astype(str).str.strip().str.lower()
+    return text.map(lambda v: True if v in _TRUE else False if v in _FALSE else None)
+
+
+def validate(chunk: pd.DataFrame, table: str, first_row: int = 0) -> tuple[pd.DataFrame, list[str]]:
+    """
+    Bringt ein CSV-Stück auf die Typen aus db.SCHEMAS. Unbekannte Spalten fallen weg;
+    Zeilen mit fehlenden Pflichtwerten oder nicht lesbaren Werten werden aussortiert.
+    Gibt (gültige Zeilen, Fehlermeldungen mit Zeilennummer der CSV) zurück.
+    """
+    schema = db.SCHEMAS[table]
+    missing = [col for col in REQUIRED[table] if col not in chunk.columns]
+    if missing:
+        raise ValueError(f"Spalten fehlen in der CSV für '{table}': {', '.join(missing)}")
+
+    chunk = chunk[[col for col in chunk.columns if col in schema]]
+    out = pd.DataFrame(index=chunk.index)
+    invalid = pd.Series("", index=chunk.index)
+    for col in chunk.columns:
+        raw = chunk[col]
+        given = raw.notna() & (raw.astype(str).str.strip() != "")
+        dtype = schema[col]
+        if dtype == "bool":
+            value = parse_bool(raw)
+            bad = value.isna()
+            value = value.fillna(False).astype(bool)
+        elif dtype in ("int", "Int64"):
+            number = pd.to_numeric(raw, errors="coerce")
+            bad = given & (number.isna() | (number != number.round()))
+            value = number.where(~bad).round().astype("Int64")
+        elif dtype == "float":
+            value = pd.to_numeric(raw, errors="coerce")
+            bad = given & value.isna()
+        elif dtype == "date":
+            parsed = pd.to_datetime(raw, errors="coerce")
+            bad = given & parsed.isna()
+            value = parsed.dt.strftime("%Y-%m-%d")
+        else:
+            value = raw.where(given, None).astype(object)
+            bad = pd.Series(False, index=chunk.index)
+        if col in REQUIRED[table]:
+            bad = bad | ~given
+        invalid[bad] = invalid[bad] + f"{col} "
+        out[col] = value
+
+    errors = [
+        f"Zeile {first_row + pos + 2}: ungültig/fehlend: {cols.strip()}"  # +2: Kopfzeile, 1-basiert
+        for pos, cols in enumerate(invalid) if cols
+    ]
+    return out[invalid == ""].copy(), errors
+
+
+def assign_ids(valid: pd.DataFrame, table: str) -> int:
+    """Füllt fehlende Schlüssel mit reservierten IDs (ein RPC-Aufruf pro Stück); gibt die Anzahl zurück."""
+    key = db.TABLE_KEYS[table]
+    if key not in valid.columns:
+        valid.insert(0, key, pd.array([pd.NA] * len(valid), dtype="Int64"))
+    missing = valid[key].isna()
+    count = int(missing.sum())
+    if count:
+        valid.loc[missing, key] = db.reserve_ids(table, count)
+    return count
+
+
+def to_records(df: pd.DataFrame) -> list[dict]:
+    """JSON-taugliche dicts (NA -> None, NumPy-Typen -> Python)."""
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def read_chunks(source, table: str, chunk_size: int = CHUNK_SIZE):
+    """Liest die CSV stückweise (beliebig groß) und liefert (gültige Zeilen, Fehler) pro Stück."""
+    first_row = 0
+    for chunk in pd.read_csv(source, chunksize=chunk_size, dtype=str, keep_default_na=False,
+                             skipinitialspace=True):
+        valid, errors = validate(chunk.reset_index(drop=True), table, first_row)
+        first_row += len(chunk)
+        yield valid, errors
+
+
+def write_batch(table: str, records: list[dict], retries: int = RETRIES, retry_delay: float = RETRY_DELAY):
+    """Schreibt einen Batch; schlägt er fehl, wird bis zu `retries`-mal mit wachsender Pause wiederholt."""
+    for attempt in range(retries + 1):
+        try:
+            return WRITERS[table](records)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(retry_delay * 2 ** attempt)
+
+
+def import_csv(source, table: str, batch_size: int = BATCH_SIZE, workers: int = WORKERS,
+               retries: int = RETRIES, chunk_size: int = CHUNK_SIZE, progress=None) -> dict:
+    """
+    Importiert eine CSV (Pfad oder Datei-Objekt) in `table`. Geschrieben wird in Batches zu
+    `batch_size` Zeilen, höchstens `workers` gleichzeitig; es sind nie mehr als 2 * workers
+    Batches unterwegs, so bleibt der Speicher auch bei sehr großen Dateien klein.
+    `progress(stats)` wird nach jedem fertigen Batch aufgerufen (im aufrufenden Thread).
+    Zeilen ohne Schlüssel bekommen vorab reservierte IDs, damit parallele Importe nicht kollidieren.
+    Ergebnis: dict mit rows, written, invalid, failed, reserved, seconds, rows_per_second, errors.
+    """
+    if table not in WRITERS:
+        raise ValueError(f"Unbekannte Tabelle: {table}")
+    stats = {"rows": 0, "written": 0, "invalid": 0, "failed": 0, "reserved": 0, "seconds": 0.0, "rows_per_second": 0.0, "errors": []}
+    started = time.monotonic()
+    pending = {}
+
+    def collect(done):
+        for future in done:
+            size = pending.pop(future)
+            try:
+                future.result()
+                stats["written"] += size
+            except Exception as e:
+                stats["failed"] += size
+                stats["errors"].append(f"Batch mit {size} Zeilen fehlgeschlagen: {e}")
+        stats["seconds"] = time.monotonic() - started
+        stats["rows_per_second"] = stats["written"] / stats["seconds"] if stats["seconds"] else 0.0
+        if progress is not None:
+            progress(stats)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import") as pool:
+        for valid, errors in read_chunks(source, table, chunk_size):
+            stats["rows"] += len(valid) + len(errors)
+            stats["invalid"] += len(errors)
+            stats["errors"].extend(errors)
+            stats["reserved"] += assign_ids(valid, table)
+            records = to_records(valid)
+            for start in range(0, len(records), batch_size):
+                if len(pending) >= 2 * workers:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                batch = records[start:start + batch_size]
+                pending[pool.submit(write_batch, table, batch, retries)] = len(batch)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    stats["seconds"] = time.monotonic() - started
+    stats["rows_per_second"] = stats["written"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CSV-Dateien in Supabase importieren (peaks, routes, ascents).")
+    parser.add_argument("table", choices=sorted(WRITERS))
+    parser.add_argument("csv", help="Pfad zur CSV-Datei")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--retries", type=int, default=RETRIES)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    def report(stats):
+        print(f"\r{stats['written']} geschrieben, {stats['failed']} fehlgeschlagen, "
+              f"{stats['rows_per_second']:.0f} Zeilen/s", end="", flush=True)
+
+    stats = import_csv(args.csv, args.table, args.batch_size, args.workers, args.retries, args.chunk_size, report)
+    print()
+    for error in stats["errors"][:50]:
+        print(error)
+    if len(stats["errors"]) > 50:
+        print(f"... und {len(stats['errors']) - 50} weitere Fehler")
+    print(f"{stats['rows']} Zeilen gelesen, {stats['written']} geschrieben, {stats['invalid']} ungültig, "
+          f"{stats['failed']} fehlgeschlagen, {stats['reserved']} neue IDs in {stats['seconds']:.1f} s "
+          f"({stats['rows_per_second']:.0f} Zeilen/s)")
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,174 @@
+# Fertig gerenderte Gipfel-Ebenen der Karten, prozessweit für alle Sessions geteilt:
+# gleiche Filter + gleicher Datenstand + gleicher Ausschnitt -> dasselbe Leaflet-Skript,
+# ohne Dreiecke, GeoJSON und Folium-Template neu zu bauen
+import collections
+import os
+import threading
+
+import folium
+from branca.element import Element, MacroElement
+from folium.template import Template
+import streamlit as st
+
+from geometry import add_triangles
+
+# Obergrenze für alle gespeicherten Ebenen zusammen (MB); die am längsten unbenutzten fliegen zuerst
+LAYER_CACHE_MB = float(os.getenv("LAYER_CACHE_MB", "64"))
+
+# Fester Name der Hilfskarte beim Rendern; im gespeicherten Skript durch den echten Kartennamen ersetzt
+_PLACEHOLDER_ID = "layercacheplaceholder"
+
+
+class CachedLayer:
+    """Das gerenderte Skript (und CSS im Header) einer Gipfel-Ebene, unabhängig von der Karte."""
+
+    def __init__(self, header: list[tuple[str, str]], script: str, count: int):
+        self.header = header
+        self.script = script
+        self.count = count
+        self.nbytes = len(script) + sum(len(css) for _, css in header)
+
+    def script_for(self, map_name: str) -> str:
+        return self.script.replace(f"map_{_PLACEHOLDER_ID}", map_name)
+
+
+class _Raw(Element):
+    # Fertiger Text; Element(text) würde ihn als Jinja-Template noch einmal parsen
+    def __init__(self, text: str):
+        super().__init__()
+        self.text = text
+
+    def render(self, **kwargs):
+        return self.text
+
+
+class RenderedLayer(MacroElement):
+    """
+    Folium-Element für eine CachedLayer: schreibt beim Rendern nur das fertige Skript in die
+    Karte. Jede Karte bekommt ein eigenes Element (die CachedLayer teilen sich alle).
+    """
+
+    # streamlit_folium liest das Skript jedes Elements über das script-Makro
+    _template = Template("""
+        {% macro script(this, kwargs) %}{{ this.layer.script_for(this._parent.get_name()) }}{% endmacro %}
+    """)
+
+    def __init__(self, layer: CachedLayer):
+        super().__init__()
+        self._name = "RenderedLayer"
+        self.layer = layer
+
+    def render(self, **kwargs):
+        figure = self.get_root()
+        for name, css in self.layer.header:
+            figure.header.add_child(_Raw(css), name=name)
+        figure.script.add_child(_Raw(self.layer.script_for(self._parent.get_name())), name=self.get_name())
+
+
+def _render_parts(m: folium.Map) -> tuple[dict, dict]:
+    root = m.get_root()
+    root.render()
+    return ({name: child.render() for name, child in root.header._children.items()},
+            {name: child.render() for name, child in root.script._children.items()})
+
+
+def render_layer(triangles: dict) -> CachedLayer:
+    """Rendert die Dreiecke (geometry.add_triangles) einmal auf einer leeren Hilfskarte und behält nur die Ebene."""
+    def scratch_map():
+        m = folium.Map(tiles=None)
+        m._id = _PLACEHOLDER_ID
+        return m
+
+    base_header, base_script = _render_parts(scratch_map())
+    m = scratch_map()
+    count = add_triangles(m, triangles)
+    header, script = _render_parts(m)
+    return CachedLayer(
+        [(name, css) for name, css in header.items() if name not in base_header],
+        "".join(js for name, js in script.items() if name not in base_script),
+        count,
+    )
+
+
+class LayerCache:
+    """LRU-Cache für CachedLayer, begrenzt über die Größe der Skripte statt über die Anzahl."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key) -> CachedLayer | None:
+        with self.lock:
+            layer = self.entries.get(key)
+            if layer is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return layer
+
+    def put(self, key, layer: CachedLayer):
+        # Eine Ebene, die allein den halben Cache füllen würde, verdrängt nicht alle anderen
+        if layer.nbytes > self.max_bytes / 2:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self.entries[key] = layer
+            self.nbytes += layer.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"entries": len(self.entries), "mb": round(self.nbytes / 2 ** 20, 1),
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+@st.cache_resource
+def shared_layer_cache() -> LayerCache:
+    # Prozessweit: alle Sessions und Kartenseiten teilen sich einen Cache
+    return LayerCache(int(LAYER_CACHE_MB * 2 ** 20))
+
+
+def _plain(value):
+    # NumPy-Skalare (z.B. aus Slidern über NumPy-Werte) wie Python-Werte behandeln
+    return value.item() if hasattr(value, "item") else value
+
+
+def layer_key(peak_filter, filters: dict, zoom: int, box=None, style: str = "") -> tuple | None:
+    """
+    Schlüssel einer Gipfel-Ebene: Datenstand der Filter-Engine, normalisierte Filter (ohne
+    "nicht filtern"), Zoom, gezeichneter Ausschnitt und Darstellung (`style`, falls Seiten
+    unterschiedlich zeichnen). None, wenn der Datenstand unbekannt ist (dann nicht cachen).
+    """
+    version = getattr(peak_filter, "version", None)
+    if version is None:
+        return None
+    normalized = tuple(sorted((name, _plain(value)) for name, value in filters.items() if value is not None))
+    drawn = None if box is None else tuple(round(float(v), 5) for v in box)
+    return (version, normalized, int(zoom), drawn, style)
+
+
+def add_cached_triangles(m: folium.Map, key, build) -> int:
+    """
+    Wie geometry.add_triangles(m, build()), aber die gerenderte Ebene kommt für `key` (siehe
+    layer_key()) aus dem gemeinsamen Cache; build() liefert die Dreiecke nur beim ersten Mal.
+    Gibt die Anzahl der Dreiecke zurück.
+    """
+    if key is None:
+        return add_triangles(m, build())
+    cache = shared_layer_cache()
+    layer = cache.get(key)
+    if layer is None:
+        layer = render_layer(build())
+        cache.put(key, layer)
+    if layer.count:
+        RenderedLayer(layer).add_to(m)
+    return layer.count
@@ -0,0 +1,137 @@
+# Kartenausschnitt (Zoom, Mittelpunkt, Grenzen) aus st_folium über Reruns hinweg merken.
+# Jede Kartenseite nutzt ihren eigenen `key`, damit sich die Seiten nicht gegenseitig verschieben.
+import math
+
+import numpy as np
+import streamlit as st
+
+DEFAULT_ZOOM = 11
+
+
+def get_view(key: str = "map_view") -> dict:
+    return st.session_state.get(key, {})
+
+
+def map_zoom(key: str = "map_view") -> int:
+    """Zoomstufe vom letzten Rerun (bzw. DEFAULT_ZOOM beim ersten Aufruf)."""
+    return get_view(key).get("zoom") or DEFAULT_ZOOM
+
+
+def map_center(default, key: str = "map_view") -> list:
+    """Mittelpunkt vom letzten Rerun als [lat, lon]; sonst `default`."""
+    center = get_view(key).get("center")
+    if not center:
+        return default
+    return [center["lat"], center["lng"]]
+
+
+def remember_view(st_data, key: str = "map_view") -> bool:
+    """
+    Merkt sich Zoom, Mittelpunkt und Grenzen aus dem Rückgabewert von st_folium.
+    True, wenn sich die Zoomstufe geändert hat (dann passt der Detailgrad nicht mehr).
+    """
+    if not st_data or st_data.get("zoom") is None:
+        return False
+    if st.session_state.pop(f"{key}_moved", False):
+        # Direkt nach follow_area() kann st_folium noch den alten Ausschnitt melden
+        return False
+    old_zoom = map_zoom(key)
+    st.session_state[key] = {
+        "zoom": st_data["zoom"],
+        "center": st_data.get("center"),
+        "bounds": st_data.get("bounds"),
+    }
+    return st_data["zoom"] != old_zoom
+
+
+def follow_area(area, key: str = "map_view"):
+    """
+    Vergisst Mittelpunkt und gezeichneten Bereich, sobald sich der Gebiet-Filter ändert: sonst
+    bliebe die Karte am alten Ort, und im Ausschnitt-Modus fehlten die Gipfel des neuen Gebiets.
+    Die Zoomstufe bleibt.
+    """
+    previous = st.session_state.get(f"{key}_area", area)
+    st.session_state[f"{key}_area"] = area
+    if previous == area:
+        return
+    st.session_state[key] = {"zoom": get_view(key).get("zoom")}
+    st.session_state.pop(f"{key}_box", None)
+    st.session_state[f"{key}_moved"] = True
+
+
+# Im Ausschnitt-Modus wird um diesen Anteil der Kartengröße in jede Richtung mehr gezeichnet,
+# damit kleines Verschieben ohne Neuzeichnen auskommt
+VIEWPORT_MARGIN = 0.5
+
+
+def bounds_box(bounds) -> tuple | None:
+    """(south, west, north, east) aus den st_folium-Grenzen ({'_southWest': {...}, '_northEast': {...}})."""
+    try:
+        sw, ne = bounds["_southWest"], bounds["_northEast"]
+        box = (float(sw["lat"]), float(sw["lng"]), float(ne["lat"]), float(ne["lng"]))
+    except (KeyError, TypeError, ValueError):
+        return None
+    # Vor dem ersten Zeichnen liefert Leaflet manchmal einen leeren Ausschnitt
+    return box if box[0] < box[2] and box[1] < box[3] else None
+
+
+def estimate_box(center, zoom: int, width: int = 1400, height: int = 600) -> tuple:
+    """Ungefährer Ausschnitt aus Mittelpunkt und Zoom (Web-Mercator, 256-px-Kacheln)."""
+    deg_per_px = 360.0 / (256 * 2 ** zoom)
+    lat, lon = center
+    half_lat = height / 2 * deg_per_px * math.cos(math.radians(lat))
+    half_lon = width / 2 * deg_per_px
+    return (lat - half_lat, lon - half_lon, lat + half_lat, lon + half_lon)
+
+
+def expand_box(box, margin: float = VIEWPORT_MARGIN) -> tuple:
+    south, west, north, east = box
+    dlat, dlon = (north - south) * margin, (east - west) * margin
+    return (south - dlat, west - dlon, north + dlat, east + dlon)
+
+
+def box_contains(outer, inner) -> bool:
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+
+def viewport_box(center, zoom: int, key: str = "map_view") -> tuple:
+    """
+    Bereich, für den im Ausschnitt-Modus Gipfel gezeichnet werden: sichtbarer Ausschnitt plus
+    VIEWPORT_MARGIN. Solange der sichtbare Ausschnitt noch im zuletzt gezeichneten Bereich
+    liegt, bleibt dieser gleich (gleiche Gipfel, keine neue Karte).
+    """
+    visible = bounds_box(get_view(key).get("bounds")) or estimate_box(center, zoom)
+    drawn = st.session_state.get(f"{key}_box")
+    if drawn is None or drawn[0] != zoom or not box_contains(drawn[1], visible):
+        drawn = (zoom, expand_box(visible))
+        st.session_state[f"{key}_box"] = drawn
+    return drawn[1]
+
+
+def left_viewport(key: str = "map_view") -> bool:
+    """True, wenn der Ausschnitt nach dem letzten Verschieben aus dem gezeichneten Bereich herausragt."""
+    visible = bounds_box(get_view(key).get("bounds"))
+    drawn = st.session_state.get(f"{key}_box")
+    return visible is not None and drawn is not None and not box_contains(drawn[1], visible)
+
+
+# Ein Klick zählt für den nächstgelegenen Gipfel, wenn er höchstens so weit weg ist (Meter)
+CLICK_RADIUS = 300
+
+
+def clicked_peak_id(st_data, index, visible=None, max_distance: float = CLICK_RADIUS):
+    """
+    peak_id des Gipfels, der dem letzten Klick auf die Karte am nächsten liegt (oder None).
+    `visible`: nur diese peak_ids kommen in Frage – sonst träfe ein Klick auch Gipfel, die der
+    Filter gerade ausblendet (der Index enthält alle).
+    """
+    clicked = (st_data or {}).get("last_clicked")
+    if not clicked or index is None or not len(index):
+        return None
+    if visible is None:
+        ids, _ = index.nearest(clicked["lat"], clicked["lng"], k=1, max_distance=max_distance)
+    else:
+        # radius() ist nach Entfernung sortiert: der erste sichtbare ist der nächste
+        ids = index.radius(clicked["lat"], clicked["lng"], max_distance)
+        ids = ids[np.isin(ids, np.asarray(visible, dtype="int64"))]
+    return ids[0] if len(ids) else None
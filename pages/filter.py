@@ -2,10 +2,11 @@ import streamlit as st
 import pandas as pd
 import folium  # für die interaktive Karte
 from streamlit_folium import st_folium
-from supabase import create_client, Client
 import os
 from dotenv import load_dotenv
-import math
+import numpy as np
+
+from geometry import add_triangles, build_map_triangles
 
 # Lade Umgebungsvariablen
 load_dotenv()
@@ -20,122 +21,50 @@ if not url or not key:
     st.stop() # Stoppt die Ausführung der App, wenn die Variablen fehlen
 
 try:
-    supabase: Client = create_client(url, key)
+    from climber import current_climber
+    from db import MULTI_USER
+    from route_query import load_route_query
 except Exception as e:
-    st.error(f"Fehler beim Erstellen des Supabase-Clients: {e}")
+    # Scheitern kann jedes der Module (oder der Supabase-Client in db.py): Fehler samt Traceback zeigen
+    st.error(f"Import fehlgeschlagen ({type(e).__name__}): {e}")
+    st.exception(e)
     st.stop()
 
-# Daten holen
-@st.cache_data
-def fetch_data():
+# Spalten, die diese Seite tatsächlich braucht (nur diese werden von Supabase geladen).
+# ascents bleibt komplett ('*'), weil 'done' und 'climber_id' nicht in jeder Datenbank existieren.
+COLUMNS = {
+    "peaks": ("peak_id", "gipfel", "gebiet", "hoehe", "lat", "lon"),
+    "routes": ("route_id", "peak_id", "name", "stern", "bewertung"),
+    "ascents": None,
+}
+
+# Daten holen – Routen-Abfrage mit vorberechnetem Route->Gipfel-Index (route_query.py)
+def fetch_data(climber_id=None):
     try:
-        peaks_df = pd.DataFrame(supabase.table("peaks").select("*").execute().data)
-        routes_df = pd.DataFrame(supabase.table("routes").select("*").execute().data)
-        ascents_df = pd.DataFrame(supabase.table("ascents").select("*").execute().data)
-        
-        # Debugging: Prüfen, ob 'done' in ascents_df ist
-        if 'done' not in ascents_df.columns:
-            st.warning("Debugging: Spalte 'done' NICHT in der 'ascents'-Tabelle gefunden nach dem Abruf von Supabase. Bitte in Supabase überprüfen!")
-            # Optional: Füge eine Dummy-Spalte hinzu, um den Code lauffähig zu halten, aber mit Hinweis
-            ascents_df['done'] = False # Default-Wert, wenn Spalte fehlt
-            
-        return peaks_df, routes_df, ascents_df
+        return load_route_query(COLUMNS, climber_id)
     except Exception as e:
         st.error(f"Fehler beim Laden der Daten von Supabase: {e}")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame() # Leere DataFrames zurückgeben
+        return None
 
 # Mapping der Schwierigkeit
 difficulty_mapping = {1: "Leicht", 2: "Ok", 3: "Schwer"}
 
-# Hilfsfunktion: Dreieck-Koordinaten berechnen
-def make_triangle(lat, lon, size=0.001):
-    """
-    Erzeuge 3 Koordinaten für ein gleichseitiges Dreieck
-    Größe ca. 0.001 Grad = ~100 m
-    """
-    if pd.isna(lat) or pd.isna(lon) or pd.isna(size) or size <= 0:
-        return None # Gibt None zurück, wenn Eingaben NaN sind oder die Größe ungültig ist
-
-    try:
-        return [
-            [lat + size, lon],  # Spitze nach oben
-            [lat - size / 2, lon - size * math.sqrt(3)/2],
-            [lat - size / 2, lon + size * math.sqrt(3)/2],
-        ]
-    except TypeError: # Fängt Fehler ab, wenn lat/lon/size keine Zahlen sind
-        st.error(f"Fehler bei make_triangle: lat={lat}, lon={lon}, size={size} sind keine gültigen Zahlen.")
-        return None
-
 # Hauptfunktionen der App
 def app():
     st.set_page_config(layout="wide") # Optional: Nutzt die gesamte Bildschirmbreite
     st.title("Gipfelbuch - Kletter-App")
 
-    # 1. Daten holen
-    peaks_df, routes_df, ascents_df = fetch_data()
+    # 1. Daten holen (mit MULTI_USER=1 nur die Begehungen des Kletterers dieser Session)
+    climber_id = current_climber()
+    query = fetch_data(climber_id)
 
-    if peaks_df.empty or routes_df.empty or ascents_df.empty:
+    if query is None or query.peaks_df.empty or query.routes_df.empty:
         st.warning("Keine Daten verfügbar oder Fehler beim Laden der Daten. Bitte prüfen Sie Ihre Supabase-Verbindung und Tabellen.")
         st.stop() # Stoppt die App, wenn keine Daten geladen werden konnten
 
-    # 🔹 Verknüpfung der ascents und peaks Tabelle
-    # Sicherstellen, dass die Spalten für den Merge existieren
-    if "route_id" in ascents_df.columns and "route_id" in routes_df.columns:
-        ascents_with_route = ascents_df.merge(routes_df, on="route_id", how="left")
-    else:
-        st.error("Fehlende 'route_id' Spalte in ascents_df oder routes_df.")
-        st.stop()
-    
-    if "peak_id" in ascents_with_route.columns and "peak_id" in peaks_df.columns:
-        ascents_with_peak = ascents_with_route.merge(
-            peaks_df[['peak_id', 'gipfel', 'gebiet', 'hoehe', 'lat', 'lon']], # Nur benötigte Spalten aus peaks_df
-            on="peak_id",
-            how="left"
-        )
-        
-        # Sicherstellen, dass 'done' in ascents_with_peak vorhanden ist
-        # 'done' kommt direkt aus ascents_df. Wir prüfen, ob es beim ersten Merge mitgenommen wurde
-        # oder ob es eine Warnung gab, dass es in ascents_df fehlt.
-        if 'done' not in ascents_with_peak.columns and 'done' in ascents_df.columns:
-            # Falls 'done' nicht über den ersten Merge kam (z.B. wenn routes_df es nicht hatte),
-            # fügen wir es hier direkt von ascents_df hinzu.
-            # Vergewissern Sie sich, dass 'ascent_id' in ascents_with_peak vorhanden ist
-            if 'ascent_id' in ascents_with_peak.columns:
-                ascents_with_peak = ascents_with_peak.merge(
-                    ascents_df[['ascent_id', 'done']],
-                    on='ascent_id',
-                    how='left',
-                    suffixes=('', '_from_ascents') # Vermeidet Kollisionen falls 'done' anderswo auftaucht
-                )
-                # Entferne Duplikate, falls durch Merge entstanden (unwahrscheinlich bei how='left')
-                if 'done_from_ascents' in ascents_with_peak.columns:
-                    ascents_with_peak['done'] = ascents_with_peak['done_from_ascents'].fillna(ascents_with_peak['done'])
-                    ascents_with_peak.drop(columns=['done_from_ascents'], inplace=True)
-            else:
-                st.warning("Spalte 'ascent_id' fehlt in 'ascents_with_peak', kann 'done' nicht nachmergen.")
-        
-        # Falls 'done' immer noch fehlt (z.B. wenn es in ascents_df fehlte), füge es als False hinzu
-        if 'done' not in ascents_with_peak.columns:
-            st.warning("Spalte 'done' ist auch nach Merges nicht in 'ascents_with_peak' vorhanden. Füge Dummy-Spalte hinzu.")
-            ascents_with_peak['done'] = False # Füllt fehlende Werte mit False
-
-
-    else:
-        st.error("Fehlende 'peak_id' Spalte in der verknüpften Tabelle oder peaks_df.")
-        st.stop()
+    peaks_df = query.peaks_df
 
-    # 🔹 Berechnung der Anzahl der Routen pro Peak
-    route_counts = routes_df.groupby("peak_id").size().reset_index(name="anzahl_routen")
-    peaks_df = peaks_df.merge(route_counts, on="peak_id", how="left")
-    peaks_df["anzahl_routen"] = peaks_df["anzahl_routen"].fillna(0).astype(int)
-
-    # Sicherstellen, dass ascents_with_peak die 'anzahl_routen' Spalte bekommt
-    if 'anzahl_routen' not in ascents_with_peak.columns:
-        ascents_with_peak = ascents_with_peak.merge(peaks_df[['peak_id', 'anzahl_routen']], on='peak_id', how='left')
-        ascents_with_peak['anzahl_routen'] = ascents_with_peak['anzahl_routen'].fillna(0).astype(int)
-
-
-    # 2. Filteroptionen
+    # 2. Filteroptionen – alle Bedingungen gelten für Routen, angezeigt werden die Gipfel dazu
     st.sidebar.title("Filteroptionen")
 
     # Gebirgspunkt-Filter
@@ -146,32 +75,23 @@ def app():
         st.sidebar.warning("Keine Gebiete zum Filtern verfügbar.")
         gebiet_filter = 'Alle Gebiete' # Standardwert, wenn keine Optionen
 
-    # Schwierigkeit-Filter (Mapping auf die Textdarstellung)
-    schwierigkeit_filter = st.sidebar.selectbox(
-        'Wähle die Schwierigkeit', 
-        options=["Leicht", "Ok", "Schwer"]
-    )
-
-    # Umwandeln der Schwierigkeit in numerische Werte (für den Filter)
-    difficulty_filter_value = {
-        "Leicht": 1,
-        "Ok": 2,
-        "Schwer": 3
-    }[schwierigkeit_filter]
+    # Schwierigkeit der Route als Bereich (von/bis)
+    bewertungen = query.bewertung[~pd.isna(query.bewertung)]
+    if len(bewertungen) > 0 and bewertungen.min() < bewertungen.max():
+        min_bewertung, max_bewertung = st.sidebar.slider(
+            'Schwierigkeit der Route (von/bis)',
+            min_value=int(bewertungen.min()), max_value=int(bewertungen.max()),
+            value=(int(bewertungen.min()), int(bewertungen.max()))
+        )
+    else:
+        min_bewertung = max_bewertung = None
 
-    # Sternchen-Filter (1=hat Stern, 0=hat keinen Stern)
+    # Sternchen-Filter
     sternchen_filter = st.sidebar.radio(
         "Wähle die Routen mit oder ohne Sternchen",
         options=["Alle", "Hat Stern", "Hat keinen Stern"]
     )
-
-    # Umwandeln des Sternchenfilters in 1 oder 0
-    if sternchen_filter == "Hat Stern":
-        sternchen_filter_value = 1
-    elif sternchen_filter == "Hat keinen Stern":
-        sternchen_filter_value = 0
-    else:
-        sternchen_filter_value = None  # Zeige alle Routen, unabhängig von Sternchen
+    sternchen_filter_value = {"Hat Stern": True, "Hat keinen Stern": False}.get(sternchen_filter)
 
     # Höhe-Filter
     if 'hoehe' in peaks_df.columns and pd.api.types.is_numeric_dtype(peaks_df['hoehe']):
@@ -182,37 +102,28 @@ def app():
         st.sidebar.warning("Höhenfilter nicht verfügbar, da 'hoehe' Spalte fehlt oder nicht numerisch ist.")
         hoehe_filter = None
 
-    # Schon gemacht-Filter
-    if 'done' in ascents_with_peak.columns: # Prüfe, ob 'done' in der ascents_with_peak DataFrame ist
-        gemacht_filter = st.sidebar.checkbox('Schon gemacht')
-    else:
-        st.sidebar.warning("Option 'Schon gemacht' nicht verfügbar (Spalte 'done' fehlt in Daten).")
-        gemacht_filter = False
-
-
-    # 3. Filter anwenden
-    filtered_peaks = ascents_with_peak.copy()
-
-    if gebiet_filter != 'Alle Gebiete': # Nur filtern, wenn nicht "Alle Gebiete" gewählt ist
-        filtered_peaks = filtered_peaks[filtered_peaks['gebiet'] == gebiet_filter]
-    
-    if 'bewertung' in filtered_peaks.columns:
-        filtered_peaks = filtered_peaks[filtered_peaks['bewertung'] == difficulty_filter_value]
-    else:
-        st.warning("Spalte 'bewertung' nicht gefunden, Schwierigkeitsfilter wird ignoriert.")
-
-    if sternchen_filter_value is not None and 'stern' in filtered_peaks.columns:
-        filtered_peaks = filtered_peaks[filtered_peaks['stern'] == sternchen_filter_value]
-    elif sternchen_filter_value is not None: # Zeige diese Warnung nur, wenn der Filter aktiv ist und die Spalte fehlt
-        st.warning("Spalte 'stern' nicht gefunden, Sternchen-Filter wird ignoriert.")
-
-    if gemacht_filter and 'done' in filtered_peaks.columns:
-        filtered_peaks = filtered_peaks[filtered_peaks['done'] == True]
-    elif gemacht_filter: # Zeige diese Warnung nur, wenn der Filter aktiv ist und die Spalte fehlt
-        st.warning("Spalte 'done' nicht gefunden, 'Schon gemacht'-Filter wird ignoriert.")
-    
-    if hoehe_filter is not None and 'hoehe' in filtered_peaks.columns:
-        filtered_peaks = filtered_peaks[pd.to_numeric(filtered_peaks['hoehe'], errors='coerce').fillna(0) <= hoehe_filter]
+    # Schon gemacht-Filter (optional nur die Begehungen eines Kletterers)
+    gemacht_filter = st.sidebar.radio("Schon gemacht", options=["Alle", "Schon gemacht", "Noch nicht gemacht"])
+    gemacht_filter_value = {"Schon gemacht": True, "Noch nicht gemacht": False}.get(gemacht_filter)
+    climber_filter = None
+    if MULTI_USER:
+        # Geladen sind ohnehin nur die eigenen Begehungen – keine Auswahl anderer Kletterer
+        climber_filter = climber_id
+    elif query.climbers:
+        climber_choice = st.sidebar.selectbox('Kletterer', options=['Alle Kletterer'] + query.climbers)
+        climber_filter = None if climber_choice == 'Alle Kletterer' else climber_choice
+
+    # 3. Filter anwenden: eine Maske über alle Routen, danach auf eindeutige Gipfel hochrechnen
+    route_mask = query.routes(
+        min_bewertung=min_bewertung,
+        max_bewertung=max_bewertung,
+        star=sternchen_filter_value,
+        done=gemacht_filter_value,
+        climber_id=climber_filter,
+        gebiet=None if gebiet_filter == 'Alle Gebiete' else gebiet_filter,
+        max_hoehe=hoehe_filter,
+    )
+    filtered_peaks = query.peaks(route_mask)
 
 
     # **Überprüfung und Bereinigung von NaN-Werten für Kartenplotting**
@@ -221,13 +132,6 @@ def app():
     cols_for_map = ['lat', 'lon', 'hoehe', 'gipfel', 'gebiet', 'anzahl_routen']
     # Sicherstellen, dass alle benötigten Spalten existieren, bevor dropna aufgerufen wird
     existing_cols_for_map = [col for col in cols_for_map if col in filtered_peaks.columns]
-    
-    # Debugging: Prüfen, wie viele Nan-Werte es vor dem Dropna gibt
-    st.write(f"Debugging: Vor der NaN-Bereinigung, Anzahl der Zeilen: {len(filtered_peaks)}")
-    st.write(f"Debugging: NaN-Werte in 'lat': {filtered_peaks['lat'].isna().sum() if 'lat' in filtered_peaks.columns else 'N/A'}")
-    st.write(f"Debugging: NaN-Werte in 'lon': {filtered_peaks['lon'].isna().sum() if 'lon' in filtered_peaks.columns else 'N/A'}")
-    st.write(f"Debugging: NaN-Werte in 'hoehe': {filtered_peaks['hoehe'].isna().sum() if 'hoehe' in filtered_peaks.columns else 'N/A'}")
-
 
     if existing_cols_for_map:
         filtered_peaks = filtered_peaks.dropna(subset=existing_cols_for_map)
@@ -241,7 +145,7 @@ def app():
     # 5. Ausgabe der gefilterten Gebirgspunkte als Liste
     st.subheader("Gefilterte Gebirgspunkte")
     if not filtered_peaks.empty:
-        display_columns = ['gipfel', 'gebiet', 'hoehe', 'anzahl_routen', 'bewertung', 'stern', 'done']
+        display_columns = ['gipfel', 'gebiet', 'hoehe', 'anzahl_routen', 'passende_routen']
         actual_display_columns = [col for col in display_columns if col in filtered_peaks.columns]
         
         st.dataframe(filtered_peaks[actual_display_columns])
@@ -260,50 +164,14 @@ def app():
         return # App beenden, wenn keine Daten für die Karte
 
     # 7. Folium-Karte erstellen
-    m = folium.Map(location=[lat_center, lon_center], zoom_start=11)
-
-    # 8. Dreiecke als Polygone einfügen (Größe nach Höhe)
-    # Debugging: Zähler für gezeichnete Dreiecke
-    drawn_triangles_count = 0
-    for index, row in filtered_peaks.iterrows():
-        # Stellen Sie sicher, dass alle benötigten Spalten für das Dreieck und den Tooltip vorhanden sind
-        required_cols_for_plot = ['lat', 'lon', 'hoehe', 'anzahl_routen', 'gipfel', 'gebiet']
-        
-        # Prüfung auf Spaltenexistenz und NaN-Werte in einem Schritt
-        if not all(col in row.index and pd.notna(row[col]) for col in required_cols_for_plot):
-            st.warning(f"Gipfel '{row.get('gipfel', 'Unbekannt')}' wird übersprungen: Fehlende oder ungültige Daten (Koordinaten, Höhe, Routenanzahl oder Gebiet).")
-            continue # Springt zur nächsten Zeile, wenn Daten fehlen
-
-        # Konvertierung von 'hoehe' zu einem numerischen Wert, falls es noch ein String ist
-        hoehe_val = pd.to_numeric(row["hoehe"], errors='coerce')
-        if pd.isna(hoehe_val) or hoehe_val < 0: # Auch negative Höhen abfangen
-            st.warning(f"Gipfel '{row['gipfel']}' wird übersprungen: Ungültiger Höhenwert ({row['hoehe']}).")
-            continue
-
-        größe = 0.0012 + (hoehe_val * 0.00011)
-        if größe <= 0: # Auch hier eine Prüfung, falls die Höhe extrem klein wäre und zu ungültiger Größe führt
-            st.warning(f"Gipfel '{row['gipfel']}' wird übersprungen: Berechnete Dreiecksgröße ({größe}) ist ungültig.")
-            continue
-
-        coords = make_triangle(row["lat"], row["lon"], größe)
-        if coords: # Prüfen, ob make_triangle gültige Koordinaten zurückgibt (nicht None)
-            tooltip_text = f"""
-            <b>{row['gipfel']}</b><br>
-            Höhe: {int(hoehe_val)} m<br>
-            Routen: {int(row['anzahl_routen'])}<br>
-            Gebiet: {row['gebiet']}
-            """
-            folium.Polygon(
-                locations=coords,
-                color=None, # Keine Randlinie
-                fill=True,
-                fill_color="black",
-                fill_opacity=0.89,
-                tooltip=folium.Tooltip(tooltip_text, sticky=True)
-            ).add_to(m)
-            drawn_triangles_count += 1
-        else:
-            st.warning(f"Gipfel '{row['gipfel']}' wird übersprungen: Fehler beim Erstellen der Dreieckskoordinaten.")
+    zoom = 11
+    m = folium.Map(location=[lat_center, lon_center], zoom_start=zoom)
+
+    # 8. Dreiecke als eine GeoJSON-Ebene einfügen (Größe nach Höhe, siehe geometry.py);
+    # ungültige Gipfel lässt build_map_triangles weg. Diese Seite zeichnet alle Gipfel schwarz.
+    triangles = build_map_triangles(filtered_peaks, zoom)
+    triangles["fill_color"] = np.full(len(triangles["fill_color"]), "black", dtype=object)
+    drawn_triangles_count = add_triangles(m, triangles)
 
     st.info(f"Anzahl der auf der Karte gezeichneten Dreiecke: {drawn_triangles_count}")
 
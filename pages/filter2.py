@@ -2,10 +2,11 @@ import streamlit as st
 import pandas as pd
 import folium  # für die interaktive Karte
 from streamlit_folium import st_folium
-from supabase import create_client, Client
 import os
 from dotenv import load_dotenv
-import math
+import numpy as np
+
+from geometry import add_triangles, build_map_triangles
 
 # Lade Umgebungsvariablen
 load_dotenv()
@@ -20,18 +21,26 @@ if not url or not key:
     st.stop() # Stoppt die Ausführung der App, wenn die Variablen fehlen
 
 try:
-    supabase: Client = create_client(url, key)
+    from climber import current_climber
+    from db import load_tables
 except Exception as e:
-    st.error(f"Fehler beim Erstellen des Supabase-Clients: {e}")
+    # Scheitern kann jedes der Module (oder der Supabase-Client in db.py): Fehler samt Traceback zeigen
+    st.error(f"Import fehlgeschlagen ({type(e).__name__}): {e}")
+    st.exception(e)
     st.stop()
 
+# Spalten, die diese Seite tatsächlich braucht (nur diese werden von Supabase geladen).
+# ascents bleibt komplett ('*'), weil 'done' nicht in jeder Datenbank existiert.
+COLUMNS = {
+    "peaks": ("peak_id", "gipfel", "gebiet", "hoehe", "lat", "lon"),
+    "routes": ("route_id", "peak_id", "name", "stern"),
+    "ascents": None,
+}
+
 # Daten holen
-@st.cache_data
 def fetch_data():
     try:
-        peaks_df = pd.DataFrame(supabase.table("peaks").select("*").execute().data)
-        routes_df = pd.DataFrame(supabase.table("routes").select("*").execute().data)
-        ascents_df = pd.DataFrame(supabase.table("ascents").select("*").execute().data)
+        peaks_df, routes_df, ascents_df = load_tables(COLUMNS, climber_id=current_climber())
         
         # Debugging: Prüfen, ob 'done' in ascents_df ist
         if 'done' not in ascents_df.columns:
@@ -47,25 +56,6 @@ def fetch_data():
 # Mapping der Schwierigkeit
 difficulty_mapping = {1: "Leicht", 2: "Ok", 3: "Schwer"}
 
-# Hilfsfunktion: Dreieck-Koordinaten berechnen
-def make_triangle(lat, lon, size=0.001):
-    """
-    Erzeuge 3 Koordinaten für ein gleichseitiges Dreieck
-    Größe ca. 0.001 Grad = ~100 m
-    """
-    if pd.isna(lat) or pd.isna(lon) or pd.isna(size) or size <= 0:
-        return None # Gibt None zurück, wenn Eingaben NaN sind oder die Größe ungültig ist
-
-    try:
-        return [
-            [lat + size, lon],  # Spitze nach oben
-            [lat - size / 2, lon - size * math.sqrt(3)/2],
-            [lat - size / 2, lon + size * math.sqrt(3)/2],
-        ]
-    except TypeError: # Fängt Fehler ab, wenn lat/lon/size keine Zahlen sind
-        st.error(f"Fehler bei make_triangle: lat={lat}, lon={lon}, size={size} sind keine gültigen Zahlen.")
-        return None
-
 # Hauptfunktionen der App
 def app():
     st.set_page_config(layout="wide") # Optional: Nutzt die gesamte Bildschirmbreite
@@ -74,7 +64,8 @@ def app():
     # 1. Daten holen
     peaks_df, routes_df, ascents_df = fetch_data()
 
-    if peaks_df.empty or routes_df.empty or ascents_df.empty:
+    # Ohne Begehungen (z.B. neuer Kletterer im Mehrbenutzer-Modus) ist einfach nichts geklettert
+    if peaks_df.empty or routes_df.empty:
         st.warning("Keine Daten verfügbar oder Fehler beim Laden der Daten. Bitte prüfen Sie Ihre Supabase-Verbindung und Tabellen.")
         st.stop() # Stoppt die App, wenn keine Daten geladen werden konnten
 
@@ -247,47 +238,25 @@ def app():
     if not filtered_peaks.empty:
         lat_center = filtered_peaks["lat"].mean()
         lon_center = filtered_peaks["lon"].mean()
+    elif ascents_df.empty and peaks_df["lat"].notna().any():
+        # Noch keine Begehungen: nichts geklettert, die Karte zeigt trotzdem das Gebiet aller Gipfel
+        st.info("Noch keine Begehungen eingetragen – es ist nichts geklettert.")
+        lat_center = peaks_df["lat"].mean()
+        lon_center = peaks_df["lon"].mean()
     else:
         st.info("Keine Gipfel vorhanden, um die Karte zu zentrieren und Dreiecke anzuzeigen.")
         return 
 
     # 7. Folium-Karte erstellen
-    m = folium.Map(location=[lat_center, lon_center], zoom_start=11)
+    zoom = 11
+    m = folium.Map(location=[lat_center, lon_center], zoom_start=zoom)
+
+    # 8. Dreiecke als eine GeoJSON-Ebene einfügen (Größe nach Höhe, siehe geometry.py);
+    # ungültige Gipfel lässt build_map_triangles weg. Diese Seite zeichnet alle Gipfel schwarz.
+    triangles = build_map_triangles(filtered_peaks, zoom)
+    triangles["fill_color"] = np.full(len(triangles["fill_color"]), "black", dtype=object)
+    drawn_triangles_count = add_triangles(m, triangles)
 
-    # 8. Dreiecke als Polygone einfügen (Größe nach Höhe)
-    drawn_triangles_count = 0
-    for index, row in filtered_peaks.iterrows():
-        required_cols_for_plot = ['lat', 'lon', 'hoehe', 'anzahl_routen', 'gipfel', 'gebiet']
-        
-        if not all(col in row.index and pd.notna(row[col]) for col in required_cols_for_plot):
-            continue 
-
-        hoehe_val = pd.to_numeric(row["hoehe"], errors='coerce')
-        if pd.isna(hoehe_val) or hoehe_val < 0: 
-            continue
-
-        größe = 0.0012 + (hoehe_val * 0.00011)
-        if größe <= 0: 
-            continue
-
-        coords = make_triangle(row["lat"], row["lon"], größe)
-        if coords: 
-            tooltip_text = f"""
-            <b>{row['gipfel']}</b><br>
-            Höhe: {int(hoehe_val)} m<br>
-            Routen: {int(row['anzahl_routen'])}<br>
-            Gebiet: {row['gebiet']}
-            """
-            folium.Polygon(
-                locations=coords,
-                color=None, 
-                fill=True,
-                fill_color="black",
-                fill_opacity=0.89,
-                tooltip=folium.Tooltip(tooltip_text, sticky=True)
-            ).add_to(m)
-            drawn_triangles_count += 1
-        
     st.info(f"Anzahl der auf der Karte gezeichneten Dreiecke: {drawn_triangles_count}")
 
     # 9. Karte anzeigen
@@ -2,10 +2,11 @@ import streamlit as st
 import pandas as pd
 import folium
 from streamlit_folium import st_folium
-from supabase import create_client, Client
 import os
 from dotenv import load_dotenv
-import math
+import numpy as np
+
+from geometry import add_triangles, build_map_triangles
 
 # Lade Umgebungsvariablen
 load_dotenv()
@@ -18,17 +19,24 @@ if not url or not key:
     st.stop()
 
 try:
-    supabase: Client = create_client(url, key)
+    from climber import current_climber
+    from db import load_tables
 except Exception as e:
-    st.error(f"Fehler beim Erstellen des Supabase-Clients: {e}")
+    # Scheitern kann jedes der Module (oder der Supabase-Client in db.py): Fehler samt Traceback zeigen
+    st.error(f"Import fehlgeschlagen ({type(e).__name__}): {e}")
+    st.exception(e)
     st.stop()
 
-@st.cache_data
+# Spalten, die diese Seite tatsächlich braucht (nur diese werden von Supabase geladen)
+COLUMNS = {
+    "peaks": ("peak_id", "gipfel", "gebiet", "hoehe", "lat", "lon"),
+    "routes": ("route_id", "peak_id", "stern"),
+    "ascents": ("ascent_id", "route_id", "bewertung"),
+}
+
 def fetch_data():
     try:
-        peaks_df = pd.DataFrame(supabase.table("peaks").select("*").execute().data)
-        routes_df = pd.DataFrame(supabase.table("routes").select("*").execute().data)
-        ascents_df = pd.DataFrame(supabase.table("ascents").select("*").execute().data)
+        peaks_df, routes_df, ascents_df = load_tables(COLUMNS, climber_id=current_climber())
 
         # --- Handling für 'bewertung' in ascents_df ---
         if 'bewertung' not in ascents_df.columns:
@@ -69,26 +77,14 @@ def fetch_data():
         st.error(f"Error loading data from Supabase: {e}")
         return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
 
-def make_triangle(lat, lon, size=0.001):
-    if pd.isna(lat) or pd.isna(lon) or pd.isna(size) or size <= 0:
-        return None
-    try:
-        return [
-            [lat + size, lon],
-            [lat - size / 2, lon - size * math.sqrt(3)/2],
-            [lat - size / 2, lon + size * math.sqrt(3)/2],
-        ]
-    except TypeError:
-        st.error(f"Error in make_triangle: lat={lat}, lon={lon}, size={size} are not valid numbers.")
-        return None
-
 def app():
     st.set_page_config(layout="wide")
     st.title("Gipfelbuch - Kletter-App")
 
     peaks_df, routes_df, ascents_df = fetch_data()
 
-    if peaks_df.empty or routes_df.empty or ascents_df.empty:
+    # Ohne Begehungen (z.B. neuer Kletterer im Mehrbenutzer-Modus) ist einfach nichts geklettert
+    if peaks_df.empty or routes_df.empty:
         st.warning("No data available or error loading data. Please check your Supabase connection and tables.")
         st.stop()
 
@@ -285,47 +281,25 @@ def app():
     if not filtered_peaks.empty:
         lat_center = filtered_peaks["lat"].mean()
         lon_center = filtered_peaks["lon"].mean()
+    elif ascents_df.empty and peaks_df["lat"].notna().any():
+        # Noch keine Begehungen: nichts geklettert, die Karte zeigt trotzdem das Gebiet aller Gipfel
+        st.info("Noch keine Begehungen eingetragen – es ist nichts geklettert.")
+        lat_center = peaks_df["lat"].mean()
+        lon_center = peaks_df["lon"].mean()
     else:
         st.info("No peaks available to center the map and display triangles.")
         return 
 
     # 7. Folium-Karte erstellen
-    m = folium.Map(location=[lat_center, lon_center], zoom_start=11)
+    zoom = 11
+    m = folium.Map(location=[lat_center, lon_center], zoom_start=zoom)
+
+    # 8. Dreiecke als eine GeoJSON-Ebene einfügen (Größe nach Höhe, siehe geometry.py);
+    # ungültige Gipfel lässt build_map_triangles weg. Diese Seite zeichnet alle Gipfel schwarz.
+    triangles = build_map_triangles(filtered_peaks, zoom)
+    triangles["fill_color"] = np.full(len(triangles["fill_color"]), "black", dtype=object)
+    drawn_triangles_count = add_triangles(m, triangles)
 
-    # 8. Dreiecke als Polygone einfügen (Größe nach Höhe)
-    drawn_triangles_count = 0
-    for index, row in filtered_peaks.iterrows():
-        required_cols_for_plot = ['lat', 'lon', 'hoehe', 'anzahl_routen', 'gipfel', 'gebiet']
-        
-        if not all(col in row.index and pd.notna(row[col]) for col in required_cols_for_plot):
-            continue 
-
-        hoehe_val = pd.to_numeric(row["hoehe"], errors='coerce')
-        if pd.isna(hoehe_val) or hoehe_val < 0: 
-            continue
-
-        größe = 0.0012 + (hoehe_val * 0.00011)
-        if größe <= 0: 
-            continue
-
-        coords = make_triangle(row["lat"], row["lon"], größe)
-        if coords: 
-            tooltip_text = f"""
-            <b>{row['gipfel']}</b><br>
-            Height: {int(hoehe_val)} m<br>
-            Routes: {int(row['anzahl_routen'])}<br>
-            Area: {row['gebiet']}
-            """
-            folium.Polygon(
-                locations=coords, 
-                color=None, 
-                fill=True,
-                fill_color="black",
-                fill_opacity=0.89,
-                tooltip=folium.Tooltip(tooltip_text, sticky=True)
-            ).add_to(m)
-            drawn_triangles_count += 1
-        
     st.info(f"Number of triangles drawn on the map: {drawn_triangles_count}")
 
     st_data = st_folium(m, width=1400, height=600)
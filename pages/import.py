@@ -0,0 +1,71 @@
+import streamlit as st
+import os
+from dotenv import load_dotenv
+
+# Lade Umgebungsvariablen
+load_dotenv()
+
+url = os.getenv("SUPABASE_URL")
+key = os.getenv("SUPABASE_KEY")
+
+if not url or not key:
+    st.error("Fehler: SUPABASE_URL oder SUPABASE_KEY wurden nicht gefunden. Stellen Sie sicher, dass Ihre .env-Datei korrekt ist.")
+    st.stop()
+
+try:
+    from importer import BATCH_SIZE, CHUNK_SIZE, RETRIES, WORKERS, WRITERS, import_csv
+except Exception as e:
+    # Scheitern kann jedes der Module (oder der Supabase-Client in db.py): Fehler samt Traceback zeigen
+    st.error(f"Import fehlgeschlagen ({type(e).__name__}): {e}")
+    st.exception(e)
+    st.stop()
+
+
+def app():
+    st.title("CSV-Import")
+    st.write("Gipfel, Routen oder Begehungen aus einer CSV-Datei direkt in Supabase schreiben "
+             "(z.B. append_routes.csv / append_ascents.csv aus newroutes.py). "
+             "Leere IDs vergibt die Datenbank (sql/reserve_ids.sql).")
+
+    table = st.selectbox("Tabelle", options=sorted(WRITERS), index=sorted(WRITERS).index("routes"))
+    uploaded = st.file_uploader("CSV-Datei", type=["csv"])
+
+    with st.expander("Einstellungen"):
+        batch_size = st.number_input("Zeilen pro Batch", min_value=1, max_value=10_000, value=BATCH_SIZE, step=100)
+        workers = st.number_input("Parallele Batches", min_value=1, max_value=16, value=WORKERS)
+        retries = st.number_input("Wiederholungen bei Fehlern", min_value=0, max_value=10, value=RETRIES)
+        chunk_size = st.number_input("Zeilen pro gelesenem Stück", min_value=1_000, max_value=1_000_000, value=CHUNK_SIZE, step=1_000)
+
+    if uploaded is None or not st.button("Importieren"):
+        return
+
+    progress_bar = st.progress(0.0)
+    status = st.empty()
+    # Gesamtzahl nur für den Fortschrittsbalken schätzen (Zeilen = Zeilenumbrüche minus Kopfzeile)
+    total = max(uploaded.getvalue().count(b"\n") - 1, 1)
+    uploaded.seek(0)
+
+    def report(stats):
+        done = stats["written"] + stats["failed"] + stats["invalid"]
+        progress_bar.progress(min(done / total, 1.0))
+        status.write(f"{stats['written']} geschrieben, {stats['failed']} fehlgeschlagen, "
+                     f"{stats['invalid']} ungültig – {stats['rows_per_second']:.0f} Zeilen/s")
+
+    try:
+        stats = import_csv(uploaded, table, int(batch_size), int(workers), int(retries), int(chunk_size), report)
+    except Exception as e:
+        st.error(f"Import abgebrochen: {e}")
+        return
+
+    progress_bar.progress(1.0)
+    if stats["failed"]:
+        st.error(f"{stats['failed']} Zeilen konnten auch nach {int(retries)} Wiederholungen nicht geschrieben werden.")
+    st.success(f"{stats['written']} von {stats['rows']} Zeilen in {stats['seconds']:.1f} s importiert "
+               f"({stats['rows_per_second']:.0f} Zeilen/s, {stats['reserved']} neue IDs).")
+    if stats["errors"]:
+        with st.expander(f"{len(stats['errors'])} Hinweise"):
+            st.write("\n".join(f"- {error}" for error in stats["errors"][:500]))
+
+
+if __name__ == "__main__":
+    app()
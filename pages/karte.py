@@ -2,15 +2,17 @@ import streamlit as st
 import pandas as pd
 import folium
 from streamlit_folium import st_folium
-from supabase_config import supabase  # Supabase-Verbindung
+from db import CATALOG_TABLES, load_tables  # gemeinsamer Datenbestand
 import math
 
 # 💬 Überschrift
 st.subheader("Karte aller Gipfel mit Routenanzahl (Dreiecks-Marker)")
 
 # 🔹 1. Daten laden
-peaks_df = pd.DataFrame(supabase.table("peaks").select("*").execute().data)
-routes_df = pd.DataFrame(supabase.table("routes").select("*").execute().data)
+peaks_df, routes_df = load_tables({
+    "peaks": ("peak_id", "gipfel", "lat", "lon"),
+    "routes": ("route_id", "peak_id"),
+}, tables=CATALOG_TABLES)
 
 # 🔹 2. Anzahl der Routen pro peak_id zählen
 route_counts = routes_df.groupby("peak_id").size().reset_index(name="anzahl_routen")
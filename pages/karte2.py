@@ -2,14 +2,16 @@ import streamlit as st
 import pandas as pd
 import folium
 from streamlit_folium import st_folium
-from supabase_config import supabase
+from db import CATALOG_TABLES, load_tables
 import math
 
 st.subheader("Karte der Gipfel – gefiltert nach Routen-Schwierigkeit")
 
-# 🔹 Daten laden
-peaks_df = pd.DataFrame(supabase.table("peaks").select("*").execute().data)
-routes_df = pd.DataFrame(supabase.table("routes").select("*").execute().data)
+# 🔹 Daten laden (nur der Katalog, Begehungen braucht die Karte nicht)
+peaks_df, routes_df = load_tables({
+    "peaks": ("peak_id", "gipfel", "gebiet", "hoehe", "lat", "lon"),
+    "routes": ("route_id", "peak_id", "grad_value"),
+}, tables=CATALOG_TABLES)
 
 # 🔹 Höhe konvertieren
 peaks_df["hoehe"] = pd.to_numeric(peaks_df["hoehe"], errors="coerce").fillna(0)
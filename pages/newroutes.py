@@ -1,7 +1,6 @@
 import pandas as pd
 import random
 from datetime import datetime, timedelta
-from supabase import create_client, Client
 import os
 from dotenv import load_dotenv
 
@@ -14,25 +13,14 @@ if not url or not key:
     print("Fehler: SUPABASE_URL oder SUPABASE_KEY wurden nicht gefunden. Stellen Sie sicher, dass Ihre .env-Datei korrekt ist.")
     exit()
 
+# IDs aus der Sequenz der Datenbank (RPC aus sql/reserve_ids.sql, in Blöcken zu RESERVE_LIMIT):
+# jede ID genau einmal, auch wenn mehrere Generatoren oder Importe gleichzeitig laufen
 try:
-    supabase: Client = create_client(url, key)
+    from db import reserve_ids
 except Exception as e:
-    print(f"Fehler beim Erstellen des Supabase-Clients: {e}")
+    print(f"Import von db fehlgeschlagen ({type(e).__name__}): {e}")
     exit()
 
-# --- Funktion, um die nächste freie ID zu finden ---
-def get_next_available_id(table_name, id_column_name):
-    try:
-        response = supabase.table(table_name).select(id_column_name).order(id_column_name, desc=True).limit(1).execute()
-        if response.data:
-            max_id = response.data[0][id_column_name]
-            return max_id + 1
-        else:
-            return 1 # Start with 1 if table is empty
-    except Exception as e:
-        print(f"Fehler beim Abrufen der höchsten ID aus {table_name}: {e}")
-        return 1 # Fallback to 1
-
 # --- Definition der Peaks aus deiner Eingabe ---
 # Dies ist der String der Peaks, für die du Routen generieren möchtest.
 # Ich gehe davon aus, dass diese Peaks bereits in deiner Supabase 'peaks'-Tabelle existieren.
@@ -83,23 +71,17 @@ roman_numerals = {
     6: 'VI', 7: 'VII', 8: 'VIII', 9: 'IX', 10: 'X'
 }
 
-# --- 1. Höchste vorhandene IDs abrufen ---
-current_route_id = get_next_available_id("routes", "route_id")
-current_ascent_id = get_next_available_id("ascents", "ascent_id")
-
-print(f"Nächste freie route_id startet bei: {current_route_id}")
-print(f"Nächste freie ascent_id startet bei: {current_ascent_id}")
+# --- 1. Anzahl Routen pro Peak festlegen und die route_ids dafür reservieren ---
+routes_per_peak = [random.choice(routes_per_peak_choices) for _ in range(len(peaks_df_specific))]
+route_ids = iter(reserve_ids("routes", sum(routes_per_peak)))
 
 
 # --- 2. Generiere Routen für die spezifischen Peaks ---
 new_routes_data = []
-generated_route_ids = [] # Speichert die IDs der neu generierten Routen
 
-for _, peak_row in peaks_df_specific.iterrows():
-    num_routes_for_this_peak = random.choice(routes_per_peak_choices)
-    
+for (_, peak_row), num_routes_for_this_peak in zip(peaks_df_specific.iterrows(), routes_per_peak):
     for i in range(num_routes_for_this_peak):
-        route_id = current_route_id
+        route_id = next(route_ids)
         peak_id = peak_row['peak_id']
         
         name = f"{random.choice(route_parts_prefix)} {random.choice(route_parts_suffix)}"
@@ -107,8 +89,6 @@ for _, peak_row in peaks_df_specific.iterrows():
         stern = random.random() < star_probability
 
         new_routes_data.append([route_id, peak_id, name, bewertung, stern])
-        generated_route_ids.append(route_id) # Diese Route wurde jetzt generiert
-        current_route_id += 1
 
 # Erstelle DataFrame für die neuen Routen
 append_routes_df = pd.DataFrame(new_routes_data, columns=['route_id', 'peak_id', 'name', 'bewertung', 'stern'])
@@ -117,35 +97,32 @@ print(f"'{len(append_routes_df)}' neue Routen wurden für die spezifischen Peaks
 
 
 # --- 3. Generiere Ascents für einen Teil der NEUEN Routen ---
+ascended_routes = append_routes_df[[random.random() < ascent_probability for _ in range(len(append_routes_df))]]
+ascent_ids = iter(reserve_ids("ascents", len(ascended_routes)))
 new_ascents_data = []
 
 # Iteriere nur über die Routen, die wir gerade generiert haben
-for _, route_row in append_routes_df.iterrows():
-    if random.random() < ascent_probability:
-        ascent_id = current_ascent_id
-        route_id = route_row['route_id']
-        
-        # Zufälliges Datum in den letzten 2 Jahren
-        days_ago = random.randint(1, 730)
-        ascent_date = (datetime.now() - timedelta(days=days_ago)).strftime('%Y-%m-%d')
-        
-        # Stelle sicher, dass 'climber_id' und 'bewertung' Spalten in deiner 'ascents'-Tabelle existieren
-        # und die Typen übereinstimmen.
-        new_ascents_data.append([ascent_id, route_id, ascent_date, dummy_climber_id, route_row['bewertung']])
-
-        current_ascent_id += 1
+for _, route_row in ascended_routes.iterrows():
+    ascent_id = next(ascent_ids)
+    route_id = route_row['route_id']
+    
+    # Zufälliges Datum in den letzten 2 Jahren
+    days_ago = random.randint(1, 730)
+    ascent_date = (datetime.now() - timedelta(days=days_ago)).strftime('%Y-%m-%d')
+    
+    # Stelle sicher, dass 'climber_id' und 'bewertung' Spalten in deiner 'ascents'-Tabelle existieren
+    # und die Typen übereinstimmen.
+    new_ascents_data.append([ascent_id, route_id, ascent_date, dummy_climber_id, route_row['bewertung']])
 
 # Erstelle DataFrame für die neuen Ascents
 append_ascents_df = pd.DataFrame(new_ascents_data, columns=['ascent_id', 'route_id', 'date', 'climber_id', 'bewertung'])
 append_ascents_df.to_csv('append_ascents.csv', index=False)
 print(f"'{len(append_ascents_df)}' neue Ascents wurden für die generierten Routen in 'append_ascents.csv' generiert.")
 
-print("\n--- Import-Anleitung für Supabase ---")
-print("1. Gehe in deinem Supabase-Projekt zum 'Table Editor'.")
-print(f"2. Wähle die 'routes'-Tabelle. Klicke auf 'Insert' -> 'Upload CSV' und wähle die Datei 'append_routes.csv'.")
-print("   Stelle sicher, dass 'route_id', 'peak_id', 'name', 'bewertung', 'stern' korrekt zugeordnet werden.")
-print("   Supabase sollte neue Zeilen hinzufügen, ohne bestehende zu löschen.")
-print(f"3. Wähle die 'ascents'-Tabelle. Klicke auf 'Insert' -> 'Upload CSV' und wähle die Datei 'append_ascents.csv'.")
-print("   Stelle sicher, dass 'ascent_id', 'route_id', 'date', 'climber_id', 'bewertung' korrekt zugeordnet werden.")
-print("   Auch hier sollten neue Zeilen hinzugefügt werden.")
-print("\nNach dem Import starte deine Streamlit-App neu.")
\ No newline at end of file
+print("\n--- Import ---")
+print("Die IDs sind in der Datenbank reserviert; importieren mit")
+print("   python importer.py routes append_routes.csv")
+print("   python importer.py ascents append_ascents.csv")
+print("oder über die Seite 'import' der Streamlit-App.")
+print("\nEin Neustart der App ist nicht nötig: nach dem Import über die Seite sind die Daten sofort da,")
+print("nach dem CLI-Import spätestens beim nächsten Abgleich (SYNC_INTERVAL, mit CHANGE_FEED_DSN sofort).")
\ No newline at end of file
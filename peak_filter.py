@@ -0,0 +1,121 @@
+# Filter-Engine für die Sidebar-Filter der Kartenseiten: vorberechnete Bitmaps statt Filterketten
+import copy
+import functools
+
+import numpy as np
+import pandas as pd
+
+from spatial_index import GridIndex
+
+# Spalten, ohne die ein Gipfel nicht auf die Karte kann (wie bisher beim dropna vor dem Zeichnen)
+PLOT_COLUMNS = ["lat", "lon", "hoehe", "gipfel", "gebiet", "anzahl_routen",
+                "peak_has_star", "has_done_route", "kommentar"]
+
+
+def value_bitmaps(values: pd.Series) -> dict:
+    """Eine bool-Maske je vorkommendem Wert (fehlende Werte bekommen keine)."""
+    codes, uniques = pd.factorize(values, sort=True)
+    return {value: codes == i for i, value in enumerate(uniques)}
+
+
+class PeakFilter:
+    """
+    Hält zur Gipfel-Zusammenfassung (`frame`) je Filterspalte vorberechnete Masken:
+    eine Bitmap pro Gebiet und pro max_bewertung_per_peak, Stern/geklettert als bool-Arrays
+    und die Höhe einmal sortiert. Ein Filterwechsel kombiniert nur noch Masken per & und
+    zieht die Zeilen am Ende einmal aus dem Frame – ohne Zwischen-DataFrames.
+    """
+
+    def __init__(self, frame: pd.DataFrame, index=None):
+        self.frame = frame
+        # Datenstand, aus dem frame stammt (setzt peak_summary); Teil des Schlüssels gecachter Kartenebenen
+        self.version = None
+        # Liefert den räumlichen Index zu den Gipfeln (ohne Vorgabe: einmal über frame gebaut)
+        self.index = index or functools.cache(self._build_index)
+        n = len(frame)
+        self.all = np.ones(n, dtype=bool)
+        self.gebiet = value_bitmaps(frame["gebiet"]) if "gebiet" in frame.columns else {}
+        self.bewertung = (value_bitmaps(frame["max_bewertung_per_peak"])
+                          if "max_bewertung_per_peak" in frame.columns else {})
+        self.star = frame["peak_has_star"].to_numpy(dtype=bool) if "peak_has_star" in frame.columns else None
+        self.done = frame["has_done_route"].to_numpy(dtype=bool) if "has_done_route" in frame.columns else None
+
+        # Höhe sortiert: "höchstens x Meter" ist ein searchsorted plus ein Präfix der Reihenfolge
+        # (fehlende/ungültige Höhen zählen wie bisher als 0)
+        self.hoehe_range = None
+        if "hoehe" in frame.columns:
+            hoehe = pd.to_numeric(frame["hoehe"], errors="coerce")
+            if hoehe.notna().any():
+                self.hoehe_range = (int(hoehe.min()), int(hoehe.max()))
+            hoehe = hoehe.fillna(0).to_numpy(dtype=float)
+            self.hoehe_order = np.argsort(hoehe, kind="stable")
+            self.hoehe_sorted = hoehe[self.hoehe_order]
+        else:
+            self.hoehe_order = self.hoehe_sorted = None
+
+        # Gipfel mit allen Werten für die Karte
+        columns = [col for col in PLOT_COLUMNS if col in frame.columns]
+        self.complete = frame[columns].notna().all(axis=1).to_numpy(dtype=bool) if columns else self.all
+
+    def __len__(self):
+        return len(self.frame)
+
+    def with_summary(self, frame: pd.DataFrame) -> "PeakFilter":
+        """
+        Filter für eine neue Zusammenfassung mit denselben Gipfeln in derselben Reihenfolge, in
+        der sich nur die Begehungs-Kennzahlen geändert haben: Gebiets-Bitmaps, Höhen-Sortierung
+        und räumlicher Index werden übernommen, nur Bewertung/geklettert neu berechnet.
+        """
+        updated = copy.copy(self)
+        updated.frame = frame
+        if "max_bewertung_per_peak" in frame.columns:
+            updated.bewertung = value_bitmaps(frame["max_bewertung_per_peak"])
+        if "has_done_route" in frame.columns:
+            updated.done = frame["has_done_route"].to_numpy(dtype=bool)
+        columns = [col for col in PLOT_COLUMNS if col in frame.columns]
+        updated.complete = frame[columns].notna().all(axis=1).to_numpy(dtype=bool) if columns else self.all
+        return updated
+
+    def _build_index(self) -> GridIndex:
+        return GridIndex(self.frame["lat"], self.frame["lon"],
+                         self.frame["peak_id"].to_numpy(dtype="int64", na_value=-1))
+
+    def _value(self, bitmaps: dict, value) -> np.ndarray:
+        mask = bitmaps.get(value)
+        return mask if mask is not None else np.zeros(len(self), dtype=bool)
+
+    def height_mask(self, max_hoehe: float) -> np.ndarray:
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.hoehe_order[:np.searchsorted(self.hoehe_sorted, max_hoehe, side="right")]] = True
+        return mask
+
+    def mask(self, gebiet=None, bewertung=None, star=None, max_hoehe=None, done=None) -> np.ndarray:
+        """
+        Kombinierte Maske; None heißt "nicht filtern". Filter auf Spalten, die das Frame nicht
+        hat, werden ignoriert (wie bisher auf den Seiten).
+        """
+        mask = self.all.copy()
+        if gebiet is not None and self.gebiet:
+            mask &= self._value(self.gebiet, gebiet)
+        if bewertung is not None and self.bewertung:
+            mask &= self._value(self.bewertung, bewertung)
+        if star is not None and self.star is not None:
+            mask &= self.star if star else ~self.star
+        if max_hoehe is not None and self.hoehe_order is not None:
+            mask &= self.height_mask(max_hoehe)
+        if done is not None and self.done is not None:
+            mask &= self.done if done else ~self.done
+        return mask
+
+    def rows(self, mask: np.ndarray) -> pd.DataFrame:
+        """Die ausgewählten Zeilen, einmal aus dem Frame gezogen."""
+        return self.frame.take(np.flatnonzero(mask))
+
+    def select(self, **filters) -> tuple[pd.DataFrame, int]:
+        """
+        Gipfel für die Karte: (Zeilen, die mask(**filters) erfüllen und alle Kartenwerte haben,
+        Anzahl der wegen fehlender Kartenwerte aussortierten).
+        """
+        mask = self.mask(**filters)
+        dropped = int((mask & ~self.complete).sum())
+        return self.rows(mask & self.complete), dropped
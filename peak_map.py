@@ -0,0 +1,191 @@
+# Gemeinsame Kartenseite für Comic_map, Comickarte, Opentopo_map, Filter_Farben und
+# Filter_Farben_Kommentar; die Seiten unterscheiden sich nur in Kacheln, Spalten und view_key
+import folium
+import streamlit as st
+from streamlit_folium import st_folium
+
+from climber import current_climber
+from geometry import CLUSTER_MIN_PEAKS, build_map_triangles
+from layer_cache import add_cached_triangles, layer_key
+from map_view import (
+    clicked_peak_id, follow_area, left_viewport, map_center, map_zoom, remember_view, viewport_box,
+)
+from peak_summary import load_peak_filter
+from tracing import show_trace_panel, span, start_trace
+
+
+def fetch_data(columns: dict[str, tuple], climber_id=None):
+    """Gipfel inkl. anzahl_routen, peak_has_star, max_bewertung_per_peak, has_done_route (und kommentar)."""
+    try:
+        with span("fetch") as record:
+            peak_filter = load_peak_filter(columns, climber_id)
+            record["rows"] = len(peak_filter)
+        return peak_filter
+    except Exception as e:
+        st.error(f"Error loading data from Supabase: {e}")
+        return None
+
+
+def peak_map_page(page: str, columns: dict[str, tuple], view_key: str, tiles: str = "OpenStreetMap", attr: str | None = None):
+    """
+    Die komplette Kartenseite: Sidebar-Filter, Tabelle, Gipfel-Karte und Klick-Auswahl.
+    `page` benennt den Trace, `columns` ist das Spalten-Schema der Seite (mit "kommentar" in
+    ascents auch die Kommentar-Spalte), `view_key` der gemerkte Ausschnitt (map_view.py),
+    `tiles`/`attr` die Kacheln der Karte.
+    """
+    st.set_page_config(layout="wide")
+    st.title("Gipfelbuch - Kletter-App")
+    trace = start_trace(page)
+
+    # Im Mehrbenutzer-Modus zählen nur die Begehungen dieses Kletterers als geklettert
+    climber_id = current_climber()
+    peak_filter = fetch_data(columns, climber_id)
+
+    if peak_filter is None or len(peak_filter) == 0:
+        st.warning("No data available or error loading data. Please check your Supabase connection and tables.")
+        show_trace_panel(trace)
+        st.stop()
+
+
+    # 2. Filteroptionen
+    st.sidebar.title("Filter Options")
+
+    gebiet_filter_options = sorted(peak_filter.gebiet)
+    if len(gebiet_filter_options) > 0:
+        gebiet_filter = st.sidebar.selectbox('Select an area', options=['All Areas'] + gebiet_filter_options)
+    else:
+        st.sidebar.warning("No areas available for filtering.")
+        gebiet_filter = 'All Areas'
+
+    schwierigkeit_filter = st.sidebar.selectbox(
+        'Select Difficulty',
+        options=["All Ratings", "Easy", "Okay", "Hard"]
+    )
+    difficulty_filter_value = None
+    if schwierigkeit_filter != "All Ratings":
+        difficulty_filter_value = {
+            "Easy": 1,
+            "Okay": 2,
+            "Hard": 3
+        }[schwierigkeit_filter]
+
+    sternchen_filter = st.sidebar.radio(
+        "Select routes with or without a star",
+        options=["All", "Has Star", "No Star"]
+    )
+    if sternchen_filter == "Has Star":
+        sternchen_filter_value = True
+    elif sternchen_filter == "No Star":
+        sternchen_filter_value = False
+    else:
+        sternchen_filter_value = None
+
+    if peak_filter.hoehe_range is not None:
+        min_hoehe, max_hoehe = peak_filter.hoehe_range
+        hoehe_filter = st.sidebar.slider('Select maximum rock height in meters', min_value=min_hoehe, max_value=max_hoehe, step=10, value=max_hoehe)
+    else:
+        st.sidebar.warning("Height filter not available as 'hoehe' column is missing or not numeric.")
+        hoehe_filter = None
+
+    gemacht_filter = st.sidebar.checkbox('Show climbed routes')
+
+    # Nur den sichtbaren Kartenausschnitt (plus Rand) zeichnen – standardmäßig an bei großen Datenmengen
+    viewport_filter = st.sidebar.checkbox('Only draw peaks in the visible map area', value=len(peak_filter) > CLUSTER_MIN_PEAKS)
+
+    # 3. Apply Filters - alle Filter als vorberechnete Masken kombiniert (peak_filter.py) bzw.
+    # mit SERVER_QUERY=1 als eine Abfrage in der Datenbank (server_query.py)
+    filters = dict(
+        gebiet=None if gebiet_filter == 'All Areas' else gebiet_filter,
+        bewertung=difficulty_filter_value,
+        star=sternchen_filter_value,
+        max_hoehe=hoehe_filter,
+        done=True if gemacht_filter else None,
+    )
+    with span("filter", **filters) as record:
+        filtered_peaks, dropped = peak_filter.select(**filters)
+        record["rows"] = len(filtered_peaks)
+
+    # **Gipfel ohne Kartenwerte (Koordinaten, Höhe etc.) werden dabei aussortiert**
+    if dropped:
+        st.warning(f"Es wurden {dropped} Gipfel mit fehlenden Daten (Koordinaten, Höhe etc.) für die Kartenanzeige entfernt.")
+
+    # 5. Ausgabe der gefilterten Gebirgspunkte als Liste
+    st.subheader("Gefilterte Gebirgspunkte")
+    if not filtered_peaks.empty:
+        display_columns = ['gipfel', 'gebiet', 'hoehe', 'anzahl_routen']
+        if 'max_bewertung_per_peak' in filtered_peaks.columns:
+            display_columns.append('max_bewertung_per_peak')
+        if 'peak_has_star' in filtered_peaks.columns:
+            display_columns.append('peak_has_star')
+        if 'has_done_route' in filtered_peaks.columns:
+            display_columns.append('has_done_route')
+        if 'kommentar' in filtered_peaks.columns:
+            display_columns.append('kommentar')
+
+        actual_display_columns = [col for col in display_columns if col in filtered_peaks.columns]
+        
+        st.dataframe(filtered_peaks[actual_display_columns])
+        st.write(f"Gesamtanzahl der angezeigten Gipfel nach Filtern und Bereinigung: {len(filtered_peaks)}")
+    else:
+        st.info("Keine Gipfel gefunden, die den aktuellen Filtern entsprechen oder alle notwendigen Daten für die Anzeige haben.")
+
+    # 6. Kartenmittelpunkt berechnen
+    st.subheader("Interaktive Karte")
+    if not filtered_peaks.empty:
+        lat_center = filtered_peaks["lat"].mean()
+        lon_center = filtered_peaks["lon"].mean()
+    else:
+        st.info("No peaks available to center the map and display triangles.")
+        show_trace_panel(trace)
+        return
+
+    # Zoom und Ausschnitt vom letzten Rerun übernehmen (bestimmt auch den Detailgrad);
+    # nach einem Gebietswechsel springt die Karte auf die neuen Gipfel
+    follow_area(filters["gebiet"], view_key)
+    zoom = map_zoom(view_key)
+
+    # 7. Folium-Karte erstellen
+    m = folium.Map(
+        location=map_center([lat_center, lon_center], view_key),
+        zoom_start=zoom,
+        tiles=tiles,
+        attr=attr,
+    )
+
+    # 8. Dreiecke als Polygone einfügen (Größe nach Höhe)
+    # Koordinaten, Größen, Farben und Tooltips aller Gipfel werden in einem Durchlauf berechnet;
+    # weit herausgezoomt werden viele Gipfel zu Gitterzellen zusammengefasst
+    map_peaks = filtered_peaks
+    box = None
+    if viewport_filter:
+        # Gipfel im Ausschnitt über den räumlichen Index holen statt alle gefilterten zu zeichnen
+        with span("viewport") as record:
+            box = viewport_box(map_center([lat_center, lon_center], view_key), zoom, view_key)
+            in_view = peak_filter.index().bbox(*box)
+            map_peaks = filtered_peaks[filtered_peaks["peak_id"].isin(in_view)]
+            record["rows"] = len(map_peaks)
+        trace.note(f"Peaks in the visible map area: {len(map_peaks)} of {len(filtered_peaks)}")
+    with span("geometry", zoom=zoom) as record:
+        # Gleiche Filter, Zoom, Ausschnitt und Datenstand: fertig gerenderte Ebene aus dem gemeinsamen Cache
+        key = layer_key(peak_filter, filters, zoom, box)
+        record["rows"] = add_cached_triangles(m, key, lambda: build_map_triangles(map_peaks, zoom))
+
+    with span("st_folium"):
+        st_data = st_folium(m, width=1400, height=600)
+
+    # Neue Zoomstufe -> Detailgrad (einzelne Gipfel oder Zellen) passt nicht mehr, neu zeichnen;
+    # im Ausschnitt-Modus auch, wenn aus dem gezeichneten Bereich herausgeschoben wurde
+    zoom_changed = remember_view(st_data, view_key)
+    if zoom_changed or (viewport_filter and left_viewport(view_key)):
+        st.rerun()
+
+    # Klick auf die Karte: nächsten angezeigten Gipfel über den räumlichen Index nachschlagen
+    clicked_id = clicked_peak_id(st_data, peak_filter.index(), filtered_peaks["peak_id"].dropna())
+    if clicked_id is not None:
+        clicked = filtered_peaks[filtered_peaks["peak_id"] == clicked_id]
+        if not clicked.empty:
+            st.subheader(f"Selected peak: {clicked['gipfel'].iloc[0]}")
+            st.dataframe(clicked)
+
+    show_trace_panel(trace)
+
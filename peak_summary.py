@@ -0,0 +1,309 @@
+# Gipfel-Zusammenfassung: alle Kennzahlen pro Gipfel, die die Kartenseiten brauchen
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from db import (CATALOG_TABLES, MULTI_USER, climber_version, get_climber_ascents, get_snapshot, select_list,
+                shared_frame)
+from peak_filter import PeakFilter
+from server_query import SERVER_QUERY, ServerPeakFilter
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+def build_peak_summary(peaks_df: pd.DataFrame, routes_df: pd.DataFrame, ascents_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Eine Zeile pro Gipfel mit den Spalten anzahl_routen, peak_has_star, has_done_route,
+    max_bewertung_per_peak und kommentar (nur, wenn die Begehungen einen mitbringen).
+    Routen und Begehungen werden dafür je genau einmal gruppiert, ohne die Tabellen zu mergen.
+    """
+    # Routen: ein groupby für Anzahl, Stern und "mindestens eine gemachte Route"
+    stern = routes_df["stern"] if "stern" in routes_df.columns else pd.Series(False, index=routes_df.index)
+    routes = pd.DataFrame({
+        "peak_id": routes_df["peak_id"],
+        "stern": stern.astype(bool),
+        "is_done_route": routes_df["route_id"].isin(ascents_df["route_id"].dropna().unique()),
+    })
+    per_peak = routes.groupby("peak_id").agg(
+        anzahl_routen=("stern", "size"),
+        peak_has_star=("stern", "any"),
+        has_done_route=("is_done_route", "any"),
+    )
+
+    # Begehungen: peak_id über die route_id nachschlagen (map statt merge), dann ein groupby
+    route_to_peak = routes_df.drop_duplicates("route_id").set_index("route_id")["peak_id"]
+    ascents = pd.DataFrame({"peak_id": ascents_df["route_id"].map(route_to_peak)})
+    aggregations = {}
+    if "bewertung" in ascents_df.columns:
+        ascents["bewertung"] = ascents_df["bewertung"]
+        aggregations["max_bewertung_per_peak"] = ("bewertung", "max")
+    if "kommentar" in ascents_df.columns:
+        # Erster Kommentar pro Gipfel (wie bisher drop_duplicates(keep='first'))
+        ascents["kommentar"] = ascents_df["kommentar"]
+        aggregations["kommentar"] = ("kommentar", "first")
+    if aggregations:
+        per_peak = per_peak.join(ascents.groupby("peak_id").agg(**aggregations), how="outer")
+
+    summary = peaks_df.join(per_peak, on="peak_id")
+    summary["anzahl_routen"] = summary["anzahl_routen"].fillna(0).astype(int)
+    summary["peak_has_star"] = summary["peak_has_star"].fillna(False).astype(bool)
+    summary["has_done_route"] = summary["has_done_route"].fillna(False).astype(bool)
+    if "max_bewertung_per_peak" in summary.columns:
+        summary["max_bewertung_per_peak"] = summary["max_bewertung_per_peak"].fillna(0).astype(int)
+    else:
+        summary["max_bewertung_per_peak"] = 0
+    if "kommentar" in summary.columns:
+        summary["kommentar"] = summary["kommentar"].fillna("").astype(str)
+    return summary
+
+
+class PeakAggregates:
+    """
+    Die Begehungs-Kennzahlen der Zusammenfassung (has_done_route, max_bewertung_per_peak,
+    kommentar) als Arrays pro Gipfel plus Zähler pro Route. Neue Begehungen werden mit add()
+    eingerechnet – je Begehung eine Route und ein Gipfel, O(1), ohne groupby über alle Begehungen.
+    Routen und Gipfel selbst ändern sich dabei nicht (sonst: neu bauen).
+    """
+
+    def __init__(self, peaks_df: pd.DataFrame, routes_df: pd.DataFrame, ascents_df: pd.DataFrame):
+        self.summary = shared_frame(build_peak_summary(peaks_df, routes_df, ascents_df), "peak_summary")
+        self.has_bewertung = "bewertung" in ascents_df.columns
+        self.has_kommentar = "kommentar" in ascents_df.columns
+
+        # Nachschlagen in O(1): peak_id -> Zeile der Zusammenfassung, route_id -> peak_id
+        peak_pos = pd.Series(np.arange(len(self.summary)), index=self.summary["peak_id"])
+        peak_pos = peak_pos[peak_pos.index.notna() & ~peak_pos.index.duplicated()]
+        self.peak_pos = peak_pos.to_dict()
+        routes = routes_df.drop_duplicates("route_id")
+        self.route_peak = dict(zip(routes["route_id"], routes["peak_id"]))
+
+        # Begehungen je Route und je Gipfel (über die Routen) sowie gemachte Routen je Gipfel
+        self.route_ascents = ascents_df["route_id"].dropna().value_counts().to_dict()
+        route_pos = pd.Series(routes["peak_id"].map(peak_pos).to_numpy(), index=routes["route_id"])
+        positions = ascents_df["route_id"].map(route_pos).dropna().to_numpy(dtype=np.int64)
+        self.peak_ascents = np.bincount(positions, minlength=len(self.summary))
+        done = route_pos[route_pos.index.isin(list(self.route_ascents))].dropna().to_numpy(dtype=np.int64)
+        self.done_routes = np.bincount(done, minlength=len(self.summary))
+
+        self.max_bewertung = self.summary["max_bewertung_per_peak"].to_numpy(dtype=int).copy()
+        self.kommentar = (self.summary["kommentar"].to_numpy(dtype=object).copy()
+                          if "kommentar" in self.summary.columns else None)
+        # Eingerechnete Begehungen: Anzahl, letzte ascent_id und alle IDs sortiert (für can_extend())
+        ids = ascents_df["ascent_id"].to_numpy(dtype="int64", na_value=-1)
+        self.count = len(ids)
+        self.last_id = ids[-1] if len(ids) else None
+        self.known_ids = np.sort(ids)
+
+    def _known(self, ids: np.ndarray) -> np.ndarray:
+        pos = np.minimum(np.searchsorted(self.known_ids, ids), max(len(self.known_ids) - 1, 0))
+        return (self.known_ids[pos] == ids) if len(self.known_ids) else np.zeros(len(ids), dtype=bool)
+
+    def can_extend(self, ascents_df: pd.DataFrame) -> bool:
+        """
+        Sind in `ascents_df` nur Begehungen hinten dazugekommen (keine geändert oder gelöscht)?
+        Geprüft wird nur das Ende: die bisher letzte Begehung steht noch an ihrer Stelle, und keine
+        der neuen ist schon eingerechnet (ein Sync hängt geänderte Zeilen hinten an) –
+        O(neue · log n) statt eines Vergleichs aller Begehungen.
+        """
+        n = self.count
+        if len(ascents_df) < n:
+            return False
+        tail = ascents_df["ascent_id"].iloc[max(n - 1, 0):].to_numpy(dtype="int64", na_value=-1)
+        if n:
+            if tail[0] != self.last_id:
+                return False
+            tail = tail[1:]
+        return not self._known(tail).any()
+
+    def add(self, route_id, bewertung=None, kommentar=None) -> int | None:
+        """Eine neue Begehung einrechnen; liefert die Zeile des betroffenen Gipfels (None: unbekannt)."""
+        count = self.route_ascents.get(route_id, 0)
+        self.route_ascents[route_id] = count + 1
+        pos = self.peak_pos.get(self.route_peak.get(route_id))
+        if pos is None:
+            return None
+        if count == 0:
+            self.done_routes[pos] += 1
+        if self.has_bewertung and bewertung is not None and bewertung > self.max_bewertung[pos]:
+            self.max_bewertung[pos] = bewertung
+        # Wie groupby(...).first(): der Kommentar der ersten Begehung am Gipfel bleibt
+        if self.has_kommentar and self.kommentar is not None and self.peak_ascents[pos] == 0:
+            self.kommentar[pos] = "" if kommentar is None else str(kommentar)
+        self.peak_ascents[pos] += 1
+        return pos
+
+    def extend(self, ascents_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Rechnet die Begehungen ab Zeile self.count ein (siehe can_extend()) und liefert die
+        neue Zusammenfassung; das bisherige Frame bleibt unverändert.
+        """
+        new = ascents_df.iloc[self.count:]
+        bewertung = new["bewertung"] if self.has_bewertung else pd.Series(None, index=new.index)
+        kommentar = new["kommentar"] if self.has_kommentar else pd.Series(None, index=new.index)
+        for route_id, value, text in zip(new["route_id"], bewertung, kommentar):
+            if pd.notna(route_id):
+                self.add(route_id, None if pd.isna(value) else int(value), text)
+        ids = new["ascent_id"].to_numpy(dtype="int64", na_value=-1)
+        if len(ids):
+            ids_sorted = np.sort(ids)
+            self.known_ids = np.insert(self.known_ids, np.searchsorted(self.known_ids, ids_sorted), ids_sorted)
+            self.count += len(ids)
+            self.last_id = ids[-1]
+
+        # Nur die drei Spalten werden ersetzt, alle anderen teilt das neue Frame mit dem alten
+        summary = self.summary.copy(deep=False)
+        summary["has_done_route"] = self.done_routes > 0
+        summary["max_bewertung_per_peak"] = self.max_bewertung.copy()
+        if self.kommentar is not None:
+            summary["kommentar"] = self.kommentar.copy()
+        self.summary = shared_frame(summary, "peak_summary")
+        return self.summary
+
+    def check(self, peaks_df: pd.DataFrame, routes_df: pd.DataFrame, ascents_df: pd.DataFrame) -> list[str]:
+        """Konsistenzprüfung: Spalten, in denen self.summary vom kompletten Neubau abweicht."""
+        full = build_peak_summary(peaks_df, routes_df, ascents_df)
+        return [col for col in ("anzahl_routen", "peak_has_star", "has_done_route", "max_bewertung_per_peak", "kommentar")
+                if col in full.columns
+                and not np.array_equal(full[col].to_numpy(dtype=object), self.summary[col].to_numpy(dtype=object))]
+
+
+# Nach so vielen inkrementellen Updates wird einmal komplett neu gerechnet und verglichen
+CHECK_EVERY = 50
+
+
+class _SummaryState:
+    # Zusammenfassung + Filter-Engine eines Spalten-Schemas und die Tabellen-Versionen dazu
+    def __init__(self, versions: dict, aggregates: PeakAggregates, peak_filter: PeakFilter):
+        self.versions = versions
+        self.aggregates = aggregates
+        self.filter = peak_filter
+        # Tabellen-Versionen kommen aus einem prozessweiten Zähler, sind also auch über
+        # Spalten-Schemas hinweg eindeutig
+        peak_filter.version = tuple(sorted(versions.items()))
+        self.updates = 0
+
+
+@st.cache_resource
+def _summary_states() -> dict:
+    # Prozessweit: Spalten-Schema -> _SummaryState
+    return {}
+
+
+_summary_lock = threading.Lock()
+
+
+def _build_state(versions: dict, frames: dict, snapshot) -> _SummaryState:
+    with span("aggregation") as record:
+        aggregates = PeakAggregates(frames["peaks"], frames["routes"], frames["ascents"])
+        record["rows"] = len(aggregates.summary)
+    # Räumliche Abfragen über den Index des Snapshots (wird bei upsert_peaks() sofort ergänzt)
+    with span("filter_build") as record:
+        record["rows"] = len(aggregates.summary)
+        peak_filter = PeakFilter(aggregates.summary, index=snapshot.peak_index)
+    return _SummaryState(versions, aggregates, peak_filter)
+
+
+def _extend_state(state: _SummaryState, versions: dict, frames: dict, snapshot) -> _SummaryState:
+    aggregates = state.aggregates
+    try:
+        with span("aggregation", incremental=True) as record:
+            record["rows"] = len(frames["ascents"]) - aggregates.count
+            summary = aggregates.extend(frames["ascents"])
+    except Exception as e:
+        # Halb eingerechnete Begehungen nicht weiterverwenden
+        logger.warning("Gipfel-Kennzahlen konnten nicht nachgeführt werden, baue neu: %s", e)
+        return _build_state(versions, frames, snapshot)
+
+    updates = state.updates + 1
+    if updates >= CHECK_EVERY:
+        mismatched = aggregates.check(frames["peaks"], frames["routes"], frames["ascents"])
+        if mismatched:
+            logger.warning("Inkrementelle Gipfel-Kennzahlen weichen ab (%s), baue neu.", ", ".join(mismatched))
+            return _build_state(versions, frames, snapshot)
+        updates = 0
+    state = _SummaryState(versions, aggregates, state.filter.with_summary(summary))
+    state.updates = updates
+    return state
+
+
+def _summary_state(snapshot) -> _SummaryState:
+    """
+    Zusammenfassung und Filter für den aktuellen Stand des Snapshots, einmal pro Prozess.
+    Sind seit dem letzten Aufruf nur Begehungen dazugekommen, werden sie per
+    PeakAggregates.extend() eingerechnet; sonst (und alle CHECK_EVERY Updates zur Kontrolle)
+    wird komplett neu gebaut.
+    """
+    schema = repr(sorted(snapshot.specs.items()))
+    # Versionen vor den Frames lesen: läuft parallel ein Sync, wird höchstens einmal zu viel gerechnet
+    versions = dict(snapshot.versions)
+    frames = dict(snapshot.frames)
+    with _summary_lock:
+        state = _summary_states().get(schema)
+        if state is not None and state.versions == versions:
+            return state
+        if (state is not None
+                and all(state.versions[t] == versions[t] for t in versions if t != "ascents")
+                and state.aggregates.can_extend(frames["ascents"])):
+            state = _extend_state(state, versions, frames, snapshot)
+        else:
+            state = _build_state(versions, frames, snapshot)
+        _summary_states()[schema] = state
+        return state
+
+
+def load_peak_summary(columns: dict[str, tuple] | None = None) -> pd.DataFrame:
+    """
+    Gecachte Gipfel-Zusammenfassung für das Spalten-Schema einer Seite. Neu berechnet wird
+    nur, wenn sich der Datenstand ändert – nicht bei jedem Rerun durch ein Widget; neue
+    Begehungen werden nur eingerechnet (siehe PeakAggregates).
+    Das Frame teilen sich alle Sessions; es darf nicht verändert werden.
+    """
+    return _summary_state(get_snapshot(columns)).aggregates.summary
+
+
+# Mehrbenutzer-Modus: so viele Kletterer behalten ihre Zusammenfassung gleichzeitig im Cache
+MAX_ACTIVE_CLIMBERS = 64
+
+
+@st.cache_resource(max_entries=MAX_ACTIVE_CLIMBERS, show_spinner=False)
+def _cached_climber_filter(schema: str, version: int, climber_id: str | None, climber_version: int,
+                           _peaks_df, _routes_df, _ascents_df, _snapshot) -> PeakFilter:
+    # Katalog (peaks, routes) von allen geteilt; nur die Begehungen gehören dem Kletterer
+    with span("aggregation", climber_id=climber_id) as record:
+        summary = shared_frame(build_peak_summary(_peaks_df, _routes_df, _ascents_df), "peak_summary")
+        record["rows"] = len(summary)
+    peak_filter = PeakFilter(summary, index=_snapshot.peak_index)
+    peak_filter.version = (schema, version, climber_id, climber_version)
+    return peak_filter
+
+
+def load_peak_filter(columns: dict[str, tuple] | None = None, climber_id: str | None = None) -> PeakFilter | ServerPeakFilter:
+    """
+    Filter-Engine über die Gipfel-Zusammenfassung (siehe load_peak_summary()); einmal pro
+    Datenstand gebaut und von allen Sessions geteilt. `.frame` darf nicht verändert werden.
+    Mit SERVER_QUERY=1 filtert stattdessen die Datenbank (server_query.ServerPeakFilter).
+    Mit MULTI_USER=1 zählen nur die Begehungen von `climber_id` (ohne: keine), und statt aller
+    Begehungen wird nur der Katalog geladen. SERVER_QUERY gilt dann nicht: die View
+    peak_summary kennt keinen Kletterer (has_done_route zählt dort alle Begehungen).
+    """
+    if SERVER_QUERY and not MULTI_USER:
+        return ServerPeakFilter(columns)
+    if MULTI_USER:
+        catalog = get_snapshot(columns, tables=CATALOG_TABLES)
+        version = catalog.version
+        frames = catalog.frames
+        # Version vor den Begehungen lesen (wie beim Snapshot): höchstens einmal zu viel gerechnet
+        ascents_version = climber_version(climber_id)
+        ascents_columns = (columns or {}).get("ascents")
+        ascents = get_climber_ascents(climber_id, ascents_columns)
+        # Die Begehungs-Spalten gehören zum Schlüssel: mit/ohne kommentar ergibt andere Zusammenfassungen
+        schema = repr((sorted(catalog.specs.items()), select_list(ascents_columns, "ascents")))
+        return _cached_climber_filter(
+            schema, version, climber_id, ascents_version,
+            frames["peaks"], frames["routes"], ascents, catalog,
+        )
+    return _summary_state(get_snapshot(columns)).filter
@@ -0,0 +1,114 @@
+# Routen-Abfragen: Bedingungen auf Routen-Ebene auswerten und auf Gipfel hochrechnen
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from db import page_frames
+
+
+class RouteQuery:
+    """
+    Hält routes als Arrays plus einen vorberechneten Index Route -> Gipfel-Position, dazu die
+    Begehungen als Route-Positionen. Eine Abfrage ist eine bool-Maske über alle Routen
+    (Schwierigkeit, Stern, geklettert – optional von einem Kletterer – sowie Gebiet/Höhe des
+    Gipfels); peaks() rechnet sie per bincount auf eindeutige Gipfel hoch. Kein Merge pro Rerun.
+    """
+
+    def __init__(self, peaks_df: pd.DataFrame, routes_df: pd.DataFrame, ascents_df: pd.DataFrame):
+        self.peaks_df = peaks_df.reset_index(drop=True)
+        self.routes_df = routes_df.reset_index(drop=True)
+        self.n_peaks = len(self.peaks_df)
+        n = len(self.routes_df)
+
+        # Route -> Position des Gipfels in peaks_df (-1, wenn der Gipfel fehlt)
+        peak_pos = pd.Series(np.arange(self.n_peaks), index=self.peaks_df["peak_id"])
+        peak_pos = peak_pos[~peak_pos.index.duplicated()]
+        self.peak_pos = self.routes_df["peak_id"].map(peak_pos).fillna(-1).to_numpy(dtype=np.int64)
+        self.known = self.peak_pos >= 0
+
+        self.bewertung = (pd.to_numeric(self.routes_df["bewertung"], errors="coerce").to_numpy(dtype=float)
+                          if "bewertung" in self.routes_df.columns else np.full(n, np.nan))
+        self.stern = (self.routes_df["stern"].to_numpy(dtype=bool)
+                      if "stern" in self.routes_df.columns else np.zeros(n, dtype=bool))
+
+        # Begehungen -> Route-Position; eine Begehung mit done == False zählt nicht als geklettert
+        route_pos = pd.Series(np.arange(n), index=self.routes_df["route_id"])
+        route_pos = route_pos[~route_pos.index.duplicated()]
+        ascents = ascents_df
+        if "done" in ascents.columns:
+            ascents = ascents[ascents["done"].fillna(False).astype(bool)]
+        self.ascent_route = ascents["route_id"].map(route_pos).fillna(-1).to_numpy(dtype=np.int64)
+        self.ascent_climber = (ascents["climber_id"].fillna("").astype(str).to_numpy()
+                               if "climber_id" in ascents.columns else None)
+        self.done = self._done_mask(self.ascent_route)
+        self._done_by = {}
+
+        # Routen je Gipfel (für Tooltip/Tabelle)
+        self.anzahl_routen = np.bincount(self.peak_pos[self.known], minlength=self.n_peaks)
+
+    def _done_mask(self, ascent_route: np.ndarray) -> np.ndarray:
+        mask = np.zeros(len(self.routes_df), dtype=bool)
+        mask[ascent_route[ascent_route >= 0]] = True
+        return mask
+
+    @property
+    def climbers(self) -> list[str]:
+        if self.ascent_climber is None:
+            return []
+        return sorted(c for c in np.unique(self.ascent_climber) if c)
+
+    def done_by(self, climber_id: str | None) -> np.ndarray:
+        """Routen, die `climber_id` geklettert hat (None: irgendwer); pro Kletterer gemerkt."""
+        if climber_id is None or self.ascent_climber is None:
+            return self.done
+        mask = self._done_by.get(climber_id)
+        if mask is None:
+            mask = self._done_by[climber_id] = self._done_mask(self.ascent_route[self.ascent_climber == climber_id])
+        return mask
+
+    def routes(self, min_bewertung=None, max_bewertung=None, star=None, done=None, climber_id=None,
+               gebiet=None, max_hoehe=None) -> np.ndarray:
+        """Maske über alle Routen; None heißt "nicht filtern"."""
+        mask = self.known.copy()
+        if min_bewertung is not None:
+            mask &= self.bewertung >= min_bewertung
+        if max_bewertung is not None:
+            mask &= self.bewertung <= max_bewertung
+        if star is not None:
+            mask &= self.stern if star else ~self.stern
+        if done is not None:
+            done_mask = self.done_by(climber_id)
+            mask &= done_mask if done else ~done_mask
+
+        # Gipfel-Bedingungen einmal pro Gipfel auswerten und über den Index auf die Routen legen
+        if gebiet is not None or max_hoehe is not None:
+            peak_mask = np.ones(self.n_peaks, dtype=bool)
+            if gebiet is not None:
+                peak_mask &= (self.peaks_df["gebiet"] == gebiet).to_numpy(dtype=bool)
+            if max_hoehe is not None:
+                peak_mask &= pd.to_numeric(self.peaks_df["hoehe"], errors="coerce").fillna(0).to_numpy() <= max_hoehe
+            mask[self.known] &= peak_mask[self.peak_pos[self.known]]
+        return mask
+
+    def peaks(self, route_mask: np.ndarray) -> pd.DataFrame:
+        """
+        Eindeutige Gipfel mit mindestens einer passenden Route, ergänzt um anzahl_routen
+        (alle Routen) und passende_routen (Routen, die die Abfrage erfüllen).
+        """
+        matches = np.bincount(self.peak_pos[route_mask & self.known], minlength=self.n_peaks)
+        positions = np.flatnonzero(matches)
+        rows = self.peaks_df.take(positions)
+        return rows.assign(anzahl_routen=self.anzahl_routen[positions], passende_routen=matches[positions])
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _cached_query(schema: str, version, _peaks_df, _routes_df, _ascents_df) -> RouteQuery:
+    return RouteQuery(_peaks_df, _routes_df, _ascents_df)
+
+
+def load_route_query(columns: dict[str, tuple] | None = None, climber_id: str | None = None) -> RouteQuery:
+    """
+    Routen-Abfrage über den Snapshot der Seite; einmal pro Datenstand gebaut und geteilt.
+    Mit MULTI_USER=1 nur über die Begehungen von `climber_id` (siehe db.page_frames()).
+    """
+    return _cached_query(*page_frames(columns, climber_id))
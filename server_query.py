@@ -0,0 +1,270 @@
+# Serverseitiger Filtermodus: Sidebar-Filter als Abfrage auf die View peak_summary
+# (sql/peak_summary.sql), damit nur passende Gipfel übertragen werden statt aller Tabellen
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+import streamlit as st
+
+from db import SCHEMAS, SYNC_INTERVAL, TABLE_KEYS, coerce_types, fetch_pages
+from spatial_index import GridIndex
+
+# Einschalten mit SERVER_QUERY=1 (setzt voraus, dass sql/peak_summary.sql in Supabase ausgeführt wurde).
+# Die View zählt Begehungen aller Kletterer, daher mit MULTI_USER=1 ohne Wirkung (peak_summary.py)
+SERVER_QUERY = os.getenv("SERVER_QUERY", "") == "1"
+
+SQL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql", "peak_summary.sql")
+
+# Kennzahlen, die die View zusätzlich zu den Gipfel-Spalten liefert
+SUMMARY_COLUMNS = ("anzahl_routen", "peak_has_star", "has_done_route", "max_bewertung_per_peak")
+
+
+def summary_columns(columns: dict[str, tuple] | None = None) -> tuple:
+    """View-Spalten passend zum Spalten-Schema einer Seite (kommentar nur, wenn die Seite ihn lädt)."""
+    columns = columns or {}
+    peaks = columns.get("peaks") or tuple(SCHEMAS["peaks"])
+    ascents = columns.get("ascents")
+    selected = ["peak_id"] + [col for col in peaks if col in SCHEMAS["peak_summary"] and col != "peak_id"]
+    selected += SUMMARY_COLUMNS
+    if ascents is None or "kommentar" in ascents:
+        selected.append("kommentar")
+    return tuple(selected)
+
+
+def filter_conditions(gebiet=None, bewertung=None, star=None, max_hoehe=None, done=None) -> list[tuple]:
+    """
+    Sidebar-Zustand -> Liste von (Spalte, Operator, Wert) mit den Operatoren eq, lte, not_null.
+    Gleiche Bedeutung wie PeakFilter.mask() & PeakFilter.complete; None heißt "nicht filtern".
+    """
+    conditions = [(col, "not_null", None) for col in ("lat", "lon", "hoehe")]
+    if gebiet is not None:
+        conditions.append(("gebiet", "eq", gebiet))
+    if bewertung is not None:
+        conditions.append(("max_bewertung_per_peak", "eq", int(bewertung)))
+    if star is not None:
+        conditions.append(("peak_has_star", "eq", bool(star)))
+    if max_hoehe is not None:
+        conditions.append(("hoehe", "lte", float(max_hoehe)))
+    if done is not None:
+        conditions.append(("has_done_route", "eq", bool(done)))
+    return conditions
+
+
+def apply_postgrest(q, conditions: list[tuple]):
+    """Bedingungen auf einen PostgREST-Query-Builder anwenden."""
+    for col, op, value in conditions:
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        if op == "not_null":
+            q = q.not_.is_(col, "null")
+        elif op == "eq":
+            q = q.eq(col, value)
+        elif op == "lte":
+            q = q.lte(col, value)
+        else:
+            raise ValueError(f"Unbekannter Operator: {op}")
+    return q
+
+
+def sql_where(conditions: list[tuple]) -> tuple[str, list]:
+    """Bedingungen als WHERE-Klausel mit ?-Parametern (für den SQLite-Ersatz)."""
+    clauses, params = [], []
+    for col, op, value in conditions:
+        if op == "not_null":
+            clauses.append(f"{col} IS NOT NULL")
+            continue
+        if op not in ("eq", "lte"):
+            raise ValueError(f"Unbekannter Operator: {op}")
+        clauses.append(f"{col} {'=' if op == 'eq' else '<='} ?")
+        params.append(int(value) if isinstance(value, bool) else value)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+@st.cache_data(ttl=SYNC_INTERVAL, show_spinner=False)
+def fetch_filtered_peaks(columns: tuple, filters: tuple) -> pd.DataFrame:
+    """Passende Gipfel aus der View peak_summary; `filters` sind die Argumente von filter_conditions()."""
+    conditions = filter_conditions(**dict(filters))
+    frames = [
+        coerce_types(pd.DataFrame(rows), "peak_summary")
+        for rows in fetch_pages("peak_summary", ",".join(columns),
+                                query=lambda q: apply_postgrest(q, conditions), key="peak_id")
+    ]
+    if not frames:
+        return coerce_types(pd.DataFrame(columns=list(columns)), "peak_summary")
+    return pd.concat(frames, ignore_index=True)
+
+
+@st.cache_data(ttl=SYNC_INTERVAL, show_spinner=False)
+def fetch_areas() -> pd.DataFrame:
+    """Gebiete mit Anzahl Gipfel und Höhenbereich aus der View peak_gebiete."""
+    rows = [row for page in fetch_pages("peak_gebiete", key="gebiet") for row in page]
+    return coerce_types(pd.DataFrame(rows, columns=list(SCHEMAS["peak_gebiete"])), "peak_gebiete")
+
+
+class ServerPeakFilter:
+    """
+    Gegenstück zu PeakFilter für den serverseitigen Modus: gleiche Attribute für die Sidebar
+    (gebiet, hoehe_range, len()) und select(), aber jede Auswahl ist eine Abfrage auf die View.
+    """
+
+    def __init__(self, columns: dict[str, tuple] | None = None, areas: pd.DataFrame | None = None):
+        self.columns = summary_columns(columns)
+        areas = fetch_areas() if areas is None else areas
+        self.gebiet = dict.fromkeys(areas["gebiet"])
+        self.count = int(areas["anzahl_gipfel"].sum())
+        low, high = areas["min_hoehe"].min(), areas["max_hoehe"].max()
+        self.hoehe_range = None if pd.isna(low) or pd.isna(high) else (int(low), int(high))
+        self.last = coerce_types(pd.DataFrame(columns=list(self.columns)), "peak_summary")
+
+    def __len__(self):
+        return self.count
+
+    def select(self, **filters) -> tuple[pd.DataFrame, int]:
+        """(passende Gipfel, Anzahl wegen fehlender Kartenwerte entfernter) – das Entfernen macht die Datenbank."""
+        self.last = fetch_filtered_peaks(self.columns, tuple(sorted(filters.items())))
+        return self.last, 0
+
+    def index(self) -> GridIndex:
+        """Räumlicher Index über die zuletzt geladenen Gipfel (für Ausschnitt und Klick)."""
+        peaks = self.last
+        return GridIndex(peaks["lat"], peaks["lon"], peaks["peak_id"].to_numpy(dtype="int64", na_value=-1))
+
+
+# --- Lokaler Ersatz für Tests ----------------
+_SQLITE_TYPES = {"Int64": "INTEGER", "int": "INTEGER", "float": "REAL", "bool": "BOOLEAN", "str": "TEXT", "date": "TEXT"}
+
+
+class SQLiteStandIn:
+    """
+    peaks/routes/ascents mit demselben Schema (SCHEMAS) in SQLite plus die Views aus
+    sql/peak_summary.sql – zum Testen der Filter-Übersetzung ohne Supabase.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        for table, key in TABLE_KEYS.items():
+            columns = ", ".join(
+                f"{col} {_SQLITE_TYPES[dtype]}{' PRIMARY KEY' if col == key else ''}"
+                for col, dtype in SCHEMAS[table].items()
+            )
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+        with open(SQL_PATH, encoding="utf-8") as f:
+            self.conn.executescript(f.read())
+
+    def insert(self, table: str, df: pd.DataFrame):
+        df = df[[col for col in df.columns if col in SCHEMAS[table]]].copy()
+        for col in df.columns:
+            if SCHEMAS[table][col] == "date":
+                df[col] = df[col].astype(str)
+        df.to_sql(table, self.conn, if_exists="append", index=False)
+
+    def filtered_peaks(self, columns: tuple, **filters) -> pd.DataFrame:
+        where, params = sql_where(filter_conditions(**filters))
+        sql = f"SELECT {', '.join(columns)} FROM peak_summary{where} ORDER BY peak_id"
+        return coerce_types(pd.read_sql_query(sql, self.conn, params=params), "peak_summary")
+
+    def areas(self) -> pd.DataFrame:
+        return coerce_types(pd.read_sql_query("SELECT * FROM peak_gebiete ORDER BY gebiet", self.conn), "peak_gebiete")
+
+
+def _sqlite_value(value):
+    # PostgREST bekommt Wahrheitswerte als "true"/"false" (apply_postgrest), SQLite speichert 0/1
+    if isinstance(value, bool) or value in ("true", "false"):
+        return int(value in (True, "true"))
+    return value
+
+
+class _SQLiteResponse:
+    def __init__(self, data: list[dict], count: int | None = None):
+        self.data = data
+        self.count = count
+
+
+class _SQLiteQuery:
+    """Die Teile des PostgREST-Query-Builders, die db.py und server_query.py benutzen."""
+
+    def __init__(self, client: "SQLiteClient", table: str):
+        self.client = client
+        self.table = table
+        self.columns = "*"
+        self.count = None
+        self.clauses, self.params = [], []
+        self.order_by = None
+        self.limit_sql = ""
+        self.negate = False
+
+    def select(self, columns: str = "*", count=None):
+        self.columns, self.count = columns, count
+        return self
+
+    def _where(self, clause: str, *params):
+        self.clauses.append(clause)
+        self.params.extend(_sqlite_value(value) for value in params)
+        return self
+
+    def eq(self, col, value):
+        return self._where(f"{col} = ?", value)
+
+    def gt(self, col, value):
+        return self._where(f"{col} > ?", value)
+
+    def gte(self, col, value):
+        return self._where(f"{col} >= ?", value)
+
+    def lte(self, col, value):
+        return self._where(f"{col} <= ?", value)
+
+    def in_(self, col, values):
+        values = list(values)
+        return self._where(f"{col} IN ({', '.join('?' * len(values)) or 'NULL'})", *values)
+
+    @property
+    def not_(self):
+        self.negate = True
+        return self
+
+    def is_(self, col, value):
+        if value != "null":
+            raise ValueError(f"is_ unterstützt nur null, nicht {value!r}")
+        negate, self.negate = self.negate, False
+        return self._where(f"{col} IS {'NOT ' if negate else ''}NULL")
+
+    def order(self, col):
+        self.order_by = col
+        return self
+
+    def range(self, start: int, end: int):
+        self.limit_sql = f" LIMIT {end - start + 1} OFFSET {start}"
+        return self
+
+    def limit(self, n: int):
+        self.limit_sql = f" LIMIT {n}"
+        return self
+
+    def execute(self) -> _SQLiteResponse:
+        where = " WHERE " + " AND ".join(self.clauses) if self.clauses else ""
+        order = f" ORDER BY {self.order_by}" if self.order_by else ""
+        conn = self.client.conn
+        with self.client.lock:
+            cursor = conn.execute(f"SELECT {self.columns} FROM {self.table}{where}{order}{self.limit_sql}", self.params)
+            names = [d[0] for d in cursor.description]
+            data = [dict(zip(names, row)) for row in cursor.fetchall()]
+            count = None
+            if self.count:
+                count = conn.execute(f"SELECT COUNT(*) FROM {self.table}{where}", self.params).fetchone()[0]
+        return _SQLiteResponse(data, count)
+
+
+class SQLiteClient:
+    """
+    Stellvertreter für den Supabase-Client über einem SQLiteStandIn: `db.supabase = SQLiteClient(local)`
+    lässt fetch_pages()/fetch_tables() unverändert gegen SQLite laufen (Benchmark, Tests).
+    """
+
+    def __init__(self, local: SQLiteStandIn):
+        self.conn = local.conn
+        self.lock = threading.Lock()  # fetch_tables() fragt aus mehreren Threads
+
+    def table(self, name: str) -> _SQLiteQuery:
+        return _SQLiteQuery(self, name)
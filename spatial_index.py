@@ -0,0 +1,136 @@
+# Räumlicher Index über die Gipfel-Koordinaten (regelmäßiges Gitter, sortiert nach Zelle)
+import threading
+
+import numpy as np
+
+# Kantenlänge einer Gitterzelle in Grad (~1 km)
+CELL_SIZE = 0.01
+
+# lon-Zellen werden mit diesem Faktor in einen int64-Schlüssel gepackt (reicht für die ganze Erde)
+_ROW = 1 << 20
+
+EARTH_RADIUS = 6_371_000  # Meter
+_M_PER_DEG = np.pi * EARTH_RADIUS / 180
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Entfernung in Metern (Großkreis), elementweise für Arrays."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """
+    Gitter-Index über lat/lon. Alle Punkte sind nach Zellschlüssel (Zeile, Spalte) sortiert,
+    so liegen die Zellen einer Gitterzeile direkt hintereinander und ein Ausschnitt kostet
+    pro Gitterzeile zwei searchsorted-Aufrufe statt eines Durchlaufs über alle Punkte.
+    Abfragen liefern die `ids` der Punkte (ohne ids: Positionen 0..n-1 in Eingabereihenfolge).
+    Punkte ohne gültige Koordinaten werden nicht aufgenommen.
+    """
+
+    def __init__(self, lat, lon, ids=None, cell_size: float = CELL_SIZE):
+        self.cell_size = cell_size
+        self._lock = threading.Lock()
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        ids = np.arange(len(lat)) if ids is None else np.asarray(ids)
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        lat, lon, ids = lat[valid], lon[valid], ids[valid]
+        keys = self._keys(lat, lon)
+        order = np.argsort(keys, kind="stable")
+        # Ein Tupel, das bei insert() als Ganzes ersetzt wird: Abfragen sehen immer einen
+        # konsistenten Stand, auch wenn parallel eingefügt wird
+        self._data = (keys[order], lat[order], lon[order], ids[order])
+
+    def __len__(self):
+        return len(self._data[0])
+
+    def _cells(self, lat, lon):
+        return np.floor(np.asarray(lat) / self.cell_size).astype(np.int64), \
+            np.floor(np.asarray(lon) / self.cell_size).astype(np.int64)
+
+    def _keys(self, lat, lon):
+        row, col = self._cells(lat, lon)
+        return row * _ROW + col
+
+    def _candidates(self, south, west, north, east):
+        """Sortier-Positionen aller Punkte in den Zellen, die das Rechteck berührt, plus die Daten."""
+        data = self._data
+        keys = data[0]
+        (row0, row1), (col0, col1) = self._cells([south, north], [west, east])
+        starts = np.arange(row0, row1 + 1) * _ROW
+        lo = np.searchsorted(keys, starts + col0, side="left")
+        hi = np.searchsorted(keys, starts + col1, side="right")
+        slots = [np.arange(a, b) for a, b in zip(lo, hi) if b > a]
+        return (np.concatenate(slots) if slots else np.array([], dtype=np.int64)), data
+
+    def bbox(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """ids aller Punkte im Rechteck (Grenzen inklusive)."""
+        slots, (_, lat, lon, ids) = self._candidates(south, west, north, east)
+        lat, lon = lat[slots], lon[slots]
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        return ids[slots[inside]]
+
+    def _around(self, lat: float, lon: float, meters: float):
+        """Kandidaten im umschließenden Rechteck eines Kreises: (ids, Entfernungen in Metern)."""
+        dlat = meters / _M_PER_DEG
+        dlon = meters / (_M_PER_DEG * max(np.cos(np.radians(lat)), 1e-6))
+        slots, (_, lats, lons, ids) = self._candidates(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+        return ids[slots], haversine(lat, lon, lats[slots], lons[slots])
+
+    def radius(self, lat: float, lon: float, meters: float) -> np.ndarray:
+        """ids aller Punkte höchstens `meters` vom Punkt entfernt, die nächsten zuerst."""
+        ids, distance = self._around(lat, lon, meters)
+        inside = distance <= meters
+        return ids[inside][np.argsort(distance[inside], kind="stable")]
+
+    def nearest(self, lat: float, lon: float, k: int = 1, max_distance: float | None = None):
+        """
+        Die k nächsten Punkte als (ids, Entfernungen in Metern), sortiert nach Entfernung.
+        Der Suchkreis startet bei einer Zellgröße und verdoppelt sich, bis k Punkte sicher
+        gefunden sind (oder max_distance bzw. die Größe der Daten erreicht ist).
+        """
+        meters = self.cell_size * _M_PER_DEG
+        while True:
+            if max_distance is not None:
+                meters = min(meters, max_distance)
+            ids, distance = self._around(lat, lon, meters)
+            inside = distance <= meters
+            done = (inside.sum() >= k or len(ids) == len(self)
+                    or (max_distance is not None and meters >= max_distance))
+            if done:
+                ids, distance = ids[inside], distance[inside]
+                order = np.argsort(distance, kind="stable")[:k]
+                return ids[order], distance[order]
+            meters *= 2
+
+    def insert(self, lat, lon, ids):
+        """
+        Fügt Punkte ein bzw. verschiebt sie (gleiche id = Upsert), ohne den Index neu zu bauen.
+        Punkte ohne gültige Koordinaten werden nur entfernt.
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=float))
+        lon = np.atleast_1d(np.asarray(lon, dtype=float))
+        ids = np.atleast_1d(np.asarray(ids))
+        with self._lock:
+            keys, lats, lons, all_ids = self._data
+            keep = ~np.isin(all_ids, ids)
+            keys, lats, lons, all_ids = keys[keep], lats[keep], lons[keep], all_ids[keep]
+
+            valid = np.isfinite(lat) & np.isfinite(lon)
+            lat, lon, ids = lat[valid], lon[valid], ids[valid]
+            new_keys = self._keys(lat, lon)
+            order = np.argsort(new_keys, kind="stable")
+            new_keys, lat, lon, ids = new_keys[order], lat[order], lon[order], ids[order]
+            at = np.searchsorted(keys, new_keys, side="right")
+            self._data = (
+                np.insert(keys, at, new_keys),
+                np.insert(lats, at, lat),
+                np.insert(lons, at, lon),
+                np.insert(all_ids, at, ids),
+            )
+
+    def remove(self, ids):
+        """Entfernt Punkte anhand ihrer ids."""
+        self.insert([np.nan] * len(np.atleast_1d(ids)), [np.nan] * len(np.atleast_1d(ids)), ids)
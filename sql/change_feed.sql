@@ -0,0 +1,61 @@
+-- Änderungs-Feed für mehrere Worker (nur Postgres/Supabase, siehe change_feed.py).
+-- Einmal im Supabase-SQL-Editor ausführen. Jedes INSERT/UPDATE auf peaks, routes und ascents
+-- schickt danach pro Anweisung eine Benachrichtigung auf dem Kanal 'felsenbuch_changes':
+--   {"table": "ascents", "keys": [101, 102], "climbers": ["anna"], "origin": "..."}
+-- origin ist der Header x-felsenbuch-origin des schreibenden Prozesses (db.py); dieser Prozess
+-- hat die Änderung schon selbst gemeldet und überspringt sie.
+-- Die App hört darauf, wenn CHANGE_FEED_DSN gesetzt ist, und lädt nur das Delta nach.
+
+CREATE OR REPLACE FUNCTION notify_table_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    key_column text := TG_ARGV[0];
+    keys jsonb;
+    climbers jsonb;
+    payload text;
+    -- PostgREST legt die Request-Header als JSON in request.headers ab (außerhalb: leer/NULL)
+    origin text := NULLIF(current_setting('request.headers', true), '')::jsonb ->> 'x-felsenbuch-origin';
+BEGIN
+    -- Ein Upsert löst den INSERT- und den UPDATE-Trigger aus; einer davon sieht keine Zeilen
+    IF NOT EXISTS (SELECT 1 FROM changed) THEN
+        RETURN NULL;
+    END IF;
+    SELECT jsonb_agg(to_jsonb(c) -> key_column),
+           COALESCE(jsonb_agg(DISTINCT to_jsonb(c) -> 'climber_id') FILTER (WHERE to_jsonb(c) ? 'climber_id'),
+                    '[]'::jsonb)
+    INTO keys, climbers
+    FROM changed c;
+    payload := jsonb_build_object('table', TG_TABLE_NAME, 'keys', keys, 'climbers', climbers,
+                                  'origin', origin)::text;
+    -- NOTIFY erlaubt knapp 8000 Byte: nur bei großen Importen ohne Schlüssel
+    -- (die App lädt die Tabelle dann komplett neu) – sonst ist keys nie NULL
+    IF octet_length(payload) > 7900 THEN
+        payload := jsonb_build_object('table', TG_TABLE_NAME, 'keys', NULL, 'climbers', NULL,
+                                      'origin', origin)::text;
+    END IF;
+    PERFORM pg_notify('felsenbuch_changes', payload);
+    RETURN NULL;
+END $$;
+
+-- Übergangstabellen gibt es nur für Trigger mit einem Ereignis, daher je ein Trigger für
+-- INSERT und UPDATE (ein Upsert löst beide aus)
+DROP TRIGGER IF EXISTS peaks_notify_insert ON peaks;
+DROP TRIGGER IF EXISTS peaks_notify_update ON peaks;
+CREATE TRIGGER peaks_notify_insert AFTER INSERT ON peaks
+    REFERENCING NEW TABLE AS changed FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('peak_id');
+CREATE TRIGGER peaks_notify_update AFTER UPDATE ON peaks
+    REFERENCING NEW TABLE AS changed FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('peak_id');
+
+DROP TRIGGER IF EXISTS routes_notify_insert ON routes;
+DROP TRIGGER IF EXISTS routes_notify_update ON routes;
+CREATE TRIGGER routes_notify_insert AFTER INSERT ON routes
+    REFERENCING NEW TABLE AS changed FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('route_id');
+CREATE TRIGGER routes_notify_update AFTER UPDATE ON routes
+    REFERENCING NEW TABLE AS changed FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('route_id');
+
+DROP TRIGGER IF EXISTS ascents_notify_insert ON ascents;
+DROP TRIGGER IF EXISTS ascents_notify_update ON ascents;
+CREATE TRIGGER ascents_notify_insert AFTER INSERT ON ascents
+    REFERENCING NEW TABLE AS changed FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('ascent_id');
+CREATE TRIGGER ascents_notify_update AFTER UPDATE ON ascents
+    REFERENCING NEW TABLE AS changed FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change('ascent_id');
@@ -0,0 +1,52 @@
+-- Gipfel-Zusammenfassung als Views für den serverseitigen Filtermodus (SERVER_QUERY=1).
+-- Einmal im Supabase-SQL-Editor ausführen; läuft unverändert auch in SQLite
+-- (server_query.SQLiteStandIn), damit lokal gegen dasselbe Schema getestet werden kann.
+-- Gleiche Kennzahlen wie peak_summary.build_peak_summary().
+
+DROP VIEW IF EXISTS peak_summary;
+CREATE VIEW peak_summary AS
+SELECT
+    p.peak_id,
+    p.gipfel,
+    p.gebiet,
+    p.hoehe,
+    p.lat,
+    p.lon,
+    COALESCE(r.anzahl_routen, 0) AS anzahl_routen,
+    COALESCE(r.peak_has_star, FALSE) AS peak_has_star,
+    COALESCE(r.has_done_route, FALSE) AS has_done_route,
+    COALESCE(a.max_bewertung_per_peak, 0) AS max_bewertung_per_peak,
+    -- Kommentar der ersten Begehung am Gipfel (wie groupby(...).first())
+    COALESCE((
+        SELECT a2.kommentar
+        FROM ascents a2 JOIN routes r2 ON r2.route_id = a2.route_id
+        WHERE r2.peak_id = p.peak_id
+        ORDER BY a2.ascent_id
+        LIMIT 1
+    ), '') AS kommentar
+FROM peaks p
+LEFT JOIN (
+    SELECT
+        r.peak_id,
+        COUNT(*) AS anzahl_routen,
+        MAX(CASE WHEN r.stern THEN 1 ELSE 0 END) = 1 AS peak_has_star,
+        MAX(CASE WHEN EXISTS (SELECT 1 FROM ascents x WHERE x.route_id = r.route_id) THEN 1 ELSE 0 END) = 1 AS has_done_route
+    FROM routes r
+    GROUP BY r.peak_id
+) r ON r.peak_id = p.peak_id
+LEFT JOIN (
+    SELECT r.peak_id, MAX(a.bewertung) AS max_bewertung_per_peak
+    FROM ascents a JOIN routes r ON r.route_id = a.route_id
+    GROUP BY r.peak_id
+) a ON a.peak_id = p.peak_id;
+
+-- Sidebar-Optionen (Gebiete, Höhenbereich, Anzahl) ohne die Gipfel selbst zu laden
+DROP VIEW IF EXISTS peak_gebiete;
+CREATE VIEW peak_gebiete AS
+SELECT gebiet, COUNT(*) AS anzahl_gipfel, MIN(hoehe) AS min_hoehe, MAX(hoehe) AS max_hoehe
+FROM peaks
+GROUP BY gebiet;
+
+-- Für die Joins der Views
+CREATE INDEX IF NOT EXISTS routes_peak_id_idx ON routes (peak_id);
+CREATE INDEX IF NOT EXISTS ascents_route_id_idx ON ascents (route_id);
@@ -0,0 +1,48 @@
+-- Schlüsselvergabe über Sequenzen statt "höchste ID + 1" (nur Postgres/Supabase).
+-- Einmal im Supabase-SQL-Editor ausführen. Danach vergibt die Datenbank peak_id, route_id und
+-- ascent_id selbst (Spalten-Default), und reserve_ids(table_name, n) reserviert n IDs auf einmal
+-- für Importer, die die IDs schon vor dem Schreiben brauchen (z.B. Routen -> Begehungen).
+-- Jede ID wird genau einmal vergeben, auch bei mehreren gleichzeitigen Importen.
+
+-- Sequenzen anlegen (bei serial-Spalten existieren sie schon) und hinter die höchste ID setzen
+CREATE SEQUENCE IF NOT EXISTS peaks_peak_id_seq OWNED BY peaks.peak_id;
+CREATE SEQUENCE IF NOT EXISTS routes_route_id_seq OWNED BY routes.route_id;
+CREATE SEQUENCE IF NOT EXISTS ascents_ascent_id_seq OWNED BY ascents.ascent_id;
+
+SELECT setval('peaks_peak_id_seq', GREATEST(
+    (SELECT COALESCE(MAX(peak_id), 0) FROM peaks), (SELECT last_value FROM peaks_peak_id_seq)));
+SELECT setval('routes_route_id_seq', GREATEST(
+    (SELECT COALESCE(MAX(route_id), 0) FROM routes), (SELECT last_value FROM routes_route_id_seq)));
+SELECT setval('ascents_ascent_id_seq', GREATEST(
+    (SELECT COALESCE(MAX(ascent_id), 0) FROM ascents), (SELECT last_value FROM ascents_ascent_id_seq)));
+
+ALTER TABLE peaks ALTER COLUMN peak_id SET DEFAULT nextval('peaks_peak_id_seq');
+ALTER TABLE routes ALTER COLUMN route_id SET DEFAULT nextval('routes_route_id_seq');
+ALTER TABLE ascents ALTER COLUMN ascent_id SET DEFAULT nextval('ascents_ascent_id_seq');
+
+-- n IDs auf einmal; nextval ist atomar, parallele Aufrufe bekommen nie dieselbe ID
+-- (die IDs eines Aufrufs sind meist, aber nicht garantiert lückenlos aufeinanderfolgend)
+CREATE OR REPLACE FUNCTION reserve_ids(table_name text, n integer)
+RETURNS bigint[]
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    seq regclass;
+BEGIN
+    seq := CASE table_name
+        WHEN 'peaks' THEN 'peaks_peak_id_seq'::regclass
+        WHEN 'routes' THEN 'routes_route_id_seq'::regclass
+        WHEN 'ascents' THEN 'ascents_ascent_id_seq'::regclass
+    END;
+    IF seq IS NULL THEN
+        RAISE EXCEPTION 'reserve_ids: unbekannte Tabelle %', table_name;
+    END IF;
+    IF n < 1 OR n > 10000 THEN
+        RAISE EXCEPTION 'reserve_ids: n muss zwischen 1 und 10000 liegen (war %)', n;
+    END IF;
+    RETURN ARRAY(SELECT nextval(seq) FROM generate_series(1, n));
+END;
+$$;
+
+GRANT USAGE ON SEQUENCE peaks_peak_id_seq, routes_route_id_seq, ascents_ascent_id_seq TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION reserve_ids(text, integer) TO anon, authenticated;
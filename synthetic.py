@@ -0,0 +1,174 @@
+# Synthetische Testdaten (peaks, routes, ascents) in großen Mengen, vektorisiert mit NumPy
+#
+#   python synthetic.py --peaks 10000 --ascents 1000000 --seed 42 --out testdata
+#   python synthetic.py --peaks 10000 --ascents 1000000 --sqlite testdata.db
+#
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Klettergebiete mit ungefährem Mittelpunkt (lat, lon) und relativem Gewicht (Anzahl Gipfel)
+AREAS = {
+    "Bielatal": (50.862, 14.063, 3.0),
+    "Rathen": (50.958, 14.081, 2.0),
+    "Wehlen": (50.957, 14.027, 1.0),
+    "Brand": (50.938, 14.118, 1.0),
+    "Schrammsteine": (50.917, 14.218, 2.5),
+    "Affensteine": (50.914, 14.255, 2.5),
+    "Schmilka": (50.895, 14.237, 1.0),
+    "Zschand": (50.908, 14.300, 2.0),
+    "Gohrisch": (50.906, 14.103, 1.0),
+    "Erzgebirgsgrenze": (50.870, 14.000, 0.5),
+}
+AREA_SPREAD = 0.008      # Standardabweichung der Gipfel um den Gebietsmittelpunkt (Grad)
+
+NAME_PREFIX = np.array(["Kleiner ", "Großer ", "Falken", "Bären", "Adler", "Schuster", "Mönchs", "Barbarine",
+                        "Wartturm", "Heide", "Teufels", "Zwergen", "Tisch", "Lilien", "Affen", "Schramm"])
+NAME_SUFFIX = np.array(["turm", "stein", "nadel", "kopf", "horn", "wand", "fels", "spitze", "grat", "wächter"])
+ROUTE_PREFIX = np.array(["Alter", "Neuer", "Direkter", "Schiefer", "Gelber", "Roter", "Blauer", "Steiler",
+                         "Leichter", "Großer"])
+ROUTE_SUFFIX = np.array(["weg", "riß", "kamin", "kante", "quergang", "stieg", "linie", "verschneidung",
+                         "aufstieg", "traverse"])
+KOMMENTARE = np.array(["Schöne Tour", "Nass und rutschig", "Ring fehlt", "Sehr empfehlenswert",
+                       "Griffig", "Nachstieg", "Im Regen abgebrochen, zweiter Versuch"])
+
+ROUTES_PER_PEAK = 4      # Mittelwert (Poisson, mindestens 1)
+STAR_SHARE = 0.15        # Anteil Routen mit Stern
+ZIPF_ROUTES = 1.1        # Exponent der Routen-Beliebtheit (wenige Klassiker, viele kaum begangene)
+ZIPF_CLIMBERS = 0.8      # Exponent der Aktivität der Kletterer
+CLIMBERS = 200
+KOMMENTAR_SHARE = 0.1    # Anteil Begehungen mit Kommentar
+FIRST_DATE = "2015-01-01"
+LAST_DATE = "2025-12-31"
+
+
+def _names(rng: np.random.Generator, n: int, prefix: np.ndarray, suffix: np.ndarray, sep: str = "") -> pd.Series:
+    """n zufällige Namen aus Vorsilbe + Nachsilbe, teils mit Nummer (wie in fakepeaks.py)."""
+    names = pd.Series(prefix[rng.integers(len(prefix), size=n)]) + sep + suffix[rng.integers(len(suffix), size=n)]
+    numbered = rng.random(n) < 0.3
+    return names.where(~numbered, names + " " + rng.integers(1, 4, size=n).astype(str))
+
+
+def zipf_weights(n: int, exponent: float, rng: np.random.Generator) -> np.ndarray:
+    """Wahrscheinlichkeiten ~ 1 / rang**exponent, die Ränge zufällig auf die n Elemente verteilt."""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    weights = weights[rng.permutation(n)]
+    return weights / weights.sum()
+
+
+def generate_peaks(rng: np.random.Generator, n: int, start_id: int = 1, areas: dict = AREAS) -> pd.DataFrame:
+    """Gipfel um die Gebietsmittelpunkte gehäuft (Normalverteilung), Höhe schief verteilt (5-120 m)."""
+    names = list(areas)
+    centers = np.array([areas[name][:2] for name in names])
+    weights = np.array([areas[name][2] for name in names])
+    area = rng.choice(len(names), size=n, p=weights / weights.sum())
+    lat, lon = (centers[area] + rng.normal(0, AREA_SPREAD, size=(n, 2))).T
+    return pd.DataFrame({
+        "peak_id": pd.array(np.arange(start_id, start_id + n), dtype="Int64"),
+        "gipfel": _names(rng, n, NAME_PREFIX, NAME_SUFFIX),
+        "gebiet": np.array(names)[area],
+        "hoehe": np.clip(np.round(rng.gamma(2.0, 15.0, size=n)), 5, 120),
+        "lat": lat.round(6),
+        "lon": lon.round(6),
+    })
+
+
+def generate_routes(rng: np.random.Generator, peaks: pd.DataFrame, routes_per_peak: float = ROUTES_PER_PEAK,
+                    start_id: int = 1) -> pd.DataFrame:
+    """Routen je Gipfel (Poisson-verteilt, mindestens eine); Bewertung 1-10 um 5 gehäuft."""
+    counts = np.maximum(rng.poisson(routes_per_peak, size=len(peaks)), 1)
+    n = int(counts.sum())
+    return pd.DataFrame({
+        "route_id": pd.array(np.arange(start_id, start_id + n), dtype="Int64"),
+        "peak_id": np.repeat(peaks["peak_id"].to_numpy(), counts),
+        "name": _names(rng, n, ROUTE_PREFIX, ROUTE_SUFFIX, " "),
+        "bewertung": np.clip(np.round(rng.normal(5, 2, size=n)), 1, 10).astype(int),
+        "stern": rng.random(n) < STAR_SHARE,
+    })
+
+
+def generate_ascents(rng: np.random.Generator, routes: pd.DataFrame, n: int, climbers: int = CLIMBERS,
+                     start_id: int = 1) -> pd.DataFrame:
+    """
+    n Begehungen: Routen nach Zipf-Beliebtheit gezogen, Kletterer ebenso (wenige sehr aktive),
+    Datum gleichverteilt zwischen FIRST_DATE und LAST_DATE.
+    """
+    route = rng.choice(len(routes), size=n, p=zipf_weights(len(routes), ZIPF_ROUTES, rng))
+    climber_ids = np.array([f"climber_{i:04d}" for i in range(climbers)])
+    climber = rng.choice(climbers, size=n, p=zipf_weights(climbers, ZIPF_CLIMBERS, rng))
+    first, last = np.datetime64(FIRST_DATE), np.datetime64(LAST_DATE)
+    # sortiert, damit ascent_id wie in der echten Tabelle mit dem Datum wächst
+    dates = first + np.sort(rng.integers(0, (last - first).astype(int) + 1, size=n)).astype("timedelta64[D]")
+    kommentar = np.where(rng.random(n) < KOMMENTAR_SHARE, KOMMENTARE[rng.integers(len(KOMMENTARE), size=n)], "")
+    return pd.DataFrame({
+        "ascent_id": pd.array(np.arange(start_id, start_id + n), dtype="Int64"),
+        "route_id": routes["route_id"].to_numpy()[route],
+        "date": dates.astype(str),
+        "climber_id": climber_ids[climber],
+        "bewertung": routes["bewertung"].to_numpy()[route],
+        "kommentar": kommentar,
+    })
+
+
+def generate(peaks: int = 1_000, ascents: int = 100_000, seed: int | None = 0,
+             routes_per_peak: float = ROUTES_PER_PEAK, climbers: int = CLIMBERS) -> dict[str, pd.DataFrame]:
+    """Alle drei Tabellen; gleicher seed -> gleiche Daten."""
+    rng = np.random.default_rng(seed)
+    peaks_df = generate_peaks(rng, peaks)
+    routes_df = generate_routes(rng, peaks_df, routes_per_peak)
+    return {"peaks": peaks_df, "routes": routes_df, "ascents": generate_ascents(rng, routes_df, ascents, climbers)}
+
+
+def write_files(frames: dict[str, pd.DataFrame], directory: str, fmt: str = "parquet") -> list[str]:
+    """Je Tabelle eine Datei <tabelle>.parquet bzw. <tabelle>.csv (CSV passt zu importer.py)."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for table, df in frames.items():
+        path = os.path.join(directory, f"{table}.{fmt}")
+        if fmt == "parquet":
+            df.to_parquet(path, index=False)
+        elif fmt == "csv":
+            df.to_csv(path, index=False)
+        else:
+            raise ValueError(f"Unbekanntes Format: {fmt}")
+        paths.append(path)
+    return paths
+
+
+def write_sqlite(frames: dict[str, pd.DataFrame], path: str):
+    """In eine lokale SQLite-Datenbank mit Schema und Views wie in Supabase (server_query.SQLiteStandIn)."""
+    from server_query import SQLiteStandIn
+
+    local = SQLiteStandIn(path)
+    for table in ("peaks", "routes", "ascents"):
+        local.insert(table, frames[table])
+    local.conn.commit()
+    return local
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetische Gipfel, Routen und Begehungen erzeugen.")
+    parser.add_argument("--peaks", type=int, default=1_000)
+    parser.add_argument("--ascents", type=int, default=100_000)
+    parser.add_argument("--routes-per-peak", type=float, default=ROUTES_PER_PEAK)
+    parser.add_argument("--climbers", type=int, default=CLIMBERS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="testdata", help="Verzeichnis für die Dateien")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+    parser.add_argument("--sqlite", help="statt Dateien in diese SQLite-Datenbank schreiben")
+    args = parser.parse_args(argv)
+
+    frames = generate(args.peaks, args.ascents, args.seed, args.routes_per_peak, args.climbers)
+    print(", ".join(f"{len(df)} {table}" for table, df in frames.items()))
+    if args.sqlite:
+        write_sqlite(frames, args.sqlite)
+        print(f"in {args.sqlite} geschrieben")
+    else:
+        for path in write_files(frames, args.out, args.format):
+            print(f"{path} geschrieben")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+# Gemeinsame Testdaten: alles lokal aus synthetic.py, nie aus Supabase
+import os
+
+# db.py baut beim Import einen Supabase-Client (wird in den Tests nie benutzt) und schreibt
+# sonst einen lokalen Snapshot
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "tests.local.only")
+os.environ["SNAPSHOT_DIR"] = ""
+
+import pytest
+
+import synthetic
+
+
+@pytest.fixture(scope="session")
+def frames():
+    """peaks/routes/ascents mit festem seed (nicht verändern, sonst Kopie ziehen)."""
+    return synthetic.generate(peaks=300, ascents=3000, seed=1)
@@ -0,0 +1,75 @@
+import json
+import sys
+import time
+import types
+
+import pytest
+
+import change_feed
+from change_feed import ORIGIN, LocalChangeFeed, PostgresChangeFeed
+
+
+class FakeConnection:
+    """psycopg-Verbindung ohne Datenbank: notifies() liefert die vorbereiteten Payloads."""
+
+    def __init__(self, payloads):
+        self.payloads = payloads
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        pass
+
+    def notifies(self, timeout=None):
+        if self.payloads:
+            yield types.SimpleNamespace(payload=self.payloads.pop(0))
+        else:
+            time.sleep(timeout)
+
+
+@pytest.fixture
+def listen(monkeypatch):
+    monkeypatch.setattr(change_feed, "POLL_INTERVAL", 0.01)
+
+    def start():
+        connection = FakeConnection([])
+        monkeypatch.setitem(sys.modules, "psycopg",
+                            types.SimpleNamespace(connect=lambda dsn, autocommit: connection))
+        feed = PostgresChangeFeed("postgresql://localhost/test")
+        received = []
+        feed.subscribe(lambda table, keys, climbers: received.append((table, keys, climbers)))
+        return feed, received, connection
+
+    return start
+
+
+def test_close_stops_idle_listener(listen):
+    feed, _, _ = listen()
+    time.sleep(0.05)
+    feed.close()
+    feed.thread.join(timeout=1)
+    assert not feed.thread.is_alive()
+
+
+def test_own_notifications_are_skipped(listen):
+    own = json.dumps({"table": "ascents", "keys": [1], "climbers": ["anna"], "origin": ORIGIN})
+    other = json.dumps({"table": "ascents", "keys": [2], "climbers": ["ben"], "origin": "anderer-worker"})
+    feed, received, connection = listen()
+    connection.payloads += [own, other, "kein json"]
+    time.sleep(0.1)
+    feed.close()
+    feed.thread.join(timeout=1)
+    assert received == [("ascents", [2], ["ben"])]
+
+
+def test_local_feed_keeps_other_subscribers_on_error():
+    feed = LocalChangeFeed()
+    received = []
+    feed.subscribe(lambda *args: 1 / 0)
+    feed.subscribe(lambda *args: received.append(args))
+    feed.publish("routes", [3])
+    assert received == [("routes", [3], None)]
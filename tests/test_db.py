@@ -0,0 +1,156 @@
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("supabase")
+
+import db
+import synthetic
+from server_query import SQLiteClient
+
+
+class FakeRPC:
+    """Antwortet auf rpc("reserve_ids", ...) mit höchstens `limit` IDs pro Aufruf."""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.next_id = 1
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append(params["n"])
+        n = params["n"] if self.limit is None else min(params["n"], self.limit)
+        ids = list(range(self.next_id, self.next_id + n))
+        self.next_id += n
+
+        class Response:
+            data = ids or None
+
+        class Call:
+            def execute(self):
+                return Response()
+
+        return Call()
+
+
+def test_reserve_ids_in_batches(monkeypatch):
+    client = FakeRPC()
+    monkeypatch.setattr(db, "supabase", client)
+    monkeypatch.setattr(db, "RESERVE_LIMIT", 4)
+    assert db.reserve_ids("routes", 10) == list(range(1, 11))
+    assert client.calls == [4, 4, 2]
+
+
+@pytest.mark.parametrize("limit", [0, 3])
+def test_reserve_ids_rejects_short_batch(monkeypatch, limit):
+    monkeypatch.setattr(db, "supabase", FakeRPC(limit))
+    with pytest.raises(RuntimeError):
+        db.reserve_ids("routes", 10)
+
+
+@pytest.fixture
+def local(frames, monkeypatch):
+    # Frische SQLite-Datenbank je Test, db.supabase fragt dort statt bei Supabase
+    local = synthetic.write_sqlite(frames, ":memory:")
+    monkeypatch.setattr(db, "supabase", SQLiteClient(local))
+    return local
+
+
+@pytest.fixture
+def snapshot(local):
+    assert not db.SNAPSHOT_DIR  # conftest.py: nichts auf die Platte schreiben
+    return db.Snapshot({table: "*" for table in db.TABLE_KEYS})
+
+
+def add_ascents(local, frames, ids, kommentar="neu"):
+    rows = frames["ascents"].iloc[:len(ids)].copy()
+    rows["ascent_id"] = ids
+    rows["kommentar"] = kommentar
+    local.insert("ascents", rows)
+
+
+def ascent_ids(snapshot):
+    return set(snapshot.frames["ascents"]["ascent_id"])
+
+
+def test_sync_appends_new_rows(local, frames, snapshot):
+    top = int(frames["ascents"]["ascent_id"].max())
+    version = snapshot.versions["ascents"]
+    add_ascents(local, frames, [top + 1, top + 2])
+    snapshot.sync(["ascents"])
+
+    assert ascent_ids(snapshot) == set(frames["ascents"]["ascent_id"]) | {top + 1, top + 2}
+    assert snapshot.watermarks["ascents"] == ("ascent_id", top + 2)
+    assert snapshot.versions["ascents"] > version
+    assert snapshot.gaps["ascents"] == []
+
+
+def test_out_of_order_ids_fill_gap(local, frames, snapshot):
+    top = int(frames["ascents"]["ascent_id"].max())
+    add_ascents(local, frames, [top + 3])
+    snapshot.sync(["ascents"])
+    assert [gap[:2] for gap in snapshot.gaps["ascents"]] == [(top + 1, top + 2)]
+
+    # Unter der Watermark committet: findet nur die erneute Abfrage der Lücke
+    add_ascents(local, frames, [top + 1])
+    snapshot.sync(["ascents"])
+    assert {top + 1, top + 3} <= ascent_ids(snapshot)
+    assert [gap[:2] for gap in snapshot.gaps["ascents"]] == [(top + 2, top + 2)]
+
+    add_ascents(local, frames, [top + 2])
+    snapshot.sync(["ascents"])
+    assert {top + 1, top + 2, top + 3} <= ascent_ids(snapshot)
+    assert snapshot.gaps["ascents"] == []
+
+
+def test_gap_expires_after_ttl(local, frames, snapshot, monkeypatch):
+    top = int(frames["ascents"]["ascent_id"].max())
+    add_ascents(local, frames, [top + 2])
+    snapshot.sync(["ascents"])
+    assert snapshot.gaps["ascents"]
+
+    monkeypatch.setattr(db, "GAP_TTL", 0)
+    add_ascents(local, frames, [top + 1])
+    snapshot.sync(["ascents"])
+    assert snapshot.gaps["ascents"] == []
+    assert top + 1 not in ascent_ids(snapshot)
+
+
+def test_mark_stale_reloads_updated_rows(local, frames, snapshot, monkeypatch):
+    monkeypatch.setattr(db, "IN_CHUNK", 2)  # mehrere in_()-Abfragen
+    keys = [int(k) for k in frames["ascents"]["ascent_id"].iloc[:5]]
+    local.conn.executemany("UPDATE ascents SET kommentar = 'geändert' WHERE ascent_id = ?", [(k,) for k in keys])
+
+    # Ohne Meldung sieht der Watermark-Sync geänderte alte Zeilen nicht
+    snapshot.sync(["ascents"])
+    ascents = snapshot.frames["ascents"].set_index("ascent_id")
+    assert not (ascents.loc[keys, "kommentar"] == "geändert").any()
+
+    snapshot.mark_stale("ascents", keys)
+    snapshot.sync(["ascents"])
+    ascents = snapshot.frames["ascents"].set_index("ascent_id")
+    assert (ascents.loc[keys, "kommentar"] == "geändert").all()
+    assert len(ascents) == len(frames["ascents"])
+
+
+def test_mark_stale_without_keys_reloads_table(local, frames, snapshot):
+    removed = int(frames["ascents"]["ascent_id"].iloc[0])
+    local.conn.execute("DELETE FROM ascents WHERE ascent_id = ?", (removed,))
+    snapshot.mark_stale("ascents", None)
+    snapshot.sync(["ascents"])
+    assert ascent_ids(snapshot) == set(frames["ascents"]["ascent_id"]) - {removed}
+
+
+def test_fetch_tables_reads_rows_added_after_count(local, frames, monkeypatch):
+    # Zählen sieht 5 Begehungen weniger: sie wurden erst danach geschrieben
+    count_rows = db.count_rows
+    monkeypatch.setattr(db, "count_rows", lambda table: count_rows(table) - (5 if table == "ascents" else 0))
+    tables = db.fetch_tables({"ascents": "*", "routes": "*"}, page_size=400)
+    assert list(tables["ascents"]["ascent_id"]) == sorted(frames["ascents"]["ascent_id"])
+    assert len(tables["routes"]) == len(frames["routes"])
+
+
+def test_fetch_tables_empty_table_keeps_columns(local, monkeypatch):
+    local.conn.execute("DELETE FROM ascents")
+    tables = db.fetch_tables({"ascents": "ascent_id,route_id"})
+    assert tables["ascents"].empty
+    assert list(tables["ascents"].columns) == ["ascent_id", "route_id"]
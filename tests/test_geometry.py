@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from geometry import CLUSTER_DONE_SHARE, build_triangles, cell_size, cluster_triangles
+
+
+def cell_peaks(count: int, done: int = 0, star: int = 0, lat: float = 50.9005, lon: float = 14.1005) -> pd.DataFrame:
+    # `count` Gipfel eng beieinander, also in derselben Gitterzelle
+    return pd.DataFrame({
+        "peak_id": np.arange(count),
+        "gipfel": [f"Gipfel {i}" for i in range(count)],
+        "gebiet": "Rathen",
+        "hoehe": 20.0,
+        "anzahl_routen": 3,
+        "lat": lat + np.arange(count) * 1e-5,
+        "lon": lon,
+        "has_done_route": np.arange(count) < done,
+        "peak_has_star": np.arange(count) < star,
+    })
+
+
+def cluster_color(peaks: pd.DataFrame, zoom: int = 9) -> str:
+    triangles = cluster_triangles(peaks, zoom)
+    assert len(triangles["fill_color"]) == 1
+    return triangles["fill_color"][0]
+
+
+def test_cluster_colors_follow_single_peak_rules():
+    count = 10
+    needed = int(np.ceil(count * CLUSTER_DONE_SHARE))
+    assert cluster_color(cell_peaks(count)) == "red"
+    assert cluster_color(cell_peaks(count, star=1)) == "purple"
+    assert cluster_color(cell_peaks(count, done=needed - 1, star=1)) == "purple"
+    assert cluster_color(cell_peaks(count, done=needed, star=1)) == "black"
+    assert cluster_color(cell_peaks(count, done=needed)) == "black"
+
+
+def test_single_peak_cells_keep_their_own_triangle():
+    peaks = pd.concat([cell_peaks(3), cell_peaks(1, done=1, lat=50.3, lon=13.3).assign(peak_id=99)],
+                      ignore_index=True)
+    triangles = cluster_triangles(peaks, 9)
+    assert list(triangles["peak_id"]) == [None, 99]
+    assert triangles["fill_color"][1] == build_triangles(peaks.iloc[[3]])["fill_color"][0] == "black"
+    assert cell_size(9) > cell_size(12)
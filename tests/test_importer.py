@@ -0,0 +1,119 @@
+import io
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("supabase")
+
+import db
+import importer
+
+
+def csv(text: str) -> io.StringIO:
+    return io.StringIO(text)
+
+
+def read(text: str, table: str, chunk_size: int = importer.CHUNK_SIZE):
+    chunks = list(importer.read_chunks(csv(text), table, chunk_size))
+    valid = pd.concat([valid for valid, _ in chunks], ignore_index=True)
+    return valid, [error for _, chunk_errors in chunks for error in chunk_errors]
+
+
+def test_rejected_rows_report_csv_line_numbers():
+    text = ("route_id,peak_id,name,bewertung,stern\n"
+            "1,10,Alter Weg,3,ja\n"      # Zeile 2
+            "2,,Ohne Gipfel,2,nein\n"    # Zeile 3: Pflichtspalte peak_id fehlt
+            "3,11,Kante,schwer,\n"       # Zeile 4
+            "4,12,Riss,1,x\n"            # Zeile 5
+            "5,13,Platte,2,vielleicht\n")  # Zeile 6
+    # Kleine Stücke: die Zeilennummern zählen über Stückgrenzen weiter
+    valid, errors = read(text, "routes", chunk_size=2)
+    assert list(valid["route_id"]) == [1, 4]
+    assert errors == [
+        "Zeile 3: ungültig/fehlend: peak_id",
+        "Zeile 4: ungültig/fehlend: bewertung",
+        "Zeile 6: ungültig/fehlend: stern",
+    ]
+
+
+def test_missing_required_column_is_an_error():
+    with pytest.raises(ValueError, match="peak_id"):
+        read("route_id,name\n1,Alter Weg\n", "routes")
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("ja", True), ("X", True), ("true", True), ("1", True),
+    ("nein", False), ("", False), ("False", False), ("0", False),
+    ("vielleicht", None),
+])
+def test_parse_bool(text, expected):
+    value = importer.parse_bool(pd.Series([text]))[0]
+    assert pd.isna(value) if expected is None else value == expected
+
+
+def test_integer_columns_accept_whole_floats_only():
+    valid, errors = read("route_id,peak_id,bewertung\n1,10,7.0\n2,10,6.5\n3,10,\n", "routes")
+    assert list(valid["route_id"]) == [1, 3]
+    assert str(valid["bewertung"].dtype) == "Int64"
+    assert valid["bewertung"].iloc[0] == 7
+    assert valid["bewertung"].isna().iloc[1]
+    assert errors == ["Zeile 3: ungültig/fehlend: bewertung"]
+
+
+def test_dates_empty_or_bad():
+    text = ("ascent_id,route_id,date\n"
+            "1,5,2024-05-01\n"
+            "2,5,\n"            # leer: erlaubt, bleibt leer
+            "3,5,kein Datum\n"  # nicht lesbar
+            "4,5,2024-13-01\n")
+    valid, errors = read(text, "ascents")
+    assert list(valid["ascent_id"]) == [1, 2]
+    assert valid["date"].iloc[0] == "2024-05-01"
+    assert pd.isna(valid["date"].iloc[1])
+    assert errors == ["Zeile 4: ungültig/fehlend: date", "Zeile 5: ungültig/fehlend: date"]
+
+
+def test_unknown_columns_are_dropped():
+    valid, _ = read("route_id,peak_id,notiz\n1,10,egal\n", "routes")
+    assert "notiz" not in valid.columns
+
+
+def test_assign_ids_fills_only_missing_keys(monkeypatch):
+    monkeypatch.setattr(db, "reserve_ids", lambda table, n: list(range(100, 100 + n)))
+    valid, _ = read("route_id,peak_id\n5,10\n,11\n,12\n", "routes")
+    assert importer.assign_ids(valid, "routes") == 2
+    assert list(valid["route_id"]) == [5, 100, 101]
+
+    valid, _ = read("peak_id\n10\n", "routes")
+    assert importer.assign_ids(valid, "routes") == 1
+    assert list(valid.columns[:1]) == ["route_id"]
+
+
+def test_write_batch_retries_with_backoff(monkeypatch):
+    calls, delays = [], []
+
+    def flaky(records):
+        calls.append(records)
+        if len(calls) == 1:
+            raise ConnectionError("Zeitüberschreitung")
+        return "ok"
+
+    monkeypatch.setitem(importer.WRITERS, "routes", flaky)
+    monkeypatch.setattr(importer.time, "sleep", delays.append)
+    assert importer.write_batch("routes", [{"route_id": 1}], retries=3, retry_delay=0.5) == "ok"
+    assert len(calls) == 2
+    assert delays == [0.5]
+
+
+def test_write_batch_gives_up_after_retries(monkeypatch):
+    delays = []
+
+    def broken(records):
+        raise ConnectionError("weg")
+
+    monkeypatch.setitem(importer.WRITERS, "routes", broken)
+    monkeypatch.setattr(importer.time, "sleep", delays.append)
+    with pytest.raises(ConnectionError):
+        importer.write_batch("routes", [{"route_id": 1}], retries=2, retry_delay=1.0)
+    assert delays == [1.0, 2.0]
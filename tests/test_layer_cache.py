@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("folium")
+
+from layer_cache import CachedLayer, LayerCache, layer_key
+
+
+def layer(nbytes: int) -> CachedLayer:
+    return CachedLayer([], "x" * nbytes, 1)
+
+
+def test_evicts_least_recently_used():
+    cache = LayerCache(max_bytes=300)
+    cache.put("a", layer(100))
+    cache.put("b", layer(100))
+    cache.put("c", layer(100))
+    assert cache.get("a") is not None   # a ist jetzt zuletzt benutzt, b fliegt als Nächstes
+
+    cache.put("d", layer(100))
+    assert list(cache.entries) == ["c", "a", "d"]
+    assert cache.get("b") is None
+    assert cache.nbytes == 300
+    assert cache.stats()["evictions"] == 1
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_replacing_key_keeps_size_consistent():
+    cache = LayerCache(max_bytes=300)
+    cache.put("a", layer(100))
+    cache.put("a", layer(50))
+    assert cache.nbytes == 50
+    assert len(cache.entries) == 1
+
+
+def test_oversized_layer_is_not_stored():
+    cache = LayerCache(max_bytes=300)
+    cache.put("a", layer(100))
+    cache.put("big", layer(151))
+    assert cache.get("big") is None
+    assert list(cache.entries) == ["a"]
+    assert cache.stats()["evictions"] == 0
+
+
+def test_layer_key_needs_version():
+    class Engine:
+        version = None
+
+    assert layer_key(Engine(), {"gebiet": "Rathen"}, 12) is None
+    Engine.version = 3
+    assert layer_key(Engine(), {"gebiet": "Rathen", "star": None}, 12) == layer_key(Engine(), {"gebiet": "Rathen"}, 12)
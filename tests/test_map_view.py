@@ -0,0 +1,28 @@
+import pytest
+
+pytest.importorskip("streamlit")
+
+from map_view import clicked_peak_id
+from spatial_index import GridIndex
+
+
+@pytest.fixture
+def index():
+    # 1 ist am nächsten am Klick, 2 etwas weiter weg, 3 außerhalb von CLICK_RADIUS
+    return GridIndex([50.9000, 50.9010, 50.9500], [14.1000, 14.1000, 14.1000], [1, 2, 3])
+
+
+def click(lat, lng):
+    return {"last_clicked": {"lat": lat, "lng": lng}}
+
+
+def test_nearest_peak_without_filter(index):
+    assert clicked_peak_id(click(50.9001, 14.1), index) == 1
+    assert clicked_peak_id(click(50.95, 14.2), index) is None
+    assert clicked_peak_id({}, index) is None
+
+
+def test_hidden_peaks_are_skipped(index):
+    assert clicked_peak_id(click(50.9001, 14.1), index, visible=[2, 3]) == 2
+    assert clicked_peak_id(click(50.9001, 14.1), index, visible=[3]) is None
+    assert clicked_peak_id(click(50.9001, 14.1), index, visible=[]) is None
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from peak_filter import PeakFilter
+
+
+@pytest.fixture
+def summary():
+    rng = np.random.default_rng(1)
+    n = 500
+    frame = pd.DataFrame({
+        "peak_id": np.arange(1, n + 1),
+        "gipfel": [f"Gipfel {i}" for i in range(n)],
+        "gebiet": rng.choice(["Rathen", "Bielatal", "Schrammsteine"], n),
+        "hoehe": rng.uniform(5, 120, n).round(),
+        "lat": rng.uniform(50.85, 50.98, n),
+        "lon": rng.uniform(14.0, 14.4, n),
+        "anzahl_routen": rng.integers(0, 10, n),
+        "peak_has_star": rng.random(n) < 0.3,
+        "has_done_route": rng.random(n) < 0.4,
+        "max_bewertung_per_peak": rng.integers(0, 12, n),
+    })
+    frame.loc[::41, "lat"] = np.nan      # nicht auf der Karte darstellbar
+    frame.loc[::53, "hoehe"] = np.nan    # zählt beim Höhenfilter als 0
+    return frame
+
+
+def expected(frame, gebiet=None, bewertung=None, star=None, max_hoehe=None, done=None):
+    mask = pd.Series(True, index=frame.index)
+    if gebiet is not None:
+        mask &= frame["gebiet"] == gebiet
+    if bewertung is not None:
+        mask &= frame["max_bewertung_per_peak"] == bewertung
+    if star is not None:
+        mask &= frame["peak_has_star"] == star
+    if max_hoehe is not None:
+        mask &= frame["hoehe"].fillna(0) <= max_hoehe
+    if done is not None:
+        mask &= frame["has_done_route"] == done
+    return mask
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"gebiet": "Rathen"},
+    {"gebiet": "unbekannt"},
+    {"star": True, "max_hoehe": 40},
+    {"done": False, "bewertung": 7},
+    {"gebiet": "Bielatal", "star": False, "done": True, "max_hoehe": 80, "bewertung": 3},
+])
+def test_select_matches_pandas_filter(summary, filters):
+    peak_filter = PeakFilter(summary)
+    mask = expected(summary, **filters)
+    plottable = summary[["lat", "lon", "hoehe"]].notna().all(axis=1)
+
+    assert np.array_equal(peak_filter.mask(**filters), mask.to_numpy())
+    rows, dropped = peak_filter.select(**filters)
+    assert list(rows["peak_id"]) == list(summary.loc[mask & plottable, "peak_id"])
+    assert dropped == int((mask & ~plottable).sum())
+
+
+def test_with_summary_updates_ascent_columns_only(summary):
+    peak_filter = PeakFilter(summary)
+    changed = summary.copy()
+    changed["has_done_route"] = ~changed["has_done_route"]
+    changed["max_bewertung_per_peak"] = 11
+    updated = peak_filter.with_summary(changed)
+
+    assert updated.gebiet is peak_filter.gebiet
+    assert np.array_equal(updated.mask(done=True), expected(changed, done=True).to_numpy())
+    assert updated.mask(bewertung=11).all()
+    assert np.array_equal(peak_filter.mask(done=True), expected(summary, done=True).to_numpy())
+
+
+def test_index_covers_plottable_peaks(summary):
+    peak_filter = PeakFilter(summary)
+    assert sorted(peak_filter.index().bbox(50.0, 13.0, 51.0, 15.0)) == list(summary.loc[summary["lat"].notna(), "peak_id"])
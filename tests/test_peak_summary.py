@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("supabase")
+
+from peak_summary import PeakAggregates, build_peak_summary
+
+
+def test_extend_matches_full_rebuild(frames):
+    peaks, routes, ascents = frames["peaks"], frames["routes"], frames["ascents"]
+    aggregates = PeakAggregates(peaks, routes, ascents.iloc[:1000])
+    for end in (1000, 1001, 2200, len(ascents)):
+        assert aggregates.can_extend(ascents.iloc[:end])
+        summary = aggregates.extend(ascents.iloc[:end])
+
+    full = build_peak_summary(peaks, routes, ascents)
+    assert aggregates.check(peaks, routes, ascents) == []
+    for col in ("has_done_route", "max_bewertung_per_peak", "kommentar"):
+        assert np.array_equal(summary[col].to_numpy(dtype=object), full[col].to_numpy(dtype=object)), col
+
+
+def test_extend_keeps_previous_frame(frames):
+    peaks, routes, ascents = frames["peaks"], frames["routes"], frames["ascents"]
+    aggregates = PeakAggregates(peaks, routes, ascents.iloc[:10])
+    before = aggregates.summary
+    done = before["has_done_route"].to_numpy().copy()
+    aggregates.extend(ascents)
+    assert np.array_equal(before["has_done_route"].to_numpy(), done)
+
+
+def test_can_extend_rejects_changed_rows(frames):
+    peaks, routes, ascents = frames["peaks"], frames["routes"], frames["ascents"]
+    aggregates = PeakAggregates(peaks, routes, ascents.iloc[:1000])
+
+    assert aggregates.can_extend(ascents.iloc[:1000])       # nichts Neues
+    assert not aggregates.can_extend(ascents.iloc[:999])     # gelöscht
+    assert not aggregates.can_extend(ascents.iloc[1:1001])   # verschoben
+    # Ein Sync hängt geänderte Begehungen hinten an: bereits eingerechnete ID im neuen Teil
+    changed = pd.concat([ascents.iloc[:1000], ascents.iloc[[5]]])
+    assert not aggregates.can_extend(changed)
+    assert PeakAggregates(peaks, routes, ascents.iloc[:0]).can_extend(ascents)
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("supabase")
+
+from route_query import RouteQuery
+
+
+@pytest.fixture(scope="module")
+def tables(frames):
+    peaks, routes, ascents = frames["peaks"], frames["routes"].copy(), frames["ascents"].copy()
+    # Route an einem unbekannten Gipfel und Begehung einer unbekannten Route: werden ignoriert
+    orphan = routes.iloc[[0]].assign(route_id=10**6, peak_id=10**6)
+    routes = pd.concat([routes, orphan], ignore_index=True)
+    ascents.loc[ascents.index[0], "route_id"] = 10**7
+    # done == False zählt nicht als geklettert
+    ascents["done"] = np.arange(len(ascents)) % 7 != 0
+    return peaks, routes, ascents
+
+
+def reference(peaks, routes, ascents, min_bewertung=None, max_bewertung=None, star=None, done=None,
+              climber_id=None, gebiet=None, max_hoehe=None):
+    """Dieselbe Abfrage als merge + groupby (so sahen die Seiten vor RouteQuery aus)."""
+    merged = routes.merge(peaks[["peak_id", "gebiet", "hoehe"]], on="peak_id", how="inner")
+    climbed = ascents[ascents["done"]]
+    if climber_id is not None:
+        climbed = climbed[climbed["climber_id"] == climber_id]
+    merged["done"] = merged["route_id"].isin(climbed["route_id"])
+
+    mask = pd.Series(True, index=merged.index)
+    if min_bewertung is not None:
+        mask &= merged["bewertung"] >= min_bewertung
+    if max_bewertung is not None:
+        mask &= merged["bewertung"] <= max_bewertung
+    if star is not None:
+        mask &= merged["stern"] == star
+    if done is not None:
+        mask &= merged["done"] == done
+    if gebiet is not None:
+        mask &= merged["gebiet"] == gebiet
+    if max_hoehe is not None:
+        mask &= merged["hoehe"].fillna(0) <= max_hoehe
+
+    passende = merged[mask].groupby("peak_id").size().rename("passende_routen")
+    anzahl = merged.groupby("peak_id").size().rename("anzahl_routen")
+    result = peaks.merge(passende, left_on="peak_id", right_index=True)
+    return result.merge(anzahl, left_on="peak_id", right_index=True)
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"min_bewertung": 3, "max_bewertung": 6},
+    {"star": True, "gebiet": "Rathen"},
+    {"done": True},
+    {"done": False, "max_hoehe": 40},
+    {"done": True, "climber_id": "climber_0041"},
+    {"done": True, "climber_id": "unbekannt"},
+])
+def test_peaks_match_merge_and_groupby(tables, filters):
+    query = RouteQuery(*tables)
+    result = query.peaks(query.routes(**filters))
+    expected = reference(*tables, **filters)
+
+    assert list(result["peak_id"]) == list(expected["peak_id"])
+    assert list(result["passende_routen"]) == list(expected["passende_routen"])
+    assert list(result["anzahl_routen"]) == list(expected["anzahl_routen"])
+
+
+def test_done_by_is_cached_per_climber(tables):
+    query = RouteQuery(*tables)
+    mask = query.done_by("climber_0041")
+    assert query.done_by("climber_0041") is mask
+    assert query.done_by(None) is query.done
+    assert not (mask & ~query.done).any()  # was einer geklettert hat, hat irgendwer geklettert
+    assert "climber_0041" in query.climbers
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("supabase")
+
+import db
+import synthetic
+from peak_filter import PeakFilter
+from peak_summary import build_peak_summary
+from server_query import SQLiteClient, filter_conditions, sql_where, summary_columns
+
+
+@pytest.fixture(scope="module")
+def local(frames):
+    return synthetic.write_sqlite(frames, ":memory:")
+
+
+@pytest.fixture(scope="module")
+def summary(frames):
+    return build_peak_summary(frames["peaks"], frames["routes"], frames["ascents"])
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"gebiet": "Rathen"},
+    {"star": True, "max_hoehe": 60},
+    {"done": False},
+    {"bewertung": 7, "done": True},
+])
+def test_view_matches_local_summary(local, summary, filters):
+    # Gleiche Gipfel wie die lokale Filter-Engine über build_peak_summary()
+    expected, _ = PeakFilter(summary).select(**filters)
+    rows = local.filtered_peaks(summary_columns(), **filters)
+    assert list(rows["peak_id"]) == sorted(expected["peak_id"])
+
+    expected = expected.set_index("peak_id").loc[rows["peak_id"]]
+    for col in ("anzahl_routen", "peak_has_star", "has_done_route", "max_bewertung_per_peak"):
+        assert np.array_equal(rows[col].to_numpy(dtype=object), expected[col].to_numpy(dtype=object)), col
+
+
+def test_areas_match_peaks(local, frames):
+    areas = local.areas()
+    assert sorted(areas["gebiet"]) == sorted(frames["peaks"]["gebiet"].dropna().unique())
+
+
+def test_sql_where_skips_unset_filters():
+    where, params = sql_where(filter_conditions(gebiet=None, star=False))
+    assert "gebiet" not in where
+    assert params == [False]
+
+
+def test_fetch_tables_pages_through_sqlite_client(local, frames, monkeypatch):
+    monkeypatch.setattr(db, "supabase", SQLiteClient(local))
+    specs = {"peaks": db.select_list(("peak_id", "gipfel", "gebiet"), "peaks"), "ascents": "*"}
+    tables = db.fetch_tables(specs, page_size=500)
+
+    assert list(tables["peaks"].columns) == ["peak_id", "gipfel", "gebiet"]
+    assert list(tables["peaks"]["peak_id"]) == sorted(frames["peaks"]["peak_id"])
+    assert len(tables["ascents"]) == len(frames["ascents"])
+    assert list(tables["ascents"]["ascent_id"]) == sorted(frames["ascents"]["ascent_id"])
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from spatial_index import GridIndex, haversine
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(50.85, 50.98, 2000)
+    lon = rng.uniform(14.0, 14.4, 2000)
+    lat[::97] = np.nan  # ohne Koordinaten: nicht im Index
+    return lat, lon, np.arange(1000, 3000)
+
+
+def test_bbox_matches_brute_force(points):
+    lat, lon, ids = points
+    index = GridIndex(lat, lon, ids)
+    assert len(index) == np.isfinite(lat).sum()
+    for box in [(50.9, 14.1, 50.95, 14.2), (50.0, 13.0, 51.0, 15.0), (50.91, 14.3, 50.911, 14.301)]:
+        south, west, north, east = box
+        expected = ids[(lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)]
+        assert sorted(index.bbox(*box)) == sorted(expected)
+
+
+def test_nearest_and_radius_match_brute_force(points):
+    lat, lon, ids = points
+    index = GridIndex(lat, lon, ids)
+    valid = np.isfinite(lat)
+    distance = haversine(50.92, 14.2, lat[valid], lon[valid])
+    order = np.argsort(distance, kind="stable")
+
+    found, meters = index.nearest(50.92, 14.2, k=5)
+    assert list(found) == list(ids[valid][order[:5]])
+    assert np.allclose(meters, distance[order[:5]])
+
+    assert sorted(index.radius(50.92, 14.2, 1000)) == sorted(ids[valid][distance <= 1000])
+    assert len(index.nearest(50.92, 14.2, k=1, max_distance=0.001)[0]) == 0
+
+
+def test_insert_moves_and_remove_drops_points(points):
+    lat, lon, ids = points
+    index = GridIndex(lat, lon, ids)
+    index.insert([50.5], [13.5], [1001])        # bestehende id verschieben
+    index.insert([50.51], [13.51], [5000])      # neue id
+    assert sorted(index.bbox(50.4, 13.4, 50.6, 13.6)) == [1001, 5000]
+    assert 1001 not in index.bbox(50.85, 14.0, 50.98, 14.4)
+
+    index.remove([1001, 5000])
+    assert len(index.bbox(50.4, 13.4, 50.6, 13.6)) == 0
+    assert len(index) == np.isfinite(lat).sum() - 1
@@ -0,0 +1,170 @@
+# Zeitmessung pro Rerun: benannte Abschnitte (Spans) mit Dauer, Zeilenzahl und Speicheränderung.
+# Ersetzt die Debug-Nachrichten der Kartenseiten; pro Session werden nur die letzten MAX_RUNS Reruns behalten.
+import collections
+import contextlib
+import json
+import os
+import time
+
+import pandas as pd
+import streamlit as st
+
+MAX_RUNS = 20      # aufgehobene Reruns pro Session
+MAX_SPANS = 200    # Spans pro Rerun (mehr werden nicht mehr aufgezeichnet)
+
+# Debug-Panel standardmäßig anzeigen (sonst per Checkbox in der Sidebar)
+DEBUG_PANEL = os.getenv("DEBUG_PANEL", "") == "1"
+
+try:
+    _PAGE_BYTES = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_BYTES = 4096
+
+
+def rss() -> int | None:
+    """Aktueller Arbeitsspeicher des Prozesses in Bytes (Linux), sonst None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_BYTES
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Trace:
+    """Alle Spans und Notizen eines Reruns einer Seite."""
+
+    def __init__(self, page: str):
+        self.page = page
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.spans = []
+        self.notes = []
+        self.ended = 0.0   # Sekunden seit Beginn bis zum Ende des letzten Spans (bzw. finish())
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attrs):
+        """
+        Misst den Block; liefert den Eintrag, in den der Block z.B. record["rows"] schreiben kann.
+        Weitere Schlüsselwörter landen als Attribute im Eintrag (etwa die Filterwerte).
+        """
+        record = {"name": name, "start": time.perf_counter() - self._t0, "seconds": None,
+                  "rows": None, "memory_delta": None, "attrs": attrs}
+        if len(self.spans) < MAX_SPANS:
+            self.spans.append(record)
+        before = rss()
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - started
+            self.ended = max(self.ended, record["start"] + record["seconds"])
+            after = rss()
+            if before is not None and after is not None:
+                record["memory_delta"] = after - before
+
+    def note(self, message: str):
+        if len(self.notes) < MAX_SPANS:
+            self.notes.append(message)
+
+    def finish(self):
+        """Ende des Reruns festhalten (sonst zählt das Ende des letzten Spans)."""
+        self.ended = time.perf_counter() - self._t0
+
+    @property
+    def seconds(self) -> float:
+        return self.ended
+
+    def to_dict(self) -> dict:
+        return {"page": self.page, "started": self.started, "seconds": self.seconds,
+                "spans": self.spans, "notes": self.notes}
+
+    def to_frame(self) -> pd.DataFrame:
+        """Spans als Tabelle (ms, MB) für das Debug-Panel."""
+        return pd.DataFrame({
+            "span": [span["name"] for span in self.spans],
+            "start ms": [round(span["start"] * 1000, 1) for span in self.spans],
+            "ms": [None if span["seconds"] is None else round(span["seconds"] * 1000, 1) for span in self.spans],
+            "rows": [span["rows"] for span in self.spans],
+            "memory MB": [None if span["memory_delta"] is None else round(span["memory_delta"] / 2 ** 20, 1)
+                          for span in self.spans],
+            "attrs": [", ".join(f"{k}={v}" for k, v in span["attrs"].items()) for span in self.spans],
+        })
+
+    def trace_events(self, tid: int = 1) -> list[dict]:
+        """Spans im Chrome-Trace-Format (chrome://tracing, Perfetto); Zeiten in Mikrosekunden."""
+        return [
+            {
+                "name": span["name"], "cat": self.page, "ph": "X", "pid": 1, "tid": tid,
+                "ts": round((self.started + span["start"]) * 1e6),
+                "dur": round((span["seconds"] or 0.0) * 1e6),
+                "args": {"rows": span["rows"], "memory_delta": span["memory_delta"],
+                         **{k: str(v) for k, v in span["attrs"].items()}},
+            }
+            for span in self.spans
+        ]
+
+
+def _runs() -> collections.deque:
+    if "trace_runs" not in st.session_state:
+        st.session_state["trace_runs"] = collections.deque(maxlen=MAX_RUNS)
+    return st.session_state["trace_runs"]
+
+
+def start_trace(page: str) -> Trace:
+    """Neuer Trace für diesen Rerun; gemeinsamer Code erreicht ihn über span()."""
+    trace = Trace(page)
+    _runs().append(trace)
+    st.session_state["trace"] = trace
+    return trace
+
+
+def current_trace() -> Trace | None:
+    try:
+        return st.session_state.get("trace")
+    except Exception:
+        # Außerhalb einer Streamlit-Session (Skripte, Benchmarks) wird nicht gemessen
+        return None
+
+
+def span(name: str, **attrs):
+    """Span im Trace des laufenden Reruns – ohne Trace nur ein leerer Block."""
+    trace = current_trace()
+    if trace is None:
+        return contextlib.nullcontext({"attrs": attrs})
+    return trace.span(name, **attrs)
+
+
+def end_trace():
+    """Laufenden Trace beenden: danach landen keine Spans mehr darin (z.B. von Seiten ohne Trace)."""
+    st.session_state.pop("trace", None)
+
+
+def show_trace_panel(trace: Trace):
+    """
+    Optionales Debug-Panel (Checkbox in der Sidebar): Spans dieses Reruns, die letzten Reruns
+    der Session und Export als JSON bzw. Chrome-Trace. Schließt den Trace ab (end_trace()).
+    """
+    trace.finish()
+    end_trace()
+    if not st.sidebar.checkbox("Show timings (debug)", value=DEBUG_PANEL):
+        return
+    runs = list(_runs())
+    st.subheader("Timings")
+    st.write(f"This rerun: {trace.seconds * 1000:.0f} ms")
+    st.dataframe(trace.to_frame())
+    for message in trace.notes:
+        st.caption(message)
+
+    st.write(f"Last {len(runs)} reruns of this session")
+    st.dataframe(pd.DataFrame({
+        "page": [run.page for run in runs],
+        "started": [time.strftime("%H:%M:%S", time.localtime(run.started)) for run in runs],
+        "ms": [round(run.seconds * 1000, 1) for run in runs],
+        "slowest span": [max(run.spans, key=lambda s: s["seconds"] or 0.0)["name"] if run.spans else ""
+                         for run in runs],
+    }))
+    st.download_button("Download JSON", json.dumps([run.to_dict() for run in runs], default=str),
+                       file_name="timings.json", mime="application/json")
+    events = [event for i, run in enumerate(runs) for event in run.trace_events(tid=i + 1)]
+    st.download_button("Download Chrome trace", json.dumps({"traceEvents": events}),
+                       file_name="timings.trace.json", mime="application/json")